@@ -1,9 +1,12 @@
 #It lets you see, add, delete database rows visually
 from django.contrib import admin
 #Import the table you created
-from .models import Dataset
+from .models import AnalysisJob, Dataset, EquipmentRecord, ReportArtifact
 
 #Show Dataset table inside admin panel
 admin.site.register(Dataset)
+admin.site.register(EquipmentRecord)
+admin.site.register(AnalysisJob)
+admin.site.register(ReportArtifact)
 
 #“I used Django Admin to inspect and manage dataset history.”
\ No newline at end of file
@@ -0,0 +1,130 @@
+"""
+Admission control for export renders (PDF, Excel, ...).
+
+Renders are CPU-heavy; left unbounded, a burst of them takes every worker
+thread and starves the cheap endpoints (history/, health/, ...). A render
+needs a slot from render_gate: at most RENDER_MAX_CONCURRENT run at once,
+up to RENDER_QUEUE_SIZE interactive requests wait (at most
+RENDER_QUEUE_TIMEOUT seconds), and anything beyond that is refused with
+Overloaded, which the views turn into 503 + Retry-After. Keeping
+RENDER_MAX_CONCURRENT + RENDER_QUEUE_SIZE below the server's thread count
+leaves the remaining threads as a lane for light requests.
+
+Only actual renders take a slot; cached artifacts need nothing. Requests
+waiting for the same export to be rendered by another request or process
+(exports.get_or_render) take no slot but still tie up a server thread, so
+they hold a place in the queue instead (AdmissionGate.queue_place) and are
+refused the same way when it is full. Queued interactive requests go
+before background pre-renders, which wait without a bound or timeout and
+are never refused.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+# Waiting order: lower runs first
+INTERACTIVE = 0
+BACKGROUND = 1
+
+
+class Overloaded(Exception):
+    def __init__(self, retry_after):
+        super().__init__("Server is busy rendering other exports, please retry shortly")
+        self.retry_after = retry_after
+
+
+class AdmissionGate:
+    def __init__(self, max_concurrent, max_queue, queue_timeout, retry_after):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self._running = 0
+        self._waiting = []  # heap of (priority, ticket)
+        self._other_waiters = 0  # interactive requests waiting on something other than a slot
+        self._tickets = itertools.count()
+        self._cond = threading.Condition()
+
+    @property
+    def running(self):
+        return self._running
+
+    @property
+    def waiting(self):
+        return len(self._waiting) + self._other_waiters
+
+    def _queue_full(self):
+        queued = sum(1 for p, _ in self._waiting if p == INTERACTIVE) + self._other_waiters
+        return queued >= self.max_queue
+
+    def acquire(self, priority=INTERACTIVE):
+        with self._cond:
+            if self._running < self.max_concurrent and not self._waiting:
+                self._running += 1
+                return
+
+            interactive = priority == INTERACTIVE
+            if interactive and self._queue_full():
+                raise Overloaded(self.retry_after)
+
+            entry = (priority, next(self._tickets))
+            heapq.heappush(self._waiting, entry)
+            deadline = time.monotonic() + self.queue_timeout if interactive else None
+            while not (self._running < self.max_concurrent and self._waiting[0] == entry):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._waiting.remove(entry)
+                    heapq.heapify(self._waiting)
+                    self._cond.notify_all()
+                    raise Overloaded(self.retry_after)
+                self._cond.wait(remaining)
+
+            heapq.heappop(self._waiting)
+            self._running += 1
+            self._cond.notify_all()  # the next waiter may fit in another free slot
+
+    def release(self):
+        with self._cond:
+            self._running -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, priority=INTERACTIVE):
+        self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    @contextmanager
+    def queue_place(self, priority=INTERACTIVE):
+        """
+        Hold a place in the queue (not a slot) while waiting for a render
+        running elsewhere; raises Overloaded if the queue is full.
+        Background waits are not counted, as in acquire().
+        """
+        if priority != INTERACTIVE:
+            yield
+            return
+        with self._cond:
+            if self._queue_full():
+                raise Overloaded(self.retry_after)
+            self._other_waiters += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._other_waiters -= 1
+
+
+render_gate = AdmissionGate(
+    settings.RENDER_MAX_CONCURRENT,
+    settings.RENDER_QUEUE_SIZE,
+    settings.RENDER_QUEUE_TIMEOUT,
+    settings.RENDER_RETRY_AFTER,
+)
@@ -1,4 +1,31 @@
+import logging
+import threading
+
 from django.apps import AppConfig
+from django.conf import settings
+
+logger = logging.getLogger('api')
+
+
+def warm_up_charts():
+    from .chart_utils import warm_up
+    try:
+        warm_up()
+        logger.info("Matplotlib warm-up finished")
+    except Exception:
+        logger.error("Matplotlib warm-up failed", exc_info=True)
+
+
+def start_server_tasks():
+    """
+    Background work for server processes, called from wsgi.py / asgi.py -
+    which migrate, the test runner and other management commands never load.
+    """
+    from .jobs import autostart_worker
+
+    autostart_worker()
+    if settings.MATPLOTLIB_WARMUP:
+        threading.Thread(target=warm_up_charts, name="matplotlib-warmup", daemon=True).start()
 
 
 class ApiConfig(AppConfig):
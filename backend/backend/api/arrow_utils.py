@@ -0,0 +1,126 @@
+# Columnar (Parquet and Arrow IPC) exports of the equipment table
+# It should NOT contain Django or HTTP code
+import json
+
+from .export_utils import EXPORT_CHUNK_BYTES, iter_spooled
+
+# Rows per Arrow record batch (and Parquet row group flush)
+ARROW_BATCH_ROWS = 50_000
+
+# (field, Arrow type name); "dictionary" columns are dictionary-encoded strings
+EQUIPMENT_COLUMNS = [
+    ("row", "int32"),
+    ("name", "string"),
+    ("type", "dictionary"),
+    ("flowrate", "float64"),
+    ("pressure", "float64"),
+    ("temperature", "float64"),
+    ("health_score", "float64"),
+    ("risk", "dictionary"),
+    ("rank", "int32"),
+    ("status", "dictionary"),
+    ("is_outlier", "bool"),
+]
+
+
+def summary_metadata(dataset):
+    """Dataset-level analysis stored in the file's key/value metadata"""
+    return {
+        "dataset_name": dataset.name,
+        "uploaded_at": dataset.uploaded_at.isoformat(),
+        "analysis_mode": dataset.analysis_mode,
+        "summary": json.dumps({
+            "total_equipment": dataset.total_equipment,
+            "avg_flowrate": dataset.avg_flowrate,
+            "avg_pressure": dataset.avg_pressure,
+            "avg_temperature": dataset.avg_temperature,
+            "avg_health_score": dataset.avg_health_score,
+            "outlier_count": dataset.outlier_count,
+            "risk_summary": dataset.risk_summary,
+            "type_distribution": dataset.type_distribution,
+            "statistics": dataset.statistics,
+        }),
+    }
+
+
+def equipment_schema(dataset):
+    import pyarrow as pa
+
+    fields = []
+    for name, kind in EQUIPMENT_COLUMNS:
+        arrow_type = pa.dictionary(pa.int32(), pa.string()) if kind == "dictionary" else pa.type_for_alias(kind)
+        fields.append(pa.field(name, arrow_type, nullable=name in ("flowrate", "pressure", "temperature")))
+    return pa.schema(fields, metadata=summary_metadata(dataset))
+
+
+def iter_record_batches(dataset, schema, batch_rows=ARROW_BATCH_ROWS):
+    """
+    The equipment table as Arrow record batches, read from the database
+    batch_rows at a time. Every batch shares one dictionary per encoded
+    column (the IPC file format does not allow dictionaries to change).
+    """
+    import pyarrow as pa
+
+    fields = [name for name, _ in EQUIPMENT_COLUMNS]
+    dictionaries = {
+        name: dataset.distinct_equipment_values(name)
+        for name, kind in EQUIPMENT_COLUMNS if kind == "dictionary"
+    }
+    codes = {name: {value: i for i, value in enumerate(values)} for name, values in dictionaries.items()}
+
+    def to_batch(rows):
+        columns = list(zip(*rows))
+        arrays = []
+        for i, field in enumerate(schema):
+            if field.name in dictionaries:
+                lookup = codes[field.name]
+                arrays.append(pa.DictionaryArray.from_arrays(
+                    pa.array([lookup[value] for value in columns[i]], type=pa.int32()),
+                    pa.array(dictionaries[field.name], type=pa.string()),
+                ))
+            else:
+                arrays.append(pa.array(columns[i], type=field.type))
+        return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+    rows = []
+    for row in dataset.iter_equipment_values(fields, chunk_size=min(batch_rows, 2000)):
+        rows.append(row)
+        if len(rows) == batch_rows:
+            yield to_batch(rows)
+            rows = []
+    if rows:
+        yield to_batch(rows)
+
+
+def iter_parquet(dataset, batch_rows=ARROW_BATCH_ROWS, chunk_size=EXPORT_CHUNK_BYTES):
+    """
+    Generates a Parquet file of the equipment table (zstd compressed),
+    with the dataset summary in the schema metadata. Yields byte chunks.
+    """
+    import pyarrow.parquet as pq
+
+    schema = equipment_schema(dataset)
+
+    def write(spool):
+        with pq.ParquetWriter(spool, schema, compression="zstd") as writer:
+            for batch in iter_record_batches(dataset, schema, batch_rows):
+                writer.write_batch(batch)
+
+    yield from iter_spooled(write, chunk_size)
+
+
+def iter_arrow(dataset, batch_rows=ARROW_BATCH_ROWS, chunk_size=EXPORT_CHUNK_BYTES):
+    """
+    Generates an Arrow IPC file (Feather v2) of the equipment table,
+    uncompressed so clients can memory-map it. Yields byte chunks.
+    """
+    import pyarrow as pa
+
+    schema = equipment_schema(dataset)
+
+    def write(spool):
+        with pa.ipc.new_file(spool, schema) as writer:
+            for batch in iter_record_batches(dataset, schema, batch_rows):
+                writer.write_batch(batch)
+
+    yield from iter_spooled(write, chunk_size)
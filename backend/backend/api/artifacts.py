@@ -0,0 +1,232 @@
+"""
+Disk cache for rendered exports (ReportArtifact).
+
+An artifact is keyed by (dataset, kind, version). version is a hash of the
+module that renders it, so editing the renderer invalidates old artifacts
+without any manual bumping. The cache is bounded by REPORT_CACHE_MAX_BYTES;
+least recently served artifacts are evicted first.
+
+ArtifactLock serializes renders of the same (dataset, kind) across worker
+processes sharing the cache directory. Its lock files are deleted with the
+artifacts and datasets they belong to (signals.py).
+"""
+
+import hashlib
+import logging
+import os
+import time
+import uuid
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Sum
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils import timezone
+from django.utils.http import parse_etags
+
+from .models import ReportArtifact
+
+try:
+    import fcntl
+except ImportError:  # Windows: only in-process coalescing (see exports.get_or_render)
+    fcntl = None
+
+logger = logging.getLogger('api')
+
+# How often a blocked ArtifactLock.acquire retries
+LOCK_POLL_SECONDS = 0.05
+# Inserts tried when concurrent stores of the same artifact keep colliding
+STORE_ATTEMPTS = 3
+
+
+def renderer_version(*modules, options=""):
+    """
+    Hash of the renderer modules' source (plus any output-affecting options);
+    changes whenever the renderer does.
+    """
+    digest = hashlib.sha256()
+    for module in modules:
+        with open(module.__file__, "rb") as f:
+            digest.update(f.read())
+    digest.update(options.encode())
+    return digest.hexdigest()
+
+
+class ArtifactLock:
+    """
+    Exclusive lock for rendering one (dataset, kind) artifact, shared by every
+    process using REPORT_CACHE_DIR: an flock on a file in its locks/ directory.
+    The OS drops the lock if the holder dies, so a crashed render never
+    leaves it stuck. A no-op where fcntl is unavailable.
+    """
+
+    def __init__(self, dataset_id, kind):
+        self.path = os.path.join(settings.REPORT_CACHE_DIR, "locks", f"{dataset_id}-{kind}.lock")
+        self._file = None
+
+    def acquire(self, timeout=None):
+        """Wait up to timeout seconds (None = forever, 0 = don't wait); returns whether it was acquired"""
+        if fcntl is None:
+            return True
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        file = open(self.path, "a")
+        while True:
+            try:
+                fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                if deadline is not None and time.monotonic() >= deadline:
+                    file.close()
+                    return False
+                time.sleep(LOCK_POLL_SECONDS)
+                continue
+            if self._is_current(file):
+                self._file = file
+                return True
+            # discard() deleted the file while we waited on it: lock the new one
+            file.close()
+            file = open(self.path, "a")
+
+    def release(self):
+        if self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+    def discard(self):
+        """Delete the lock file, unless a render holds it (it is left for the next cleanup)"""
+        if fcntl is None or not os.path.exists(self.path) or not self.acquire(timeout=0):
+            return
+        try:
+            os.remove(self.path)
+        finally:
+            self.release()
+
+    def _is_current(self, file):
+        try:
+            return os.stat(self.path).st_ino == os.fstat(file.fileno()).st_ino
+        except FileNotFoundError:
+            return False
+
+
+def get_artifact(dataset_id, kind, version):
+    """Return the cached artifact (marking it recently used), or None"""
+    artifact = ReportArtifact.objects.filter(dataset_id=dataset_id, kind=kind, version=version).first()
+    if artifact is None:
+        return None
+    if not os.path.exists(artifact.path):
+        # Cache directory was wiped (e.g. container restart)
+        artifact.delete()
+        return None
+    ReportArtifact.objects.filter(id=artifact.id).update(last_accessed=timezone.now())
+    return artifact
+
+
+def tee_artifact(dataset_id, kind, version, chunks):
+    """
+    Yield byte chunks unchanged while writing them to the cache.
+    The artifact is recorded (and returned as the generator's value) once
+    every chunk is written; if the consumer stops early nothing is stored.
+    """
+    os.makedirs(settings.REPORT_CACHE_DIR, exist_ok=True)
+    path = os.path.join(settings.REPORT_CACHE_DIR, f"{dataset_id}-{kind}-{uuid.uuid4().hex}")
+    digest = hashlib.sha256()
+    size = 0
+    # Write then rename, so a reader never sees a half-written file
+    try:
+        with open(f"{path}.tmp", "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+                yield chunk
+    except BaseException:
+        # Render failed or the client went away (GeneratorExit)
+        if os.path.exists(f"{path}.tmp"):
+            os.remove(f"{path}.tmp")
+        raise
+    os.replace(f"{path}.tmp", path)
+
+    for attempt in range(STORE_ATTEMPTS):
+        try:
+            # Savepoint: a failed insert must not break an enclosing transaction
+            with transaction.atomic():
+                artifact = ReportArtifact.objects.create(
+                    dataset_id=dataset_id,
+                    kind=kind,
+                    version=version,
+                    path=path,
+                    size=size,
+                    etag=f'"{digest.hexdigest()}"',
+                    last_accessed=timezone.now(),
+                )
+        except IntegrityError:
+            # A concurrent request stored the same artifact first: use theirs,
+            # unless it has been evicted (or lost its file) since - then store ours
+            existing = get_artifact(dataset_id, kind, version)
+            if existing is not None:
+                os.remove(path)
+                return existing
+            if attempt == STORE_ATTEMPTS - 1:
+                os.remove(path)
+                raise
+        else:
+            evict_artifacts(keep=artifact.id)
+            return artifact
+
+
+def store_artifact(dataset_id, kind, version, content):
+    """
+    Write content (bytes, or an iterable of byte chunks) to the cache,
+    record it and evict down to the size limit
+    """
+    writer = tee_artifact(dataset_id, kind, version, [content] if isinstance(content, bytes) else content)
+    while True:
+        try:
+            next(writer)
+        except StopIteration as done:
+            return done.value
+
+
+def evict_artifacts(max_bytes=None, keep=None):
+    """
+    Delete least recently used artifacts until the cache fits in max_bytes.
+    The artifact with id keep (the one just stored) is never evicted, even
+    if it alone is larger than the cache: it is about to be served.
+    """
+    max_bytes = settings.REPORT_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    total = ReportArtifact.objects.aggregate(total=Sum("size"))["total"] or 0
+    if total <= max_bytes:
+        return
+
+    for artifact in ReportArtifact.objects.exclude(id=keep).order_by("last_accessed").iterator():
+        if total <= max_bytes:
+            break
+        total -= artifact.size
+        artifact.delete()
+        logger.info(f"Evicted cached {artifact.kind} for dataset ID={artifact.dataset_id}")
+
+
+def artifact_response(request, artifact, content_type, filename):
+    """
+    Serve an artifact as a file download with its ETag.
+    Returns 304 when the client already has this version (If-None-Match).
+    Tags compare weakly: CompressionMiddleware sends the ETag as W/"..."
+    when it compresses the file.
+    Raises FileNotFoundError if the file was evicted since the artifact was looked up.
+    """
+    if_none_match = request.headers.get("If-None-Match")
+    known = [etag.removeprefix("W/") for etag in parse_etags(if_none_match)] if if_none_match else []
+    if artifact.etag in known or (if_none_match and if_none_match.strip() == "*"):
+        response = HttpResponseNotModified()
+    else:
+        response = FileResponse(
+            open(artifact.path, "rb"),
+            as_attachment=True,
+            filename=filename,
+            content_type=content_type,
+        )
+    response["ETag"] = artifact.etag
+    # Clients may keep a copy but must revalidate it (cheap: 304 without a body)
+    response["Cache-Control"] = "private, no-cache"
+    return response
@@ -0,0 +1,186 @@
+# Matplotlib charts for the PDF report
+# It should NOT contain Django or HTTP code
+#
+# Only the object-oriented API is used (Figure + FigureCanvasAgg, never pyplot),
+# so there is no global figure state: charts can render on several threads at
+# once (gthread workers, the export pre-render pool) as long as each figure is
+# used by one thread at a time, which FigurePool guarantees.
+import io
+import queue
+from contextlib import contextmanager
+
+from .scatter_sampling import DEFAULT_MAX_POINTS, plan_scatter
+
+# Idle figures kept per chart template
+POOL_SIZE = 2
+
+
+def _new_figure(figsize=None):
+    # Lazy import: matplotlib only loads when a chart is drawn (or on warm-up)
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)  # Non-GUI Agg canvas, attached to this figure only
+    ax = fig.subplots()
+    return fig, ax
+
+
+def _save(fig):
+    buffer = io.BytesIO()  # Creates an in-memory file, No temp files on disk
+    fig.savefig(buffer, format="png", bbox_inches="tight")
+    buffer.seek(0)
+    return buffer
+
+
+def _clear_bars(ax):
+    for container in list(ax.containers):
+        container.remove()
+
+
+class TypeDistributionChart:
+    """Bar chart of equipment count per type"""
+
+    def __init__(self):
+        self.fig, self.ax = _new_figure()
+        self.ax.set_title("Equipment Type Distribution")
+        self.ax.set_xlabel("Equipment Type")
+        self.ax.set_ylabel("Count")
+
+    def render(self, type_distribution):
+        _clear_bars(self.ax)
+        positions = range(len(type_distribution))
+        # Explicit colour: each bar() call would otherwise advance the axes' colour cycle
+        self.ax.bar(positions, list(type_distribution.values()), color="C0")
+        self.ax.set_xticks(positions, [str(name) for name in type_distribution])
+        self.ax.relim()
+        self.ax.autoscale_view()
+        return _save(self.fig)
+
+
+class ScatterChart:
+    """
+    Pressure vs temperature scatter, coloured by health score.
+    Large datasets are drawn as a hexbin density with the outliers and
+    high-risk points overlaid (see scatter_sampling.plan_scatter).
+    """
+
+    def __init__(self):
+        self.fig, self.ax = _new_figure(figsize=(8, 6))
+        self.ax.set_xlabel("Pressure")
+        self.ax.set_ylabel("Temperature")
+        self.ax.set_title("Pressure vs Temperature Correlation")
+        self.points = self.ax.scatter([], [], c=[], cmap='RdYlGn', s=100, alpha=0.6, zorder=2)
+        self.fig.colorbar(self.points, ax=self.ax, label="Health Score")
+        self.density = None
+        self.note = self.ax.text(0.01, 0.99, "", transform=self.ax.transAxes, va="top", fontsize=8, color="dimgray")
+
+    def render(self, pressures, temperatures, health_scores, outlier_rows=(), max_points=DEFAULT_MAX_POINTS):
+        import numpy as np
+
+        plan = plan_scatter(pressures, temperatures, health_scores, outlier_rows, max_points)
+        if self.density is not None:
+            self.density.remove()
+            self.density = None
+
+        if plan["dense"]:
+            # Density cost depends on the grid, not on how many markers there are
+            self.density = self.ax.hexbin(
+                plan["x"], plan["y"], gridsize=60, cmap="Greys", bins="log", mincnt=1, zorder=1
+            )
+            shown = (plan["highlight_x"], plan["highlight_y"], plan["highlight_scores"])
+            self.points.set_sizes([12])
+            self.note.set_text(
+                f"{len(plan['x'])} points shown as density; outliers and high-risk equipment overlaid"
+            )
+        else:
+            shown = (plan["x"], plan["y"], plan["scores"])
+            self.points.set_sizes([100])
+            self.note.set_text("")
+
+        self.points.set_offsets(np.column_stack(shown[:2]))
+        self.points.set_array(shown[2])
+        # Colour scale spans every score, so overlaid points keep their usual colours
+        if len(plan["scores"]):
+            self.points.set_clim(plan["scores"].min(), plan["scores"].max())
+
+        self.ax.ignore_existing_data_limits = True
+        self.ax.update_datalim(np.column_stack([plan["x"], plan["y"]]))
+        self.ax.autoscale_view()
+        return _save(self.fig)
+
+
+class HealthBarChart:
+    """Horizontal bars of health score, coloured by band"""
+
+    def __init__(self):
+        self.fig, self.ax = _new_figure(figsize=(8, 6))
+        self.ax.set_xlabel("Health Score")
+        self.ax.set_title("Equipment Health Scores (Top 10)")
+        self.ax.set_xlim(0, 100)
+
+    def render(self, names, scores):
+        _clear_bars(self.ax)
+        colors_list = ['green' if s >= 85 else 'orange' if s >= 70 else 'red' for s in scores]
+        positions = range(len(names))
+        self.ax.barh(positions, scores, color=colors_list)
+        self.ax.set_yticks(positions, names)
+        self.ax.set_xlim(0, 100)
+        self.ax.relim()
+        self.ax.autoscale_view(scalex=False)
+        return _save(self.fig)
+
+
+class FigurePool:
+    """
+    Reusable chart figures of one template.
+    Building a figure (axes, ticks, colorbar, fonts) costs more than drawing
+    data into it, so a render takes an idle figure, swaps the data and saves.
+    """
+
+    def __init__(self, template, size=POOL_SIZE):
+        self.template = template
+        self._idle = queue.LifoQueue(maxsize=size)
+
+    @contextmanager
+    def chart(self):
+        try:
+            chart = self._idle.get_nowait()
+        except queue.Empty:
+            chart = self.template()
+        yield chart
+        # Only returned after a successful render; a failed one may be half-drawn
+        try:
+            self._idle.put_nowait(chart)
+        except queue.Full:
+            pass
+
+
+type_distribution_pool = FigurePool(TypeDistributionChart)
+scatter_pool = FigurePool(ScatterChart)
+health_pool = FigurePool(HealthBarChart)
+
+
+def render_type_distribution(type_distribution):
+    with type_distribution_pool.chart() as chart:
+        return chart.render(type_distribution)
+
+
+def render_scatter(pressures, temperatures, health_scores, outlier_rows=(), max_points=DEFAULT_MAX_POINTS):
+    with scatter_pool.chart() as chart:
+        return chart.render(pressures, temperatures, health_scores, outlier_rows, max_points)
+
+
+def render_health_bars(names, scores):
+    with health_pool.chart() as chart:
+        return chart.render(names, scores)
+
+
+def warm_up():
+    """
+    Load matplotlib and the Agg canvas, build the font cache and
+    pre-fill each figure pool, so the first PDF does not pay for it.
+    """
+    render_type_distribution({"Pump": 2, "Valve": 1})
+    render_scatter([1.0, 2.0], [100.0, 120.0], [90.0, 60.0])
+    render_health_bars(["P-1", "V-1"], [90.0, 60.0])
@@ -1,16 +1,39 @@
 import csv
 import io
+import itertools
+import tempfile
 
+# Equipment/outlier rows per yielded chunk
+CSV_BATCH_ROWS = 1000
 
-def generate_csv(dataset):
+# Bytes per chunk read back from a spooled export file
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+
+def iter_spooled(write, chunk_size=EXPORT_CHUNK_BYTES):
+    """Call write(file) on a temp file, then yield the file back in chunks"""
+    with tempfile.TemporaryFile() as spool:
+        write(spool)
+        spool.seek(0)
+        while chunk := spool.read(chunk_size):
+            yield chunk
+
+
+def iter_csv(dataset, batch_rows=CSV_BATCH_ROWS):
     """
     Generates a comprehensive CSV export with equipment data and analytics.
-    Returns CSV bytes.
+    Yields UTF-8 encoded chunks of about batch_rows rows; equipment rows are
+    read from the database incrementally, so memory does not grow with the dataset.
     """
-    import pandas as pd  # LAZY IMPORT - only load when export runs
     buffer = io.StringIO()
     writer = csv.writer(buffer)
 
+    def flush():
+        chunk = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+        return chunk
+
     # ========== SUMMARY SECTION ==========
     writer.writerow(["CHEMICAL EQUIPMENT VISUALIZER - ANALYSIS REPORT"])
     writer.writerow([])
@@ -64,7 +87,8 @@ def generate_csv(dataset):
     # Equipment details with health scores
     writer.writerow(["EQUIPMENT DETAILS"])
     writer.writerow(["Equipment Name", "Type", "Flowrate", "Pressure", "Temperature", "Health Score", "Risk Level"])
-    for eq in dataset.equipment_data:
+    yield flush()  # headers go out before the first equipment query
+    for i, eq in enumerate(dataset.iter_equipment(), start=1):
         writer.writerow([
             eq['name'],
             eq['type'],
@@ -74,30 +98,38 @@ def generate_csv(dataset):
             eq['health_score'],
             eq['risk']
         ])
+        if i % batch_rows == 0:
+            yield flush()
     writer.writerow([])
 
     # Outliers
-    if dataset.outliers:
-        writer.writerow(["OUTLIERS"])
-        writer.writerow(["Equipment Name", "Type", "Flowrate", "Pressure", "Temperature", "Health Score", "Risk"])
-        for outlier in dataset.outliers:
-            params = outlier['parameters']
-            writer.writerow([
-                outlier['equipment_name'],
-                outlier['type'],
-                params['flowrate'],
-                params['pressure'],
-                params['temperature'],
-                outlier['health_score'],
-                outlier['risk']
-            ])
+    outlier_rows = 0
+    for outlier in dataset.iter_outliers():
+        if outlier_rows == 0:
+            writer.writerow(["OUTLIERS"])
+            writer.writerow(["Equipment Name", "Type", "Flowrate", "Pressure", "Temperature", "Health Score", "Risk"])
+        params = outlier['parameters']
+        writer.writerow([
+            outlier['equipment_name'],
+            outlier['type'],
+            params['flowrate'],
+            params['pressure'],
+            params['temperature'],
+            outlier['health_score'],
+            outlier['risk']
+        ])
+        outlier_rows += 1
+        if outlier_rows % batch_rows == 0:
+            yield flush()
+    if outlier_rows:
         writer.writerow([])
 
     # Top performers
-    if dataset.efficiency_ranking:
+    top_performers = dataset.top_ranked(10)
+    if top_performers:
         writer.writerow(["TOP PERFORMERS"])
         writer.writerow(["Rank", "Equipment Name", "Type", "Health Score", "Status"])
-        for item in dataset.efficiency_ranking[:10]:
+        for item in top_performers:
             writer.writerow([
                 item['rank'],
                 item['equipment_name'],
@@ -106,10 +138,18 @@ def generate_csv(dataset):
                 item['status']
             ])
 
-    return buffer.getvalue().encode("utf-8")
+    yield flush()
 
 
-def generate_excel(dataset):
+def generate_csv(dataset):
+    """
+    Generates a comprehensive CSV export with equipment data and analytics.
+    Returns CSV bytes (see iter_csv for the streaming form).
+    """
+    return b"".join(iter_csv(dataset))
+
+
+def iter_excel(dataset, chunk_size=EXPORT_CHUNK_BYTES):
     """
     Generates an Excel file with multiple sheets:
     - Sheet 1: Summary
@@ -117,92 +157,93 @@ def generate_excel(dataset):
     - Sheet 3: Equipment Details
     - Sheet 4: Type Distribution
     - Sheet 5: Efficiency Ranking
-    - Sheet 6: Outliers
-    Returns Excel bytes.
+    - Sheet 6: Outliers (only when there are any)
+    The workbook is write-only: rows go from the database iterators straight
+    to openpyxl's on-disk sheet buffers, and the finished file is spooled to a
+    temp file and yielded in chunks of chunk_size bytes.
     """
-    import pandas as pd  # LAZY IMPORT - only load when export runs
-    from openpyxl.styles import Font, PatternFill, Alignment
+    # LAZY IMPORT - only load when export runs
     from openpyxl import Workbook
-    
-    output = io.BytesIO()
+
+    workbook = Workbook(write_only=True)
+
+    def add_sheet(title, headers, rows):
+        # Like the pandas export, a sheet without rows is left blank (no header)
+        sheet = workbook.create_sheet(title)
+        for i, row in enumerate(rows):
+            if i == 0:
+                sheet.append(headers)
+            sheet.append(row)
 
     # Sheet 1: Summary
-    summary_df = pd.DataFrame({
-        "Metric": [
-            "Total Equipment",
-            "Average Flowrate",
-            "Average Pressure",
-            "Average Temperature",
-            "Average Health Score",
-            "High Risk Equipment",
-            "Medium Risk Equipment",
-            "Low Risk Equipment",
-            "Outliers Detected"
-        ],
-        "Value": [
-            dataset.total_equipment,
-            dataset.avg_flowrate,
-            dataset.avg_pressure,
-            dataset.avg_temperature,
-            dataset.avg_health_score,
-            dataset.risk_summary.get('high_risk', 0),
-            dataset.risk_summary.get('medium_risk', 0),
-            dataset.risk_summary.get('low_risk', 0),
-            dataset.outlier_count
-        ]
-    })
+    risk = dataset.risk_summary
+    add_sheet("Summary", ["Metric", "Value"], [
+        ["Total Equipment", dataset.total_equipment],
+        ["Average Flowrate", dataset.avg_flowrate],
+        ["Average Pressure", dataset.avg_pressure],
+        ["Average Temperature", dataset.avg_temperature],
+        ["Average Health Score", dataset.avg_health_score],
+        ["High Risk Equipment", risk.get('high_risk', 0)],
+        ["Medium Risk Equipment", risk.get('medium_risk', 0)],
+        ["Low Risk Equipment", risk.get('low_risk', 0)],
+        ["Outliers Detected", dataset.outlier_count],
+    ])
 
     # Sheet 2: Statistical Analysis
     stats = dataset.statistics
-    stats_data = []
+    stats_rows = []
     for param_name in ['flowrate', 'pressure', 'temperature']:
         param_data = stats.get(param_name, {})
-        stats_data.append({
-            'Parameter': param_name.capitalize(),
-            'Min': param_data.get('min', 'N/A'),
-            'Max': param_data.get('max', 'N/A'),
-            'Median': param_data.get('median', 'N/A'),
-            'Std Dev': param_data.get('std', 'N/A'),
-            'Mean': param_data.get('mean', 'N/A')
-        })
-    stats_df = pd.DataFrame(stats_data)
+        stats_rows.append([
+            param_name.capitalize(),
+            param_data.get('min', 'N/A'),
+            param_data.get('max', 'N/A'),
+            param_data.get('median', 'N/A'),
+            param_data.get('std', 'N/A'),
+            param_data.get('mean', 'N/A'),
+        ])
+    add_sheet("Statistics", ["Parameter", "Min", "Max", "Median", "Std Dev", "Mean"], stats_rows)
 
     # Sheet 3: Equipment Details
-    equipment_df = pd.DataFrame(dataset.equipment_data)
+    equipment_columns = ['name', 'type', 'flowrate', 'pressure', 'temperature', 'health_score', 'risk']
+    add_sheet("Equipment Details", equipment_columns, (
+        [eq[column] for column in equipment_columns] for eq in dataset.iter_equipment()
+    ))
 
     # Sheet 4: Type Distribution
-    type_df = pd.DataFrame(
-        list(dataset.type_distribution.items()),
-        columns=["Equipment Type", "Count"]
-    )
+    add_sheet("Type Distribution", ["Equipment Type", "Count"], (
+        [eq_type, count] for eq_type, count in dataset.type_distribution.items()
+    ))
 
     # Sheet 5: Efficiency Ranking
-    ranking_df = pd.DataFrame(dataset.efficiency_ranking)
+    ranking_columns = ['rank', 'equipment_name', 'type', 'health_score', 'status']
+    add_sheet("Efficiency Ranking", ranking_columns, (
+        [item[column] for column in ranking_columns] for item in dataset.iter_ranking()
+    ))
 
     # Sheet 6: Outliers
-    outlier_data = []
-    for outlier in dataset.outliers:
-        params = outlier['parameters']
-        outlier_data.append({
-            'Equipment Name': outlier['equipment_name'],
-            'Type': outlier['type'],
-            'Flowrate': params['flowrate'],
-            'Pressure': params['pressure'],
-            'Temperature': params['temperature'],
-            'Health Score': outlier['health_score'],
-            'Risk': outlier['risk']
-        })
-    outliers_df = pd.DataFrame(outlier_data) if outlier_data else pd.DataFrame()
-
-    # Write to Excel
-    with pd.ExcelWriter(output, engine="openpyxl") as writer:
-        summary_df.to_excel(writer, index=False, sheet_name="Summary")
-        stats_df.to_excel(writer, index=False, sheet_name="Statistics")
-        equipment_df.to_excel(writer, index=False, sheet_name="Equipment Details")
-        type_df.to_excel(writer, index=False, sheet_name="Type Distribution")
-        ranking_df.to_excel(writer, index=False, sheet_name="Efficiency Ranking")
-        if not outliers_df.empty:
-            outliers_df.to_excel(writer, index=False, sheet_name="Outliers")
-
-    output.seek(0)
-    return output.read()
+    outliers = dataset.iter_outliers()
+    first = next(outliers, None)
+    if first is not None:
+        add_sheet("Outliers", ["Equipment Name", "Type", "Flowrate", "Pressure", "Temperature", "Health Score", "Risk"], (
+            [
+                outlier['equipment_name'],
+                outlier['type'],
+                outlier['parameters']['flowrate'],
+                outlier['parameters']['pressure'],
+                outlier['parameters']['temperature'],
+                outlier['health_score'],
+                outlier['risk'],
+            ]
+            for outlier in itertools.chain([first], outliers)
+        ))
+
+    yield from iter_spooled(workbook.save, chunk_size)
+
+
+def generate_excel(dataset):
+    """
+    Generates the Excel export (see iter_excel).
+    Returns Excel bytes.
+    """
+    return b"".join(iter_excel(dataset))
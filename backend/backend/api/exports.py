@@ -0,0 +1,310 @@
+"""
+Rendered exports (PDF, CSV, Excel, Parquet, Arrow) backed by the ReportArtifact cache.
+
+Right after an upload, prerender_exports() renders every format on a small
+background thread pool, so the export views usually find a finished
+artifact. Renders are single-flight: a request for an export that is already
+being rendered waits for that render instead of starting a second one -
+on a Future within the process, and on an ArtifactLock across worker
+processes - and then serves the artifact it produced. Renders, including
+streamed ones, run under admission control (admission.render_gate), and
+interactive requests waiting for another's render hold a place in its queue.
+"""
+
+import logging
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from functools import partial
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.http import StreamingHttpResponse
+
+from . import admission, arrow_utils, chart_utils, export_utils, pdf_utils, scatter_sampling, vector_charts
+from .arrow_utils import iter_arrow, iter_parquet
+from .artifacts import ArtifactLock, artifact_response, get_artifact, renderer_version, store_artifact, tee_artifact
+from .export_utils import iter_csv, iter_excel
+from .models import Dataset, ReportArtifact
+from .pdf_utils import generate_pdf
+
+logger = logging.getLogger('api')
+
+# A streamed export is buffered in memory up to this size, then in a temporary file
+SPOOL_MEMORY_BYTES = 1024 * 1024
+# Largest piece of the buffer sent to the client at once
+SPOOL_READ_BYTES = 64 * 1024
+
+EXPORTS = {
+    "pdf": {
+        "render": partial(generate_pdf, scatter_max_points=settings.SCATTER_MAX_POINTS),
+        "version": renderer_version(
+            pdf_utils, chart_utils, scatter_sampling, options=f"scatter_max_points={settings.SCATTER_MAX_POINTS}"
+        ),
+        "content_type": "application/pdf",
+        "filename": "equipment_report.pdf",
+    },
+    # ?charts=vector: native ReportLab charts; rendered on request only
+    "pdf-vector": {
+        "render": partial(generate_pdf, charts="vector", scatter_max_points=settings.SCATTER_MAX_POINTS),
+        "version": renderer_version(
+            pdf_utils, vector_charts, scatter_sampling, options=f"scatter_max_points={settings.SCATTER_MAX_POINTS}"
+        ),
+        "content_type": "application/pdf",
+        "filename": "equipment_report.pdf",
+        "prerender": False,
+    },
+    # Streamed to the client while it renders (see stream_export)
+    "csv": {
+        "render": iter_csv,
+        "version": renderer_version(export_utils),
+        "content_type": "text/csv",
+        "filename": "equipment_summary.csv",
+    },
+    "xlsx": {
+        "render": iter_excel,
+        "version": renderer_version(export_utils),
+        "content_type": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        "filename": "equipment_summary.xlsx",
+    },
+    # Typed equipment table for pandas/DuckDB; rendered on request only
+    "parquet": {
+        "render": iter_parquet,
+        "version": renderer_version(arrow_utils),
+        "content_type": "application/vnd.apache.parquet",
+        "filename": "equipment.parquet",
+        "prerender": False,
+    },
+    "arrow": {
+        "render": iter_arrow,
+        "version": renderer_version(arrow_utils),
+        "content_type": "application/vnd.apache.arrow.file",
+        "filename": "equipment.arrow",
+        "prerender": False,
+    },
+}
+
+# (dataset id, kind, version) -> Future of the render in progress
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_or_render(dataset, kind, priority=admission.INTERACTIVE):
+    """
+    Return the cached artifact for dataset, rendering it (once) if needed.
+    Raises admission.Overloaded when the render queue is full.
+    """
+    export = EXPORTS[kind]
+    artifact = get_artifact(dataset.id, kind, export["version"])
+    if artifact:
+        return artifact
+
+    key = (dataset.id, kind, export["version"])
+    with _in_flight_lock:
+        future = _in_flight.get(key)
+        owner = future is None
+        if owner:
+            future = _in_flight[key] = Future()
+
+    gate = admission.render_gate
+    if not owner:
+        logger.info(f"Waiting for in-flight {kind} render of dataset ID: {dataset.id}")
+        # The owner may be a queued background pre-render: wait no longer than for a slot
+        timeout = gate.queue_timeout if priority == admission.INTERACTIVE else None
+        with gate.queue_place(priority):
+            try:
+                return future.result(timeout)
+            except FutureTimeout:
+                logger.warning(f"Gave up waiting for in-flight {kind} render of dataset ID: {dataset.id}")
+                raise admission.Overloaded(gate.retry_after)
+
+    # Only the owning thread takes the cross-process lock; the others wait on its Future
+    lock = ArtifactLock(dataset.id, kind)
+    try:
+        with gate.queue_place(priority):
+            acquired = lock.acquire(settings.EXPORT_RENDER_LOCK_TIMEOUT)
+        if not acquired:
+            logger.warning(f"Timed out waiting for another process's {kind} render of dataset ID: {dataset.id}")
+        # Re-check: another thread or process may have finished it while we waited
+        artifact = get_artifact(dataset.id, kind, export["version"])
+        if artifact is None:
+            with gate.slot(priority):
+                artifact = store_artifact(dataset.id, kind, export["version"], export["render"](dataset))
+        future.set_result(artifact)
+        return artifact
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        lock.release()
+        with _in_flight_lock:
+            del _in_flight[key]
+
+
+def export_response(request, artifact, kind):
+    """File response (or 304) for an export artifact"""
+    export = EXPORTS[kind]
+    try:
+        return artifact_response(request, artifact, export["content_type"], export["filename"])
+    except FileNotFoundError:
+        # Evicted (by another thread or process) between the lookup and open(): render it again
+        logger.info(f"Cached {kind} for dataset ID: {artifact.dataset_id} vanished, rendering it again")
+        ReportArtifact.objects.filter(id=artifact.id).delete()
+        artifact = get_or_render(artifact.dataset, kind)
+        return artifact_response(request, artifact, export["content_type"], export["filename"])
+
+
+def stream_export(request, dataset, kind):
+    """
+    Serve the cached artifact if there is one. Otherwise stream the export
+    as it renders - the first bytes go out before the equipment rows are
+    read - and cache it on the way through. The render runs on its own
+    thread, buffered through a _Spool, so it holds the ArtifactLock only
+    until the artifact is stored, however slowly the client downloads.
+    """
+    export = EXPORTS[kind]
+    artifact = get_artifact(dataset.id, kind, export["version"])
+    if artifact:
+        return export_response(request, artifact, kind)
+
+    # Someone (this process or another) is already rendering it: wait and share the result
+    lock = ArtifactLock(dataset.id, kind)
+    if not lock.acquire(timeout=0):
+        return export_response(request, get_or_render(dataset, kind), kind)
+    artifact = get_artifact(dataset.id, kind, export["version"])
+    if artifact:
+        lock.release()
+        return export_response(request, artifact, kind)
+
+    # The render thread gives the slot back when it is done
+    gate = admission.render_gate
+    try:
+        gate.acquire()
+    except admission.Overloaded:
+        lock.release()
+        raise
+    spool = _Spool()
+    try:
+        threading.Thread(
+            target=_render_to_spool, args=(lock, gate, dataset, kind, spool), name=f"stream-{kind}", daemon=True
+        ).start()
+    except BaseException:
+        gate.release()
+        lock.release()
+        raise
+    response = StreamingHttpResponse(spool, content_type=export["content_type"])
+    response["Content-Disposition"] = f'attachment; filename="{export["filename"]}"'
+    return response
+
+
+def _render_to_spool(lock, gate, dataset, kind, spool):
+    """Render an export into the cache and the spool, then release its slot and lock (a stream_export thread)"""
+    export = EXPORTS[kind]
+    try:
+        for chunk in tee_artifact(dataset.id, kind, export["version"], export["render"](dataset)):
+            spool.write(chunk)
+    except Exception as e:
+        logger.error(f"Streaming {kind} export failed for dataset ID: {dataset.id}", exc_info=True)
+        spool.finish(e)
+    else:
+        spool.finish()
+    finally:
+        gate.release()
+        lock.release()
+        # The thread ends here, so its connection is never reused
+        connection.close()
+
+
+class _Spool:
+    """
+    Chunks of a streamed export, passed from the thread rendering it to the
+    response sending it. The render never waits for the client: what the
+    client has not read yet is buffered (in a temporary file past
+    SPOOL_MEMORY_BYTES). If the client goes away the buffer is dropped and
+    the render carries on into the cache.
+    """
+
+    def __init__(self):
+        self._buffer = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES)
+        self._size = 0
+        self._done = False
+        self._error = None
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def write(self, chunk):
+        with self._cond:
+            if self._closed:
+                return
+            self._buffer.seek(self._size)
+            self._buffer.write(chunk)
+            self._size += len(chunk)
+            self._cond.notify_all()
+
+    def finish(self, error=None):
+        """The render is over; error (if any) is raised to the client after the bytes sent so far"""
+        with self._cond:
+            self._done = True
+            self._error = error
+            self._cond.notify_all()
+
+    def close(self):
+        """Called by the response when it is closed, also mid-stream"""
+        with self._cond:
+            self._closed = True
+            self._buffer.close()
+
+    def __iter__(self):
+        offset = 0
+        while True:
+            with self._cond:
+                while offset == self._size and not self._done:
+                    self._cond.wait()
+                if offset == self._size:
+                    if self._error is not None:
+                        raise self._error
+                    return
+                self._buffer.seek(offset)
+                chunk = self._buffer.read(min(self._size - offset, SPOOL_READ_BYTES))
+            offset += len(chunk)
+            yield chunk
+
+
+def _prerender(dataset_id, kind):
+    close_old_connections()
+    try:
+        get_or_render(Dataset.objects.get(id=dataset_id), kind, priority=admission.BACKGROUND)
+        logger.info(f"Pre-rendered {kind} for dataset ID: {dataset_id}")
+    except Exception:
+        logger.error(f"Pre-rendering {kind} failed for dataset ID: {dataset_id}", exc_info=True)
+    finally:
+        close_old_connections()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.EXPORT_PRERENDER_WORKERS, thread_name_prefix="export-prerender"
+            )
+    return _executor
+
+
+def prerender_exports(dataset_id):
+    """Render the export formats for a dataset in the background; returns the futures"""
+    executor = _get_executor()
+    return [
+        executor.submit(_prerender, dataset_id, kind)
+        for kind, export in EXPORTS.items()
+        if export.get("prerender", True)
+    ]
+
+
+def schedule_prerender(dataset_id):
+    """Post-upload hook: pre-render exports once the new Dataset is committed"""
+    if settings.EXPORT_PRERENDER:
+        transaction.on_commit(lambda: prerender_exports(dataset_id))
@@ -1,12 +1,19 @@
 """
 Simple healthcheck endpoint for Railway deployment.
 Railway needs a GET endpoint that returns 200 to know app is healthy.
+Also serves the Prometheus metrics of this process.
 """
 
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework import permissions
 
+from .metrics import REGISTRY
+
 
 @api_view(["GET"])
 @permission_classes([permissions.AllowAny])
@@ -17,3 +24,21 @@ def healthcheck(request):
     Railway uses this to verify app is running.
     """
     return Response({"status": "healthy"})
+
+
+@api_view(["GET"])
+@permission_classes([permissions.AllowAny])
+def metrics(request):
+    """
+    Request, error, latency and pipeline stage metrics in the Prometheus text format.
+    Values are per process. Protected by METRICS_TOKEN when it is set;
+    otherwise only admin users may read them (anyone, with DEBUG on).
+    """
+    token = settings.METRICS_TOKEN
+    if token:
+        given = request.META.get("HTTP_AUTHORIZATION", "").encode()
+        if not hmac.compare_digest(given, f"Bearer {token}".encode()):
+            return Response({"error": "Invalid metrics token"}, status=401)
+    elif not (settings.DEBUG or request.user.is_staff):
+        return Response({"error": "Metrics are only available to admin users"}, status=403)
+    return HttpResponse(REGISTRY.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,221 @@
+"""
+DB-backed queue for background upload analysis.
+
+upload/?async=true spools the CSV to JOB_UPLOAD_DIR and inserts a queued
+AnalysisJob. A JobWorker (started with the web server process, or run on
+its own with `manage.py run_analysis_worker`) claims queued jobs, runs the
+CSV analysis in a process pool and stores the resulting Dataset.
+
+Claiming is a conditional UPDATE (queued -> running), so any number of
+workers, in any number of processes, can poll the same table safely.
+A running job's heartbeat is renewed every ANALYSIS_JOB_HEARTBEAT_SECONDS;
+when its worker dies the heartbeat stops, and after ANALYSIS_JOB_LEASE_SECONDS
+the job is queued again (or failed, with its spooled upload deleted, once
+it has been claimed ANALYSIS_JOB_MAX_ATTEMPTS times).
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .exports import schedule_prerender
+from .models import AnalysisJob, create_dataset
+from .utils import analyze_path, discard_spill
+
+logger = logging.getLogger('api')
+
+# Progress milestones (percent); record writing fills the rest up to 100
+PROGRESS_RUNNING = 5
+PROGRESS_ANALYZED = 60
+
+
+def enqueue_upload(file, mode, content_hash):
+    """Spool the uploaded file to disk and queue an AnalysisJob for it"""
+    os.makedirs(settings.JOB_UPLOAD_DIR, exist_ok=True)
+    path = os.path.join(settings.JOB_UPLOAD_DIR, f"{uuid.uuid4().hex}.csv")
+    file.seek(0)
+    with open(path, "wb") as spool:
+        for block in file.chunks():
+            spool.write(block)
+
+    job = AnalysisJob.objects.create(name=file.name, mode=mode, content_hash=content_hash, file_path=path)
+    logger.info(f"Analysis job queued: ID={job.id}, Name={file.name}")
+    if settings.ANALYSIS_JOB_AUTOSTART:
+        get_worker().wake()
+    return job
+
+
+def claim_next_job():
+    """Atomically move the oldest queued job to running; None if the queue is empty"""
+    for job_id in AnalysisJob.objects.filter(status=AnalysisJob.QUEUED).order_by("created_at").values_list("id", flat=True)[:10]:
+        claimed = AnalysisJob.objects.filter(id=job_id, status=AnalysisJob.QUEUED).update(
+            status=AnalysisJob.RUNNING,
+            progress=PROGRESS_RUNNING,
+            attempts=F("attempts") + 1,
+            heartbeat_at=timezone.now(),
+        )
+        if claimed:
+            return AnalysisJob.objects.get(id=job_id)
+    return None
+
+
+def heartbeat(job_id, **fields):
+    """Renew a running job's lease (and update fields, e.g. progress)"""
+    AnalysisJob.objects.filter(id=job_id).update(heartbeat_at=timezone.now(), **fields)
+
+
+def recover_stale_jobs():
+    """
+    Queue running jobs whose worker stopped renewing their heartbeat again,
+    or fail them (deleting the spooled upload) after ANALYSIS_JOB_MAX_ATTEMPTS.
+    Returns the number of jobs recovered.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.ANALYSIS_JOB_LEASE_SECONDS)
+    # No heartbeat at all: claimed before heartbeats existed
+    stale = AnalysisJob.objects.filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True), status=AnalysisJob.RUNNING
+    )
+    recovered = 0
+    for job in stale.only("id", "attempts", "file_path", "heartbeat_at"):
+        # Conditional on the heartbeat we saw: a worker renewing it meanwhile keeps the job
+        still_stale = AnalysisJob.objects.filter(id=job.id, status=AnalysisJob.RUNNING, heartbeat_at=job.heartbeat_at)
+        if job.attempts >= settings.ANALYSIS_JOB_MAX_ATTEMPTS:
+            if still_stale.update(status=AnalysisJob.FAILED, error="The analysis worker stopped while running this job"):
+                logger.error(f"Analysis job failed after {job.attempts} attempts: ID={job.id}")
+                if os.path.exists(job.file_path):
+                    os.remove(job.file_path)
+                recovered += 1
+        elif still_stale.update(status=AnalysisJob.QUEUED, progress=0):
+            logger.warning(f"Analysis job requeued, its worker stopped: ID={job.id}")
+            recovered += 1
+    return recovered
+
+
+def run_job(job, executor=None):
+    """
+    Analyze a claimed job and store its Dataset.
+    The analysis runs in executor (a process pool) when given, inline otherwise.
+    """
+    analysis = None
+    try:
+        args = (job.file_path, job.mode, settings.CSV_CHUNK_ROWS, settings.CSV_SPILL_DIR)
+        if executor:
+            future = executor.submit(analyze_path, *args)
+            while True:
+                try:
+                    analysis = future.result(timeout=settings.ANALYSIS_JOB_HEARTBEAT_SECONDS)
+                    break
+                except FutureTimeout:
+                    heartbeat(job.id)
+        else:
+            analysis = analyze_path(*args)
+        heartbeat(job.id, progress=PROGRESS_ANALYZED)
+
+        def record_progress(fraction):
+            heartbeat(job.id, progress=PROGRESS_ANALYZED + int((99 - PROGRESS_ANALYZED) * fraction))
+
+        dataset = create_dataset(
+            job.name,
+            job.mode,
+            job.content_hash,
+            analysis,
+            batch_size=settings.EQUIPMENT_BATCH_SIZE,
+            progress=record_progress,
+        )
+        AnalysisJob.objects.filter(id=job.id).update(status=AnalysisJob.DONE, progress=100, dataset=dataset)
+        schedule_prerender(dataset.id)
+        logger.info(f"Analysis job finished: ID={job.id}, Dataset ID={dataset.id}")
+    except Exception as e:
+        logger.error(f"Analysis job failed: ID={job.id}", exc_info=True)
+        AnalysisJob.objects.filter(id=job.id).update(status=AnalysisJob.FAILED, error=str(e))
+    finally:
+        discard_spill(analysis)  # exact mode: if storing never started
+        if os.path.exists(job.file_path):
+            os.remove(job.file_path)
+
+
+class JobWorker:
+    """
+    ANALYSIS_WORKERS dispatcher threads sharing one process pool.
+    Each thread claims a job, waits for its analysis and stores the result;
+    threads sleep until woken by enqueue_upload or the poll interval passes.
+    """
+
+    def __init__(self, workers=None, poll_interval=None):
+        self.workers = workers or settings.ANALYSIS_WORKERS
+        self.poll_interval = poll_interval or settings.ANALYSIS_JOB_POLL_SECONDS
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self.executor = None
+
+    def start(self):
+        # spawn: forking a process that already runs threads and holds DB connections is unsafe
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._loop, name=f"analysis-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Analysis worker started with {self.workers} processes")
+
+    def wake(self):
+        self._wakeup.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join()
+        self.executor.shutdown()
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            close_old_connections()
+            try:
+                recover_stale_jobs()
+                job = claim_next_job()
+            except Exception:
+                logger.error("Analysis worker could not poll the job queue", exc_info=True)
+                job = None
+            if job:
+                run_job(job, self.executor)
+                continue
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_worker():
+    """The in-process JobWorker, started on first use"""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = JobWorker()
+            _worker.start()
+    return _worker
+
+
+def autostart_worker():
+    """
+    Start the in-process worker with the server (wsgi.py / asgi.py) when
+    ANALYSIS_JOB_AUTOSTART is on, so jobs left queued or stranded by a
+    restart are picked up without waiting for the next upload.
+    """
+    if settings.ANALYSIS_JOB_AUTOSTART:
+        get_worker()
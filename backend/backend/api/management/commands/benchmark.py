@@ -0,0 +1,327 @@
+import io
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+import tracemalloc
+
+from unittest import mock
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from api.utils import (
+    analyze_csv,
+    analyze_csv_exact,
+    analyze_csv_stream,
+    calculate_health_score,
+    calculate_health_scores,
+    discard_spill,
+    iter_equipment_rows,
+    read_equipment_csv,
+)
+
+
+EQUIPMENT_TYPES = ["Pump", "Valve", "Compressor", "HeatExchanger", "Reactor", "Condenser"]
+
+
+def make_synthetic_csv(rows, extra_columns=0, seed=42):
+    """
+    Build an in-memory CSV shaped like a plant export.
+    extra_columns adds unused tag/comment columns to mimic wide historian files.
+    """
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    data = {
+        "Equipment Name": [f"EQ-{i:07d}" for i in range(rows)],
+        "Type": rng.choice(EQUIPMENT_TYPES, size=rows),
+        "Flowrate": rng.normal(120, 30, size=rows).round(2),
+        "Pressure": rng.normal(6, 1.5, size=rows).round(2),
+        "Temperature": rng.normal(118, 15, size=rows).round(2),
+    }
+    for i in range(extra_columns):
+        data[f"Tag {i}"] = rng.integers(0, 10_000, size=rows)
+
+    buffer = io.BytesIO()
+    pd.DataFrame(data).to_csv(buffer, index=False)
+    buffer.seek(0)
+    return buffer
+
+
+def _stats_for(df):
+    return {
+        'flowrate': {'mean': df["Flowrate"].mean(), 'std': df["Flowrate"].std()},
+    }
+
+
+def bench_scoring(rows, stdout):
+    """Row-wise df.apply scoring vs the vectorized scoring path."""
+    import pandas as pd
+
+    df = pd.read_csv(make_synthetic_csv(rows))
+    stats = _stats_for(df)
+
+    start = time.perf_counter()
+    df.apply(lambda row: calculate_health_score(row, stats), axis=1)
+    row_wise = time.perf_counter() - start
+
+    start = time.perf_counter()
+    calculate_health_scores(df, stats)
+    vectorized = time.perf_counter() - start
+
+    stdout.write(f"scoring ({rows} rows)")
+    stdout.write(f"  df.apply:   {row_wise:8.4f}s  {rows / row_wise:14,.0f} rows/s")
+    stdout.write(f"  vectorized: {vectorized:8.4f}s  {rows / vectorized:14,.0f} rows/s")
+
+
+def bench_analysis(rows, stdout):
+    """End-to-end analyze_csv latency and peak Python heap."""
+    csv_file = make_synthetic_csv(rows)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    analyze_csv(csv_file)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    stdout.write(f"analysis ({rows} rows)")
+    stdout.write(f"  analyze_csv: {elapsed:8.4f}s  peak heap {peak / 1024 / 1024:8.1f} MiB")
+
+
+def bench_stream(rows, stdout):
+    """Chunked summary analysis: latency and peak Python heap."""
+    csv_file = make_synthetic_csv(rows)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    analyze_csv_stream(csv_file)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    stdout.write(f"stream ({rows} rows)")
+    stdout.write(f"  analyze_csv_stream: {elapsed:8.4f}s  peak heap {peak / 1024 / 1024:8.1f} MiB")
+
+
+def bench_exact(rows, stdout):
+    """
+    In-memory analyze_csv vs the two-pass spill on a wide file, each followed
+    by reading its per-row results in EquipmentRecord batches (as
+    create_dataset does, without the inserts).
+    """
+    csv_file = make_synthetic_csv(rows, extra_columns=20)
+
+    stdout.write(f"exact ({rows} rows, 20 extra columns, analysis + per-row results)")
+    for label, analyze in (("analyze_csv", analyze_csv), ("analyze_csv_exact", analyze_csv_exact)):
+        csv_file.seek(0)
+        tracemalloc.start()
+        start = time.perf_counter()
+        analysis = analyze(csv_file)
+        for _ in iter_equipment_rows(analysis):
+            pass
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        discard_spill(analysis)
+        stdout.write(f"  {label + ':':19} {elapsed:8.4f}s  peak heap {peak / 1024 / 1024:8.1f} MiB")
+
+
+def _peak_rss_mib():
+    """Peak resident memory of this process (VmHWM; ru_maxrss where /proc is unavailable)"""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is in KiB on Linux, but survives exec so it can include the parent's peak
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _parse_in_child(path, engine):
+    import pandas as pd
+
+    start = time.perf_counter()
+    if engine == "default":
+        pd.read_csv(path)
+    else:
+        with mock.patch("api.utils.csv_engine", return_value=engine):
+            read_equipment_csv(open(path, "rb"))
+    elapsed = time.perf_counter() - start
+    return elapsed, _peak_rss_mib()
+
+
+def bench_parse(rows, stdout):
+    """Untyped full-width read_csv vs typed, column-pruned parsing (fresh process each)."""
+    with tempfile.NamedTemporaryFile(suffix=".csv", delete=False) as f:
+        f.write(make_synthetic_csv(rows, extra_columns=40).getvalue())
+    try:
+        stdout.write(f"parse ({rows} rows, 40 extra columns, {os.path.getsize(f.name) / 1024 / 1024:.1f} MiB)")
+        engines = ["default", "c"]
+        try:
+            import pyarrow  # noqa: F401
+            engines.append("pyarrow")
+        except ImportError:
+            stdout.write("  pyarrow not installed, skipping pyarrow engine")
+        ctx = multiprocessing.get_context("spawn")
+        for engine in engines:
+            with ctx.Pool(1) as pool:
+                elapsed, rss = pool.apply(_parse_in_child, (f.name, engine))
+            label = "pd.read_csv(file)" if engine == "default" else f"typed/pruned ({engine})"
+            stdout.write(f"  {label + ':':24} {elapsed:8.4f}s  peak RSS {rss:8.1f} MiB")
+    finally:
+        os.unlink(f.name)
+
+
+def bench_pdf(rows, stdout):
+    """PDF report with matplotlib raster charts vs native ReportLab vector charts."""
+    import datetime
+    from types import SimpleNamespace
+
+    from api.chart_utils import warm_up
+    from api.pdf_utils import generate_pdf
+
+    analysis = analyze_csv(make_synthetic_csv(rows))
+    # Stand-in for a Dataset: generate_pdf only reads these attributes
+    dataset = SimpleNamespace(name="synthetic.csv", uploaded_at=datetime.datetime.now(), **analysis)
+    warm_up()  # measure steady-state rendering, not matplotlib's import
+
+    stdout.write(f"pdf ({rows} rows, best of 3)")
+    for charts in ("raster", "vector"):
+        timings = []
+        for _ in range(3):
+            start = time.perf_counter()
+            pdf = generate_pdf(dataset, charts=charts)
+            timings.append(time.perf_counter() - start)
+        stdout.write(f"  {charts + ':':8} {min(timings):8.4f}s  {len(pdf) / 1024:8.1f} KiB")
+
+
+def _pandas_excel(dataset):
+    """The DataFrame + pd.ExcelWriter export that iter_excel replaced, kept for comparison"""
+    import pandas as pd
+
+    sheets = {
+        "Summary": pd.DataFrame({"Metric": ["Total Equipment"], "Value": [dataset.total_equipment]}),
+        "Equipment Details": pd.DataFrame(dataset.equipment_data),
+        "Type Distribution": pd.DataFrame(list(dataset.type_distribution.items()), columns=["Equipment Type", "Count"]),
+        "Efficiency Ranking": pd.DataFrame(dataset.efficiency_ranking),
+        "Outliers": pd.DataFrame([
+            {"Equipment Name": o["equipment_name"], "Type": o["type"], **o["parameters"],
+             "Health Score": o["health_score"], "Risk": o["risk"]}
+            for o in dataset.outliers
+        ]),
+    }
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine="openpyxl") as writer:
+        for name, df in sheets.items():
+            df.to_excel(writer, index=False, sheet_name=name)
+    return output.getvalue()
+
+
+def _reset_peak_rss():
+    """Restart VmHWM from the current RSS (Linux); returns False where unsupported"""
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _excel_in_child(rows, implementation):
+    import datetime
+    from types import SimpleNamespace
+
+    from api.export_utils import generate_excel
+
+    analysis = analyze_csv(make_synthetic_csv(rows))
+    # Stand-in for a Dataset: the lists for the pandas path, iterators over them for iter_excel
+    dataset = SimpleNamespace(
+        name="synthetic.csv", uploaded_at=datetime.datetime.now(), **analysis,
+        iter_equipment=lambda: iter(analysis["equipment_data"]),
+        iter_ranking=lambda: iter(analysis["efficiency_ranking"]),
+        iter_outliers=lambda: iter(analysis["outliers"]),
+    )
+    # Imports are not part of the measurement
+    import openpyxl  # noqa: F401
+    import pandas  # noqa: F401
+    baseline = _peak_rss_mib() if _reset_peak_rss() else 0.0
+
+    start = time.perf_counter()
+    content = _pandas_excel(dataset) if implementation == "pandas" else generate_excel(dataset)
+    elapsed = time.perf_counter() - start
+    return elapsed, _peak_rss_mib() - baseline, len(content)
+
+
+def bench_excel(rows, stdout):
+    """pandas DataFrames + ExcelWriter vs the write-only openpyxl export (fresh process each)."""
+    stdout.write(f"excel ({rows} rows)")
+    ctx = multiprocessing.get_context("spawn")
+    for implementation in ("pandas", "write_only"):
+        with ctx.Pool(1) as pool:
+            elapsed, rss, size = pool.apply(_excel_in_child, (rows, implementation))
+        stdout.write(
+            f"  {implementation + ':':11} {elapsed:8.4f}s  peak RSS above input {rss:8.1f} MiB  {size / 1024 / 1024:6.1f} MiB file"
+        )
+
+
+def bench_render(rows, stdout):
+    """DRF's stdlib JSONRenderer vs the orjson-backed FastJSONRenderer on API-shaped payloads."""
+    import datetime
+
+    from rest_framework.renderers import JSONRenderer
+
+    from api.renderers import FastJSONRenderer, orjson
+
+    analysis = analyze_csv(make_synthetic_csv(rows))
+    uploaded_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    # Shaped like DatasetSerializer (upload/, datasets/<id>/) and DatasetSummarySerializer (history/)
+    upload = dict(analysis, id=1, name="synthetic.csv", uploaded_at=uploaded_at, analysis_mode="full", content_hash="")
+    summary_fields = ["total_equipment", "avg_flowrate", "avg_pressure", "avg_temperature", "avg_health_score", "outlier_count"]
+    history = [
+        dict({field: analysis[field] for field in summary_fields}, id=i, name="synthetic.csv", uploaded_at=uploaded_at)
+        for i in range(5)
+    ]
+
+    if orjson is None:
+        stdout.write("  orjson not installed, FastJSONRenderer uses the stdlib fallback")
+    stdout.write(f"render ({rows} rows, best of 5)")
+    for label, payload, repeat in (("upload/", upload, 1), ("history/", history, 1000)):
+        for renderer in (JSONRenderer(), FastJSONRenderer()):
+            timings = []
+            for _ in range(5):
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    body = renderer.render(payload)
+                timings.append((time.perf_counter() - start) / repeat)
+            name = f"{label} {type(renderer).__name__}:"
+            stdout.write(f"  {name:30} {min(timings) * 1000:9.3f} ms  {len(body) / 1024:9.1f} KiB")
+
+
+SUITES = {
+    "scoring": bench_scoring,
+    "analysis": bench_analysis,
+    "stream": bench_stream,
+    "exact": bench_exact,
+    "parse": bench_parse,
+    "pdf": bench_pdf,
+    "excel": bench_excel,
+    "render": bench_render,
+}
+
+
+class Command(BaseCommand):
+    help = "Run performance benchmarks against synthetic equipment data"
+
+    def add_arguments(self, parser):
+        parser.add_argument("suite", choices=sorted(SUITES) + ["all"])
+        parser.add_argument("--rows", type=int, default=100_000)
+
+    def handle(self, *args, **options):
+        suites = SUITES if options["suite"] == "all" else {options["suite"]: SUITES[options["suite"]]}
+        for name, bench in suites.items():
+            bench(options["rows"], self.stdout)
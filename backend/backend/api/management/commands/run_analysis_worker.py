@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from api.jobs import JobWorker
+
+
+class Command(BaseCommand):
+    help = "Run the background upload analysis worker (set ANALYSIS_JOB_AUTOSTART=False on the web processes)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=None, help="Analysis processes (default: ANALYSIS_WORKERS)")
+
+    def handle(self, *args, **options):
+        worker = JobWorker(workers=options["workers"])
+        worker.start()
+        self.stdout.write(self.style.SUCCESS(f"Analysis worker running with {worker.workers} processes"))
+        try:
+            worker.join()
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping analysis worker")
+            worker.stop()
@@ -0,0 +1,14 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.chart_utils import warm_up
+
+
+class Command(BaseCommand):
+    help = "Build the matplotlib font cache (e.g. during a build step) so the first PDF is fast"
+
+    def handle(self, *args, **kwargs):
+        start = time.perf_counter()
+        warm_up()
+        self.stdout.write(self.style.SUCCESS(f"Matplotlib warmed up in {time.perf_counter() - start:.2f}s"))
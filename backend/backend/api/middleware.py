@@ -0,0 +1,202 @@
+"""
+Response compression and request metrics for the API.
+
+Like django.middleware.gzip.GZipMiddleware, but it also speaks zstd and
+brotli (when the zstandard / brotli packages are installed and the client
+advertises them). Streaming responses are compressed chunk by chunk, each
+chunk flushed as it arrives, so streamed CSV exports still go out while
+they render instead of being held back for a compressor. Only text
+streams (text/*, JSON) are compressed: the other file downloads (PDF,
+Excel, Parquet, Arrow) are compressed formats already.
+
+Only non-streaming responses of at least COMPRESSION_MIN_BYTES are
+compressed. Besides saving CPU on tiny bodies, this keeps small
+secret-bearing responses (the login token) out of reach of compression
+side channels like BREACH.
+
+MetricsMiddleware counts and times every request into api.metrics, which
+/api/metrics/ serves in the Prometheus text format.
+"""
+
+import gzip
+import re
+import time
+import zlib
+from importlib.util import find_spec
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+from .metrics import http_duration, http_errors, http_in_flight, http_requests, http_response_size
+
+# Dynamic responses: favour speed over the last few percent of ratio
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+ZSTD_LEVEL = 3
+
+_token_re = re.compile(r"\s*([^\s;,]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?")
+
+
+def _zstd(data):
+    import zstandard
+
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+
+
+def _brotli(data):
+    import brotli
+
+    return brotli.compress(data, quality=BROTLI_QUALITY)
+
+
+def _gzip(data):
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+# Streaming variants: compress an iterable of chunks, flushing after each one
+
+def _zstd_stream(chunks):
+    import zstandard
+
+    compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _brotli_stream(chunks):
+    import brotli
+
+    compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+    for chunk in chunks:
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def _gzip_stream(chunks):
+    # wbits 16 + MAX_WBITS: gzip container (with mtime 0, like _gzip)
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+# Server preference order; codecs whose package is not installed are skipped
+ENCODERS = [
+    (name, compress, compress_stream)
+    for name, compress, compress_stream, module in [
+        ("zstd", _zstd, _zstd_stream, "zstandard"),
+        ("br", _brotli, _brotli_stream, "brotli"),
+        ("gzip", _gzip, _gzip_stream, None),
+    ]
+    if module is None or find_spec(module) is not None
+]
+
+# Streamed bodies worth compressing; the other downloads are compressed formats
+STREAM_CONTENT_TYPES = ("text/", "application/json")
+
+
+def accepted_encodings(header):
+    """Content codings from an Accept-Encoding header, without the ones refused with q=0"""
+    accepted = set()
+    for part in header.split(","):
+        match = _token_re.match(part)
+        if not match or not match.group(1):
+            continue
+        try:
+            quality = float(match.group(2)) if match.group(2) else 1.0
+        except ValueError:
+            continue
+        if quality > 0:
+            accepted.add(match.group(1).lower())
+    return accepted
+
+
+def choose_encoding(header):
+    """(name, compress, compress_stream) of the preferred codec the client accepts, or None"""
+    accepted = accepted_encodings(header)
+    for codec in ENCODERS:
+        if codec[0] in accepted or "*" in accepted:
+            return codec
+    return None
+
+
+class CompressionMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if response.has_header("Content-Encoding"):
+            return response
+        if response.streaming:
+            if response.is_async or not response.get("Content-Type", "").startswith(STREAM_CONTENT_TYPES):
+                return response
+        elif len(response.content) < settings.COMPRESSION_MIN_BYTES:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        codec = choose_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if codec is None:
+            return response
+
+        name, compress, compress_stream = codec
+        if response.streaming:
+            response.streaming_content = compress_stream(response.streaming_content)
+            # The compressed length is not known up front (e.g. a cached CSV's FileResponse)
+            if response.has_header("Content-Length"):
+                del response["Content-Length"]
+        else:
+            compressed = compress(response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response["Content-Length"] = str(len(compressed))
+        response["Content-Encoding"] = name
+        # The body changed, so a strong ETag no longer matches it byte for byte
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Requests, errors, latency and response size per route pattern
+    ("api/datasets/<int:dataset_id>/", not the concrete path, so label
+    values stay bounded). Sits above CompressionMiddleware to see the
+    size that goes over the wire.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        http_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            http_in_flight.dec()
+        elapsed = time.perf_counter() - start
+
+        match = request.resolver_match
+        route = match.route if match else "unmatched"
+        method = request.method
+        http_requests.inc(method=method, route=route, status=str(response.status_code))
+        if response.status_code >= 500:
+            http_errors.inc(method=method, route=route)
+        http_duration.observe(elapsed, method=method, route=route)
+
+        # Streamed bodies are only measured when they declare their length
+        if not response.streaming:
+            http_response_size.observe(len(response.content), method=method, route=route)
+        elif response.has_header("Content-Length"):
+            http_response_size.observe(int(response["Content-Length"]), method=method, route=route)
+        return response
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-17 04:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_dataset_avg_health_score_dataset_efficiency_ranking_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='analysis_mode',
+            field=models.CharField(default='full', max_length=16),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 6.0.1 on 2026-10-17 04:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_dataset_analysis_mode'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EquipmentRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('row', models.IntegerField()),
+                ('name', models.TextField()),
+                ('type', models.TextField()),
+                ('flowrate', models.FloatField(null=True)),
+                ('pressure', models.FloatField(null=True)),
+                ('temperature', models.FloatField(null=True)),
+                ('health_score', models.FloatField()),
+                ('risk', models.CharField(max_length=6)),
+                ('rank', models.IntegerField()),
+                ('status', models.CharField(max_length=9)),
+                ('is_outlier', models.BooleanField(default=False)),
+                ('dataset', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='equipment', to='api.dataset')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['dataset', 'rank'], name='api_equipme_dataset_6619d8_idx'), models.Index(fields=['dataset', 'is_outlier', 'row'], name='api_equipme_dataset_d145c9_idx')],
+                'constraints': [models.UniqueConstraint(fields=('dataset', 'row'), name='unique_equipment_row')],
+            },
+        ),
+    ]
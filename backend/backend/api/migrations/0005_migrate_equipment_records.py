@@ -0,0 +1,115 @@
+# Moves the equipment_data / efficiency_ranking / outliers JSON blobs into
+# EquipmentRecord rows (and back again on reverse).
+
+from collections import defaultdict, deque
+
+from django.db import migrations
+
+BATCH_SIZE = 5000
+
+
+def blobs_to_records(apps, schema_editor):
+    Dataset = apps.get_model('api', 'Dataset')
+    EquipmentRecord = apps.get_model('api', 'EquipmentRecord')
+
+    for dataset in Dataset.objects.iterator():
+        equipment_data = dataset.equipment_data or []
+
+        # Old rankings/outliers have no row number, so match them back to
+        # equipment rows by their values (duplicates are taken in order).
+        by_ranking_key = defaultdict(deque)
+        by_outlier_key = defaultdict(deque)
+        for row, eq in enumerate(equipment_data):
+            by_ranking_key[(eq['name'], eq['type'], eq['health_score'])].append(row)
+            by_outlier_key[(eq['name'], eq['type'], eq['flowrate'], eq['pressure'], eq['temperature'])].append(row)
+
+        ranks, statuses = {}, {}
+        for item in dataset.efficiency_ranking or []:
+            rows = by_ranking_key.get((item['equipment_name'], item['type'], item['health_score']))
+            if rows:
+                row = rows.popleft()
+                ranks[row], statuses[row] = item['rank'], item['status']
+
+        outlier_rows = set()
+        for outlier in dataset.outliers or []:
+            params = outlier['parameters']
+            key = (outlier['equipment_name'], outlier['type'], params['flowrate'], params['pressure'], params['temperature'])
+            rows = by_outlier_key.get(key)
+            if rows:
+                outlier_rows.add(rows.popleft())
+
+        records = [
+            EquipmentRecord(
+                dataset=dataset,
+                row=row,
+                name=eq['name'],
+                type=eq['type'],
+                flowrate=eq['flowrate'],
+                pressure=eq['pressure'],
+                temperature=eq['temperature'],
+                health_score=eq['health_score'],
+                risk=eq['risk'],
+                rank=ranks.get(row, row + 1),
+                status=statuses.get(row, ''),
+                is_outlier=row in outlier_rows,
+            )
+            for row, eq in enumerate(equipment_data)
+        ]
+        EquipmentRecord.objects.bulk_create(records, batch_size=BATCH_SIZE)
+
+
+def records_to_blobs(apps, schema_editor):
+    Dataset = apps.get_model('api', 'Dataset')
+    EquipmentRecord = apps.get_model('api', 'EquipmentRecord')
+
+    for dataset in Dataset.objects.iterator():
+        records = list(EquipmentRecord.objects.filter(dataset=dataset).order_by('row'))
+        dataset.equipment_data = [
+            {
+                'name': r.name,
+                'type': r.type,
+                'flowrate': r.flowrate,
+                'pressure': r.pressure,
+                'temperature': r.temperature,
+                'health_score': r.health_score,
+                'risk': r.risk,
+            }
+            for r in records
+        ]
+        dataset.efficiency_ranking = [
+            {
+                'rank': r.rank,
+                'equipment_name': r.name,
+                'type': r.type,
+                'health_score': r.health_score,
+                'status': r.status,
+            }
+            for r in sorted(records, key=lambda r: r.rank)
+        ]
+        dataset.outliers = [
+            {
+                'equipment_name': r.name,
+                'type': r.type,
+                'parameters': {
+                    'flowrate': r.flowrate,
+                    'pressure': r.pressure,
+                    'temperature': r.temperature,
+                },
+                'health_score': r.health_score,
+                'risk': r.risk,
+            }
+            for r in records if r.is_outlier
+        ]
+        dataset.save(update_fields=['equipment_data', 'efficiency_ranking', 'outliers'])
+        EquipmentRecord.objects.filter(dataset=dataset).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_equipmentrecord'),
+    ]
+
+    operations = [
+        migrations.RunPython(blobs_to_records, records_to_blobs),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 6.0.1 on 2026-10-17 04:30
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_migrate_equipment_records'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='dataset',
+            name='efficiency_ranking',
+        ),
+        migrations.RemoveField(
+            model_name='dataset',
+            name='equipment_data',
+        ),
+        migrations.RemoveField(
+            model_name='dataset',
+            name='outliers',
+        ),
+    ]
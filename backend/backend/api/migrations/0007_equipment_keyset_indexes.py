@@ -0,0 +1,37 @@
+# Generated by Django 6.0.1 on 2026-10-17 04:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_remove_dataset_json_blobs'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='equipmentrecord',
+            index=models.Index(fields=['dataset', 'health_score', 'row'], name='api_equipme_dataset_830b48_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipmentrecord',
+            index=models.Index(fields=['dataset', 'flowrate', 'row'], name='api_equipme_dataset_2e4ba6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipmentrecord',
+            index=models.Index(fields=['dataset', 'pressure', 'row'], name='api_equipme_dataset_c12f2b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipmentrecord',
+            index=models.Index(fields=['dataset', 'temperature', 'row'], name='api_equipme_dataset_a1d228_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipmentrecord',
+            index=models.Index(fields=['dataset', 'type', 'row'], name='api_equipme_dataset_e48923_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipmentrecord',
+            index=models.Index(fields=['dataset', 'risk', 'row'], name='api_equipme_dataset_ac5527_idx'),
+        ),
+    ]
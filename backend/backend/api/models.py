@@ -1,4 +1,10 @@
-from django.db import models
+import uuid
+from itertools import islice
+
+from django.db import models, transaction
+from django.utils.functional import cached_property
+
+from .utils import discard_spill, has_equipment_rows, iter_equipment_rows
 
 # Create your models here.
 class Dataset(models.Model):  #Created Database called Dataset    
@@ -26,13 +32,258 @@ class Dataset(models.Model):  #Created Database called Dataset
     
     # New analytics fields
     statistics = models.JSONField(default=dict)  # min, max, median, std for each parameter
-    equipment_data = models.JSONField(default=list)  # detailed equipment with health scores
     avg_health_score = models.FloatField(default=100)  # average health score across all equipment
-    outliers = models.JSONField(default=list)  # list of outlier equipment
     outlier_count = models.IntegerField(default=0)  # count of outliers
-    efficiency_ranking = models.JSONField(default=list)  # ranked equipment by efficiency
     risk_summary = models.JSONField(default=dict)  # high/medium/low risk counts
 
+    # "full" = in-memory analysis, "stream" = chunked summary-only analysis,
+    # "exact" = two-pass analysis over an on-disk spill (same results as "full")
+    analysis_mode = models.CharField(max_length=16, default="full")
+
+    # SHA-256 of the uploaded file - repeated uploads reuse the existing analysis
+    content_hash = models.CharField(max_length=64, blank=True, default="", db_index=True)
+
     def __str__(self):
         return self.name
-    
\ No newline at end of file
+
+    # Per-equipment results live in EquipmentRecord; these rebuild the
+    # original JSON shapes for the API, PDF and exports.
+    @cached_property
+    def equipment_data(self):
+        """Every equipment row in upload order"""
+        return [record.as_equipment() for record in self.equipment.order_by("row")]
+
+    @cached_property
+    def efficiency_ranking(self):
+        """Every equipment row, best health score first"""
+        return [record.as_ranking() for record in self.equipment.order_by("rank")]
+
+    # Incremental readers for exports: rows are fetched from the DB in chunks
+    # instead of materializing the lists above.
+    def iter_equipment(self, chunk_size=2000):
+        for record in self.equipment.order_by("row").iterator(chunk_size=chunk_size):
+            yield record.as_equipment()
+
+    def iter_outliers(self, chunk_size=2000):
+        for record in self.equipment.filter(is_outlier=True).order_by("row").iterator(chunk_size=chunk_size):
+            yield record.as_outlier()
+
+    def iter_ranking(self, chunk_size=2000):
+        for record in self.equipment.order_by("rank").iterator(chunk_size=chunk_size):
+            yield record.as_ranking()
+
+    def iter_equipment_values(self, fields, chunk_size=2000):
+        """Equipment rows in upload order, as tuples of the given fields"""
+        return self.equipment.order_by("row").values_list(*fields).iterator(chunk_size=chunk_size)
+
+    def distinct_equipment_values(self, field):
+        """Sorted distinct values of one EquipmentRecord field"""
+        return list(self.equipment.order_by(field).values_list(field, flat=True).distinct())
+
+    def top_ranked(self, count):
+        """The count best-ranked equipment, as efficiency_ranking entries"""
+        return [record.as_ranking() for record in self.equipment.order_by("rank")[:count]]
+
+    @cached_property
+    def outlier_rows(self):
+        """Row positions (indexes into equipment_data) of the outliers"""
+        return list(self.equipment.filter(is_outlier=True).order_by("row").values_list("row", flat=True))
+
+    @cached_property
+    def outliers(self):
+        """Outlier equipment in upload order"""
+        return [record.as_outlier() for record in self.equipment.filter(is_outlier=True).order_by("row")]
+
+
+class EquipmentRecord(models.Model):
+    """One analysed equipment row of a Dataset"""
+
+    dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE, related_name="equipment")
+    row = models.IntegerField()  # position in the uploaded CSV
+
+    # Unbounded like the CSV values they come from (they used to live in a JSON field)
+    name = models.TextField()
+    type = models.TextField()
+    flowrate = models.FloatField(null=True)
+    pressure = models.FloatField(null=True)
+    temperature = models.FloatField(null=True)
+
+    health_score = models.FloatField()
+    risk = models.CharField(max_length=6)  # HIGH / MEDIUM / LOW
+    rank = models.IntegerField()  # 1 = best health score
+    status = models.CharField(max_length=9)  # Excellent / Good / Fair / Poor
+    is_outlier = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["dataset", "row"], name="unique_equipment_row"),
+        ]
+        indexes = [
+            models.Index(fields=["dataset", "rank"]),
+            models.Index(fields=["dataset", "is_outlier", "row"]),
+            # Keyset pagination / filters of datasets/<id>/equipment/
+            models.Index(fields=["dataset", "health_score", "row"]),
+            models.Index(fields=["dataset", "flowrate", "row"]),
+            models.Index(fields=["dataset", "pressure", "row"]),
+            models.Index(fields=["dataset", "temperature", "row"]),
+            models.Index(fields=["dataset", "type", "row"]),
+            models.Index(fields=["dataset", "risk", "row"]),
+        ]
+
+    def __str__(self):
+        return f"{self.dataset_id}:{self.name}"
+
+    def as_equipment(self):
+        return {
+            'name': self.name,
+            'type': self.type,
+            'flowrate': self.flowrate,
+            'pressure': self.pressure,
+            'temperature': self.temperature,
+            'health_score': self.health_score,
+            'risk': self.risk,
+        }
+
+    def as_ranking(self):
+        return {
+            'rank': self.rank,
+            'equipment_name': self.name,
+            'type': self.type,
+            'health_score': self.health_score,
+            'status': self.status,
+        }
+
+    def as_outlier(self):
+        return {
+            'equipment_name': self.name,
+            'type': self.type,
+            'parameters': {
+                'flowrate': self.flowrate,
+                'pressure': self.pressure,
+                'temperature': self.temperature,
+            },
+            'health_score': self.health_score,
+            'risk': self.risk,
+        }
+
+
+def create_equipment_records(dataset, analysis, batch_size=5000, progress=None):
+    """
+    Write the per-row analysis results as EquipmentRecord rows.
+    Rows are built and inserted one batch at a time with bulk_create; an
+    exact-mode analysis is read from its spill one batch at a time too.
+    progress, if given, is called with the fraction of rows written.
+    """
+    rows = iter_equipment_rows(analysis, batch_rows=batch_size)
+    written = 0
+    while batch := list(islice(rows, batch_size)):
+        EquipmentRecord.objects.bulk_create([
+            EquipmentRecord(
+                dataset=dataset,
+                row=row,
+                name=eq['name'],
+                type=eq['type'],
+                flowrate=eq['flowrate'],
+                pressure=eq['pressure'],
+                temperature=eq['temperature'],
+                health_score=eq['health_score'],
+                risk=eq['risk'],
+                rank=rank,
+                status=status,
+                is_outlier=is_outlier,
+            )
+            for row, eq, rank, status, is_outlier in batch
+        ])
+        written += len(batch)
+        if progress:
+            progress(written / analysis["total_equipment"])
+
+
+
+# Analysis result keys stored on Dataset (stream mode only produces the summary ones).
+# Per-equipment results are stored as EquipmentRecord rows.
+ANALYSIS_FIELDS = [
+    "total_equipment",
+    "avg_flowrate",
+    "avg_pressure",
+    "avg_temperature",
+    "type_distribution",
+    "statistics",
+    "avg_health_score",
+    "outlier_count",
+    "risk_summary",
+]
+
+
+def create_dataset(name, mode, content_hash, analysis, batch_size=5000, progress=None):
+    """
+    Store an analysis result as a Dataset plus its EquipmentRecord rows.
+    The spill of an exact-mode analysis is deleted afterwards (also on failure).
+    """
+    try:
+        with transaction.atomic():
+            dataset = Dataset.objects.create( #convert analytics to permanent storage
+                name=name, # one row=one csv
+                analysis_mode=mode,
+                content_hash=content_hash,
+                **{field: analysis[field] for field in ANALYSIS_FIELDS if field in analysis},
+            )
+            if has_equipment_rows(analysis):
+                create_equipment_records(dataset, analysis, batch_size=batch_size, progress=progress)
+    finally:
+        discard_spill(analysis)
+    return dataset
+
+
+class AnalysisJob(models.Model):
+    """An upload queued for background analysis (upload/?async=true)"""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [(QUEUED, "Queued"), (RUNNING, "Running"), (DONE, "Done"), (FAILED, "Failed")]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    name = models.CharField(max_length=255)  # original CSV file name
+    mode = models.CharField(max_length=16, default="full")
+    content_hash = models.CharField(max_length=64, blank=True, default="")
+    file_path = models.CharField(max_length=1024)  # spooled copy of the upload
+
+    status = models.CharField(max_length=8, choices=STATUS_CHOICES, default=QUEUED, db_index=True)
+    progress = models.IntegerField(default=0)  # percent
+    error = models.TextField(blank=True, default="")
+    dataset = models.ForeignKey(Dataset, null=True, blank=True, on_delete=models.SET_NULL)
+    attempts = models.IntegerField(default=0)  # times a worker claimed it
+    heartbeat_at = models.DateTimeField(null=True, blank=True)  # renewed while a worker runs it
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+
+class ReportArtifact(models.Model):
+    """
+    A rendered export of a Dataset, cached on disk.
+    Datasets never change after upload, so an artifact stays valid until its
+    renderer changes; version is a hash of the renderer (see artifacts.py).
+    """
+
+    dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE, related_name="artifacts")
+    kind = models.CharField(max_length=32)  # e.g. "pdf"
+    version = models.CharField(max_length=64)
+    path = models.CharField(max_length=1024)
+    size = models.BigIntegerField()
+    etag = models.CharField(max_length=66)  # quoted sha256 of the content
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_accessed = models.DateTimeField(db_index=True)  # LRU eviction order
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["dataset", "kind", "version"], name="unique_report_artifact"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} for dataset {self.dataset_id} ({self.size} bytes)"
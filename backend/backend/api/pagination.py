@@ -0,0 +1,65 @@
+"""
+Keyset (cursor) pagination for EquipmentRecord queries.
+
+Pages are ordered by (sort field, row). The cursor carries the sort value
+and row of the last item on the page, so the next page is a plain indexed
+range query instead of an OFFSET scan - page cost stays the same no matter
+how deep the client pages.
+"""
+
+import base64
+import json
+import math
+
+from django.db.models import F, Q
+
+
+def encode_cursor(value, row):
+    return base64.urlsafe_b64encode(json.dumps([value, row]).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Returns (value, row); raises ValueError on a malformed cursor"""
+    try:
+        value, row = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    # Sort fields are numeric; bool is an int subclass but never a valid cursor part
+    if isinstance(row, bool) or not isinstance(row, int):
+        raise ValueError("Invalid cursor")
+    if value is not None and (
+        isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value)
+    ):
+        raise ValueError("Invalid cursor")
+    return value, row
+
+
+def keyset_page(queryset, sort_field, descending=False, cursor=None, page_size=100):
+    """
+    Return (items, next_cursor) for one page of queryset.
+    NULL sort values are placed last in both directions.
+    """
+    ordering = F(sort_field).desc(nulls_last=True) if descending else F(sort_field).asc(nulls_last=True)
+    queryset = queryset.order_by(ordering, "row")
+
+    if cursor:
+        value, row = decode_cursor(cursor)
+        if value is None:
+            # Already inside the trailing NULL block
+            queryset = queryset.filter(**{f"{sort_field}__isnull": True, "row__gt": row})
+        else:
+            beyond = f"{sort_field}__lt" if descending else f"{sort_field}__gt"
+            queryset = queryset.filter(
+                Q(**{beyond: value})
+                | Q(**{sort_field: value, "row__gt": row})
+                | Q(**{f"{sort_field}__isnull": True})
+            )
+
+    # One extra row tells us whether there is a next page
+    items = list(queryset[:page_size + 1])
+    if len(items) <= page_size:
+        return items, None
+
+    items = items[:page_size]
+    last = items[-1]
+    return items, encode_cursor(getattr(last, sort_field), last.row)
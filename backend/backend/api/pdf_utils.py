@@ -5,73 +5,69 @@ from reportlab.lib.units import inch
 from reportlab.lib.utils import ImageReader
 from reportlab.lib import colors
 from reportlab.platypus import Table, TableStyle
+from reportlab.graphics import renderPDF
+from reportlab.graphics.shapes import Drawing
 
+from .chart_utils import render_health_bars, render_scatter, render_type_distribution
+from .metrics import StageTimer
+from .scatter_sampling import DEFAULT_MAX_POINTS
+from .vector_charts import health_bars_drawing, scatter_drawing, type_distribution_drawing
 
-def generate_pdf(dataset):
+
+CHART_RENDERERS = ("raster", "vector")
+
+
+def _draw_chart(pdf, chart, x, y, width, height):
+    """Place a chart: a ReportLab Drawing (vector) or a PNG buffer (raster)"""
+    if isinstance(chart, Drawing):
+        renderPDF.draw(chart, pdf, x, y)
+    else:
+        pdf.drawImage(ImageReader(chart), x, y, width=width, height=height, preserveAspectRatio=True)
+
+
+def generate_pdf(dataset, charts="raster", scatter_max_points=DEFAULT_MAX_POINTS):
     """
     Generates a comprehensive PDF report for a Dataset instance with advanced analytics.
+    charts: "raster" (matplotlib PNGs) or "vector" (native ReportLab drawings).
+    scatter_max_points: above this many rows the scatter is drawn as a density.
     Returns PDF as bytes.
     """
-    # Lazy import: matplotlib only loads when PDF is generated
-    # This prevents font cache build during startup
-    import matplotlib
-    matplotlib.use("Agg")  # Non-GUI backend - critical for server
-    import matplotlib.pyplot as plt
-
     # -----------------------------
-    # 1. Generate chart image
+    # 1. Generate chart images
     # -----------------------------
-    type_data = dataset.type_distribution
-
-    fig, ax = plt.subplots()
-    ax.bar(type_data.keys(), type_data.values())  # Uses server-side Matplotlib
-    ax.set_title("Equipment Type Distribution")
-    ax.set_xlabel("Equipment Type")
-    ax.set_ylabel("Count")
-
-    chart_buffer = io.BytesIO()  # Creates an in-memory file, No temp files on disk
-    plt.savefig(chart_buffer, format="png", bbox_inches="tight")
-    plt.close(fig)
-    chart_buffer.seek(0)
-
-    # Generate scatter plot: Pressure vs Temperature
-    if dataset.equipment_data:
-        fig, ax = plt.subplots(figsize=(8, 6))
-        pressures = [eq['pressure'] for eq in dataset.equipment_data]
-        temperatures = [eq['temperature'] for eq in dataset.equipment_data]
-        health_scores = [eq['health_score'] for eq in dataset.equipment_data]
-        
-        scatter = ax.scatter(pressures, temperatures, c=health_scores, cmap='RdYlGn', s=100, alpha=0.6)
-        ax.set_xlabel("Pressure")
-        ax.set_ylabel("Temperature")
-        ax.set_title("Pressure vs Temperature Correlation")
-        plt.colorbar(scatter, ax=ax, label="Health Score")
-        
-        scatter_buffer = io.BytesIO()
-        plt.savefig(scatter_buffer, format="png", bbox_inches="tight")
-        plt.close(fig)
-        scatter_buffer.seek(0)
-    else:
-        scatter_buffer = None
-
-    # Generate health score distribution
-    if dataset.equipment_data:
-        fig, ax = plt.subplots(figsize=(8, 6))
-        names = [eq['name'][:15] for eq in dataset.equipment_data[:10]]  # Limit to first 10
-        scores = [eq['health_score'] for eq in dataset.equipment_data[:10]]
-        colors_list = ['green' if s >= 85 else 'orange' if s >= 70 else 'red' for s in scores]
-        
-        ax.barh(names, scores, color=colors_list)
-        ax.set_xlabel("Health Score")
-        ax.set_title("Equipment Health Scores (Top 10)")
-        ax.set_xlim(0, 100)
-        
-        health_buffer = io.BytesIO()
-        plt.savefig(health_buffer, format="png", bbox_inches="tight")
-        plt.close(fig)
-        health_buffer.seek(0)
+    if charts not in CHART_RENDERERS:
+        raise ValueError(f"Unknown chart renderer: {charts}")
+
+    timer = StageTimer(f"pdf_{charts}")
+    equipment = dataset.equipment_data
+    chart_width = A4[0] - 100
+    pressures = [eq['pressure'] for eq in equipment]
+    temperatures = [eq['temperature'] for eq in equipment]
+    health_scores = [eq['health_score'] for eq in equipment]
+    names = [eq['name'][:15] for eq in equipment[:10]]  # Limit to first 10
+    # Outliers stay visible as individual points when the scatter becomes a density
+    scatter_args = (pressures, temperatures, health_scores)
+    scatter_options = {"outlier_rows": dataset.outlier_rows, "max_points": scatter_max_points}
+
+    if charts == "vector":
+        # Native ReportLab drawings, sized to the boxes they are placed in below
+        chart_buffer = type_distribution_drawing(dataset.type_distribution, chart_width, 250)
+        scatter_buffer = scatter_drawing(*scatter_args, chart_width, 280, **scatter_options) if equipment else None
+        health_buffer = health_bars_drawing(names, health_scores[:10], chart_width, 200) if equipment else None
     else:
-        health_buffer = None
+        # Figures come from chart_utils pools: only the data is redrawn per report
+        chart_buffer = render_type_distribution(dataset.type_distribution)
+
+        if equipment:
+            # Generate scatter plot: Pressure vs Temperature
+            scatter_buffer = render_scatter(*scatter_args, **scatter_options)
+
+            # Generate health score distribution
+            health_buffer = render_health_bars(names, health_scores[:10])
+        else:
+            scatter_buffer = None
+            health_buffer = None
+    timer.lap("charts")
 
     # -----------------------------
     # 2. Create PDF with multi-page layout
@@ -162,16 +158,7 @@ def generate_pdf(dataset):
     y -= 20
 
     # Chart image
-    chart_image = ImageReader(chart_buffer)
-
-    pdf.drawImage(
-        chart_image,
-        50,
-        y - 250,
-        width=width - 100,
-        height=250,
-        preserveAspectRatio=True
-    )
+    _draw_chart(pdf, chart_buffer, 50, y - 250, width - 100, 250)
 
     # Footer
     pdf.setFont("Helvetica-Oblique", 9)
@@ -187,29 +174,13 @@ def generate_pdf(dataset):
     y -= 40
 
     # Scatter plot
-    if scatter_buffer:
-        scatter_image = ImageReader(scatter_buffer)
-        pdf.drawImage(
-            scatter_image,
-            50,
-            y - 280,
-            width=width - 100,
-            height=280,
-            preserveAspectRatio=True
-        )
+    if scatter_buffer is not None:
+        _draw_chart(pdf, scatter_buffer, 50, y - 280, width - 100, 280)
         y -= 300
 
     # Health score distribution
-    if health_buffer:
-        health_image = ImageReader(health_buffer)
-        pdf.drawImage(
-            health_image,
-            50,
-            y - 200,
-            width=width - 100,
-            height=200,
-            preserveAspectRatio=True
-        )
+    if health_buffer is not None:
+        _draw_chart(pdf, health_buffer, 50, y - 200, width - 100, 200)
 
     pdf.setFont("Helvetica-Oblique", 9)
     pdf.drawString(50, 40, "Generated by Chemical Equipment Visualizer | Page 2")
@@ -257,6 +228,7 @@ def generate_pdf(dataset):
 
     pdf.showPage()
     pdf.save()
+    timer.lap("layout")
 
     pdf_buffer.seek(0)
     return pdf_buffer.getvalue()
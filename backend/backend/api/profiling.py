@@ -0,0 +1,198 @@
+"""
+Opt-in profiling of single API requests, for admins.
+
+A staff user adds "X-Profile: 1" (or ?profile=1) to a request to a view
+decorated with @profiled (upload/, generate-pdf/<id>/, export/excel/<id>/).
+The view then runs under cProfile - or, with "sample" instead of "1",
+under a stack sampler, which distorts timings less on call-heavy code -
+while tracemalloc traces allocations. The profile is stored in
+PROFILE_DIR and its id returned in the X-Profile-Id header; profiles/<id>/
+serves it:
+    (default)        text summary: hottest functions or stacks, top allocations
+    ?type=pstats     cProfile dump (python -m pstats, snakeviz)
+    ?type=collapsed  sampled stacks (flamegraph.pl, speedscope)
+
+Requests without the flag, or from non-staff users, only pay for the flag
+lookup. tracemalloc is process-wide, so one request is profiled at a time;
+a flagged request arriving meanwhile runs unprofiled. The CPU profile
+covers only the view's own thread: a render shared with another request
+(exports.get_or_render) or done by a job worker is not included, and a
+cached export profiles just the cache lookup. The allocation figures
+cannot be narrowed down the same way - tracemalloc does not record which
+thread allocated - so they cover the whole process, including other
+requests and background renders running at the same time.
+"""
+
+import collections
+import cProfile
+import functools
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+
+from django.conf import settings
+
+logger = logging.getLogger('api')
+
+MODES = {"1": "cprofile", "true": "cprofile", "cprofile": "cprofile", "sample": "sample"}
+FORMATS = {"text": ".txt", "pstats": ".prof", "collapsed": ".collapsed"}
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 25
+
+_active = threading.Lock()
+
+
+class StackSampler:
+    """Samples the stack of the calling thread every interval seconds from a helper thread"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self._thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def enable(self):
+        self._sampler.start()
+
+    def disable(self):
+        self._stop.set()
+        self._sampler.join()
+
+    def collapsed(self):
+        """One "frame;frame;... count" line per distinct stack, root first"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def profile_path(profile_id, fmt):
+    return os.path.join(settings.PROFILE_DIR, f"{profile_id}{FORMATS[fmt]}")
+
+
+def requested_mode(request):
+    """Profiler asked for by a staff user's request ("cprofile" / "sample"), or None"""
+    flag = request.headers.get("X-Profile") or request.query_params.get("profile")
+    if not flag or not request.user.is_staff:
+        return None
+    return MODES.get(flag.lower())
+
+
+def profiled(view):
+    """Runs the view under a profiler when a staff user asks for it (see module docstring)"""
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        mode = requested_mode(request)
+        if mode is None:
+            return view(request, *args, **kwargs)
+        if not _active.acquire(blocking=False):
+            logger.warning(f"Profiling skipped, another request is being profiled: {request.path}")
+            return view(request, *args, **kwargs)
+        try:
+            return _run_profiled(mode, view, request, *args, **kwargs)
+        finally:
+            _active.release()
+
+    return wrapper
+
+
+def _run_profiled(mode, view, request, *args, **kwargs):
+    profiler = cProfile.Profile() if mode == "cprofile" else StackSampler(settings.PROFILE_SAMPLE_INTERVAL)
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    response = None
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        response = view(request, *args, **kwargs)
+        return response
+    finally:
+        profiler.disable()
+        elapsed = time.perf_counter() - start
+        snapshot = tracemalloc.take_snapshot()
+        peak = tracemalloc.get_traced_memory()[1]
+        if started_tracing:
+            tracemalloc.stop()
+
+        profile_id = str(uuid.uuid4())
+        outcome = response.status_code if response is not None else "error"
+        title = f"{request.method} {request.get_full_path()} -> {outcome}"
+        try:
+            _store(profile_id, mode, profiler, snapshot, peak, elapsed, title)
+        except OSError:
+            # A profile that cannot be written must not fail the request itself
+            logger.error(f"Could not store profile for {title}", exc_info=True)
+        else:
+            logger.info(f"Stored {mode} profile {profile_id} for {title}")
+            if response is not None:
+                response["X-Profile-Id"] = profile_id
+
+
+def _store(profile_id, mode, profiler, snapshot, peak, elapsed, title):
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    out = io.StringIO()
+    out.write(
+        f"{title}\n{mode} profile of the request's thread, {elapsed:.3f}s wall, "
+        f"{peak / 2**20:.1f} MiB peak traced memory (whole process)\n\n"
+    )
+
+    if mode == "cprofile":
+        profiler.dump_stats(profile_path(profile_id, "pstats"))
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+    else:
+        collapsed = profiler.collapsed()
+        with open(profile_path(profile_id, "collapsed"), "w") as f:
+            f.write(collapsed)
+        total = sum(profiler.stacks.values())
+        out.write(f"Hottest stacks ({total} samples):\n")
+        for stack, count in profiler.stacks.most_common(TOP_FUNCTIONS):
+            # Innermost frames first
+            out.write(f"{count:6d}  {' <- '.join(reversed(stack.split(';')[-4:]))}\n")
+
+    # The profiler's own allocations are not interesting
+    snapshot = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, cProfile.__file__),
+    ])
+    out.write("\nTop allocations still held at the end of the request (whole process, all threads):\n")
+    for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]:
+        out.write(f"{stat.size / 1024:10.1f} KiB  {stat.count:7d} blocks  {stat.traceback}\n")
+
+    with open(profile_path(profile_id, "text"), "w") as f:
+        f.write(out.getvalue())
+    _prune()
+
+
+def _prune():
+    """Keeps the PROFILE_MAX_COUNT newest profiles"""
+    summaries = sorted(
+        (entry for entry in os.scandir(settings.PROFILE_DIR) if entry.name.endswith(FORMATS["text"])),
+        key=lambda entry: entry.stat().st_mtime,
+        reverse=True,
+    )
+    for entry in summaries[settings.PROFILE_MAX_COUNT:]:
+        profile_id = entry.name[:-len(FORMATS["text"])]
+        for fmt in FORMATS:
+            try:
+                os.remove(profile_path(profile_id, fmt))
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,55 @@
+"""
+JSON renderer and parser for the API, backed by orjson when it is installed.
+
+Both fall back to DRF's stdlib implementations without orjson (and the
+renderer for ?indent / "; indent=" requests, which orjson cannot format).
+numpy scalars and arrays are serialized natively by orjson, and by DRF's
+encoder (via .tolist()) on the fallback path. Other non-JSON types
+(Decimal, lazy strings, timedelta, QuerySet, ...) go through DRF's encoder
+in both cases - including dates and times, so their strings (precision,
+"Z" for UTC, odd offsets) are exactly what the stdlib renderer writes.
+"""
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_encoder = encoders.JSONEncoder()
+
+
+def _default(obj):
+    # Raises TypeError for unsupported types, which orjson reports as usual
+    return _encoder.default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return orjson.dumps(
+            data,
+            default=_default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+        )
+
+
+class FastJSONParser(JSONParser):
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+
+        encoding = (parser_context or {}).get("encoding", settings.DEFAULT_CHARSET)
+        body = stream.read()
+        if encoding.lower().replace("_", "-") not in ("utf-8", "utf8"):
+            body = body.decode(encoding).encode("utf-8")
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
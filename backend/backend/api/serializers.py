@@ -1,7 +1,61 @@
 from rest_framework import serializers
-from .models import Dataset
+from .models import AnalysisJob, Dataset, EquipmentRecord
 
 class DatasetSerializer(serializers.ModelSerializer):
+    # Rebuilt from EquipmentRecord rows (see Dataset properties)
+    equipment_data = serializers.ReadOnlyField()
+    efficiency_ranking = serializers.ReadOnlyField()
+    outliers = serializers.ReadOnlyField()
+    outlier_rows = serializers.ReadOnlyField()
+
     class Meta:
         model = Dataset
         fields = "__all__"
+
+
+class DatasetSummarySerializer(serializers.ModelSerializer):
+    """Scalar fields only - used by history, which just lists datasets"""
+
+    class Meta:
+        model = Dataset
+        fields = [
+            "id",
+            "name",
+            "uploaded_at",
+            "analysis_mode",
+            "total_equipment",
+            "avg_flowrate",
+            "avg_pressure",
+            "avg_temperature",
+            "avg_health_score",
+            "outlier_count",
+        ]
+
+
+class EquipmentRecordSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = EquipmentRecord
+        fields = [
+            "row",
+            "name",
+            "type",
+            "flowrate",
+            "pressure",
+            "temperature",
+            "health_score",
+            "risk",
+            "rank",
+            "status",
+            "is_outlier",
+        ]
+
+
+class AnalysisJobSerializer(serializers.ModelSerializer):
+    status_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = AnalysisJob
+        fields = ["id", "name", "mode", "status", "progress", "error", "dataset", "created_at", "updated_at", "status_url"]
+
+    def get_status_url(self, job):
+        return f"/api/jobs/{job.id}/"
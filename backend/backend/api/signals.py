@@ -1,13 +1,23 @@
 """
 Signal handlers for the API app.
-Automatically creates authentication tokens for new users.
+Automatically creates authentication tokens for new users
+and removes cached report files (and render lock files) with their
+ReportArtifact and Dataset rows.
 """
 
-from django.db.models.signals import post_save
+import glob
+import os
+
+from django.conf import settings
+
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 from rest_framework.authtoken.models import Token
 
+from .artifacts import ArtifactLock
+from .models import Dataset, ReportArtifact
+
 User = get_user_model()
 
 
@@ -19,3 +29,28 @@ def create_auth_token(sender, instance=None, created=False, **kwargs):
     """
     if created:
         Token.objects.get_or_create(user=instance)
+
+
+@receiver(post_delete, sender=ReportArtifact)
+def remove_artifact_file(sender, instance, **kwargs):
+    """
+    Delete the cached file of a removed artifact.
+    Also runs for cascade deletes when a Dataset is removed.
+    """
+    try:
+        os.remove(instance.path)
+    except FileNotFoundError:
+        pass
+    ArtifactLock(instance.dataset_id, instance.kind).discard()
+
+
+@receiver(post_delete, sender=Dataset)
+def remove_render_locks(sender, instance, **kwargs):
+    """
+    Delete the render lock files left for a removed dataset, including those
+    of exports that were never stored (failed or abandoned renders).
+    """
+    pattern = os.path.join(glob.escape(settings.REPORT_CACHE_DIR), "locks", f"{instance.id}-*.lock")
+    for path in glob.glob(pattern):
+        kind = os.path.basename(path)[len(f"{instance.id}-"):-len(".lock")]
+        ArtifactLock(instance.id, kind).discard()
@@ -0,0 +1,157 @@
+# Columnar on-disk spill used by the two-pass exact analysis mode
+# It should NOT contain Django or HTTP code
+import json
+import mmap
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+
+NUMERIC_COLUMNS = ["Flowrate", "Pressure", "Temperature"]
+
+
+class ColumnSpill:
+    """
+    Append-only columnar spill directory.
+
+    Layout (one raw file per column, row order preserved):
+      <column>.f64   float64 values for each numeric column
+      type.i32       dictionary codes for Type (-1 = missing)
+      name.bin       UTF-8 bytes of every equipment name, concatenated
+      name_len.i64   byte length of each name (-1 = missing)
+    plus any per-row columns added with write_column().
+
+    Use as a context manager; the directory is removed on exit unless
+    keep() was called, in which case reopen(path) reads it back (e.g. in
+    another process) and remove() deletes it.
+    """
+
+    def __init__(self, spill_dir=None):
+        self.path = tempfile.mkdtemp(prefix="csv-spill-", dir=spill_dir)
+        self.rows = 0
+        self.type_categories = []
+        self._type_codes = {}
+        self._keep = False
+        self._files = {
+            name: open(os.path.join(self.path, name), "wb")
+            for name in [f"{column}.f64" for column in NUMERIC_COLUMNS] + ["type.i32", "name.bin", "name_len.i64"]
+        }
+
+    @classmethod
+    def reopen(cls, path):
+        """Read-only view of a spill left behind with keep()"""
+        spill = cls.__new__(cls)
+        spill.path = path
+        spill._keep = True
+        spill._files = {}
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        spill.rows = meta["rows"]
+        spill.type_categories = meta["type_categories"]
+        spill._type_codes = {value: code for code, value in enumerate(spill.type_categories)}
+        return spill
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        if not self._keep or exc_info[0] is not None:
+            self.remove()
+
+    def close(self):
+        for f in self._files.values():
+            if not f.closed:
+                f.close()
+
+    def keep(self):
+        """Leave the directory in place on exit; returns its path"""
+        self.close()
+        with open(os.path.join(self.path, "meta.json"), "w") as f:
+            json.dump({"rows": self.rows, "type_categories": self.type_categories}, f)
+        self._keep = True
+        return self.path
+
+    def remove(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def append(self, chunk):
+        """Append one DataFrame chunk with the required columns"""
+        for column in NUMERIC_COLUMNS:
+            self._files[f"{column}.f64"].write(chunk[column].to_numpy(dtype=np.float64).tobytes())
+
+        # Chunk-local codes are remapped onto the global dictionary
+        local_codes, uniques = chunk["Type"].factorize()
+        global_codes = np.empty(len(uniques) + 1, dtype=np.int32)
+        global_codes[-1] = -1
+        for i, value in enumerate(uniques.tolist()):
+            if value not in self._type_codes:
+                self._type_codes[value] = len(self.type_categories)
+                self.type_categories.append(value)
+            global_codes[i] = self._type_codes[value]
+        self._files["type.i32"].write(global_codes[local_codes].tobytes())
+
+        lengths = np.empty(len(chunk), dtype=np.int64)
+        names = self._files["name.bin"]
+        for i, value in enumerate(chunk["Equipment Name"].tolist()):
+            if isinstance(value, float) and np.isnan(value):
+                lengths[i] = -1
+                continue
+            encoded = str(value).encode("utf-8")
+            names.write(encoded)
+            lengths[i] = len(encoded)
+        self._files["name_len.i64"].write(lengths.tobytes())
+
+        self.rows += len(chunk)
+
+    def write_column(self, name, dtype, chunks):
+        """Write a per-row column given as consecutive array chunks; returns it memory-mapped"""
+        with open(os.path.join(self.path, name), "wb") as f:
+            for chunk in chunks:
+                f.write(np.asarray(chunk, dtype=dtype).tobytes())
+        return self._map(name, dtype)
+
+    def _map(self, name, dtype):
+        self.close()  # flush pending writes before mapping
+        if self.rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(os.path.join(self.path, name), dtype=dtype, mode="r", shape=(self.rows,))
+
+    def numeric(self, column):
+        """Read-only memory-mapped float64 array for a numeric column"""
+        return self._map(f"{column}.f64", np.float64)
+
+    def column(self, name, dtype):
+        """Read-only memory-mapped array for a column added with write_column()"""
+        return self._map(name, dtype)
+
+    def type_codes(self):
+        """Read-only memory-mapped Type codes (indexes into type_categories, -1 = missing)"""
+        return self._map("type.i32", np.int32)
+
+    def types(self, start=0, stop=None):
+        """Type values of rows start:stop as an object array (NaN where missing)"""
+        codes = self.type_codes()[start:stop]
+        categories = np.array(self.type_categories + [float("nan")], dtype=object)
+        # code -1 indexes the trailing NaN entry
+        return categories[codes]
+
+    def iter_names(self, batch_rows):
+        """Equipment names as lists of str (NaN where missing), batch_rows rows at a time"""
+        lengths = self._map("name_len.i64", np.int64)
+        with open(os.path.join(self.path, "name.bin"), "rb") as f:
+            # mmap cannot map an empty file; then every name is "" or missing
+            empty = os.fstat(f.fileno()).st_size == 0
+            with (mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if not empty else memoryview(b"")) as data:
+                offset = 0
+                for start in range(0, self.rows, batch_rows):
+                    names = []
+                    for length in lengths[start:start + batch_rows].tolist():
+                        if length < 0:
+                            names.append(float("nan"))
+                            continue
+                        names.append(bytes(data[offset:offset + length]).decode("utf-8"))
+                        offset += length
+                    yield names
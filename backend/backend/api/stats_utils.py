@@ -0,0 +1,145 @@
+# Mergeable running statistics used by the chunked CSV ingestion path
+# Pure numpy - no pandas, Django or HTTP code
+import numpy as np
+
+
+class RunningStats:
+    """
+    Running count, mean/variance (Welford), min and max for one column.
+    Chunks are folded in with Chan's parallel update, so two instances
+    can also be merged.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+
+    def update(self, values):
+        """Fold an array of values into the accumulator (NaN is skipped)"""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+
+        chunk = RunningStats()
+        chunk.count = len(values)
+        chunk.mean = float(values.mean())
+        chunk.m2 = float(((values - chunk.mean) ** 2).sum())
+        chunk.min = float(values.min())
+        chunk.max = float(values.max())
+        self.merge(chunk)
+
+    def merge(self, other):
+        """Combine another RunningStats into this one"""
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return
+
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def std(self):
+        """Sample standard deviation (ddof=1, same as pandas)"""
+        if self.count < 2:
+            return float("nan")
+        return float(np.sqrt(self.m2 / (self.count - 1)))
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch (KLL-style compactor hierarchy).
+
+    Level h holds items that each stand for 2**h input values. When a level
+    grows past k items it is sorted and every other item is promoted to the
+    next level, so memory stays around k * log2(n / k) floats. While nothing
+    has been compacted the sketch still holds every value and answers exactly.
+    """
+
+    def __init__(self, k=4096, seed=None):
+        self.k = k
+        self.count = 0
+        self.levels = [np.empty(0, dtype=np.float64)]
+        self._rng = np.random.default_rng(seed)
+
+    @property
+    def is_exact(self):
+        return len(self.levels) == 1
+
+    def update(self, values):
+        """Add an array of values to the sketch (NaN is skipped)"""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self.count += len(values)
+        self._compress()
+
+    def merge(self, other):
+        """Combine another sketch into this one"""
+        for height, items in enumerate(other.levels):
+            if height == len(self.levels):
+                self.levels.append(np.empty(0, dtype=np.float64))
+            self.levels[height] = np.concatenate([self.levels[height], items])
+        self.count += other.count
+        self._compress()
+
+    def _compress(self):
+        height = 0
+        while height < len(self.levels):
+            items = self.levels[height]
+            if len(items) > self.k:
+                items = np.sort(items)
+                # An odd item out stays behind so total weight is preserved
+                keep = items[len(items) - len(items) % 2:]
+                items = items[:len(items) - len(items) % 2]
+                promoted = items[self._rng.integers(2)::2]
+                self.levels[height] = keep
+                if height + 1 == len(self.levels):
+                    self.levels.append(np.empty(0, dtype=np.float64))
+                self.levels[height + 1] = np.concatenate([self.levels[height + 1], promoted])
+            height += 1
+
+    def _weighted(self):
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([
+            np.full(len(items), 2 ** height, dtype=np.int64)
+            for height, items in enumerate(self.levels)
+        ])
+        order = np.argsort(values, kind="stable")
+        return values[order], weights[order]
+
+    def quantile(self, q):
+        """
+        Value at quantile q. Exact (linear interpolation, same as pandas)
+        while the sketch has not compacted, approximate afterwards.
+        """
+        if self.count == 0:
+            return float("nan")
+        if self.is_exact:
+            return float(np.quantile(self.levels[0], q))
+
+        values, weights = self._weighted()
+        cumulative = np.cumsum(weights)
+        index = np.searchsorted(cumulative, q * cumulative[-1], side="left")
+        return float(values[min(index, len(values) - 1)])
+
+    def count_below(self, value):
+        """Estimated number of values strictly below value"""
+        values, weights = self._weighted()
+        return int(weights[:np.searchsorted(values, value, side="left")].sum())
+
+    def count_above(self, value):
+        """Estimated number of values strictly above value"""
+        values, weights = self._weighted()
+        return int(weights[np.searchsorted(values, value, side="right"):].sum())
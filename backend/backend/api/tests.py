@@ -1,3 +1,1365 @@
-from django.test import TestCase
+import datetime
+import decimal
+import gzip
+import io
+import json
+import os
+import pstats
+import tempfile
+import threading
+import time
+import tracemalloc
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from importlib.util import find_spec
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import skipUnless
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.http import FileResponse
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+
+from . import scatter_sampling
+from .admission import BACKGROUND, INTERACTIVE, AdmissionGate, Overloaded
+from .apps import start_server_tasks
+from .arrow_utils import iter_arrow
+from .artifacts import ArtifactLock, get_artifact, store_artifact
+from .chart_utils import (
+    FigurePool,
+    HealthBarChart,
+    ScatterChart,
+    render_health_bars,
+    render_scatter,
+    render_type_distribution,
+)
+from .export_utils import generate_csv, iter_csv, iter_excel
+from .exports import EXPORTS, export_response, get_or_render, prerender_exports
+from .jobs import claim_next_job, recover_stale_jobs, run_job
+from .metrics import Counter, Histogram, Registry
+from .middleware import choose_encoding
+from .models import ANALYSIS_FIELDS, AnalysisJob, Dataset, EquipmentRecord, ReportArtifact, create_dataset
+from .pagination import encode_cursor
+from .pdf_utils import generate_pdf
+from .renderers import FastJSONParser, FastJSONRenderer
+from .scatter_sampling import plan_scatter
+from .stats_utils import QuantileSketch, RunningStats
+from .utils import (
+    CSV_DTYPES,
+    analyze_csv,
+    analyze_csv_exact,
+    analyze_csv_stream,
+    calculate_health_score,
+    calculate_health_scores,
+    discard_spill,
+    iter_equipment_rows,
+    read_equipment_csv,
+)
+from .vector_charts import scatter_drawing
+
+
+# Test requests are plain HTTP; with DEBUG off (the shipped settings) they would be redirected to HTTPS
+plain_http = override_settings(SECURE_SSL_REDIRECT=False)
+
+
+def make_csv(rows=500, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "Equipment Name": [f"EQ-{i}" for i in range(rows)],
+        "Type": rng.choice(["Pump", "Valve", "Reactor"], size=rows),
+        "Flowrate": rng.normal(120, 30, size=rows).round(2),
+        "Pressure": rng.normal(6, 1.5, size=rows).round(2),
+        "Temperature": rng.normal(118, 15, size=rows).round(2),
+    })
+    buffer = io.BytesIO()
+    df.to_csv(buffer, index=False)
+    buffer.seek(0)
+    return buffer
+
+
+class HealthScoreTests(SimpleTestCase):
+    def test_vectorized_scores_match_row_wise_scores(self):
+        df = pd.read_csv(make_csv(2000))
+        # Exact band edges for pressure and temperature
+        df.loc[:7, "Pressure"] = [3.5, 4.0, 8.0, 8.5, 3.49, 8.51, 3.99, 8.01]
+        df.loc[:7, "Temperature"] = [90, 95, 140, 145, 89.9, 145.1, 94.9, 140.1]
+        stats = {
+            'flowrate': {'mean': df["Flowrate"].mean(), 'std': df["Flowrate"].std()},
+        }
+
+        expected = df.apply(lambda row: calculate_health_score(row, stats), axis=1).to_numpy()
+        actual = calculate_health_scores(df, stats)
+
+        np.testing.assert_array_equal(actual, expected)
+
+    def test_analyze_csv_scores(self):
+        result = analyze_csv(make_csv(200))
+        self.assertEqual(len(result["equipment_data"]), 200)
+        for eq in result["equipment_data"]:
+            self.assertTrue(0 <= eq["health_score"] <= 100)
+
+
+class AnalyzeCsvTests(SimpleTestCase):
+    def test_result_is_native_json(self):
+        result = analyze_csv(make_csv(300))
+        # Plain json (no default hook) fails on numpy scalars
+        json.dumps(result)
+
+    def test_ranking_and_risk_summary(self):
+        result = analyze_csv(make_csv(300))
+        ranking = result["efficiency_ranking"]
+        self.assertEqual([item["rank"] for item in ranking], list(range(1, 301)))
+        scores = [item["health_score"] for item in ranking]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertEqual(sum(result["risk_summary"].values()), 300)
+        self.assertEqual(result["outlier_count"], len(result["outliers"]))
+
+
+class CsvParsingTests(SimpleTestCase):
+    def wide_csv(self):
+        df = pd.read_csv(make_csv(300))
+        df["Comment"] = "free text, with commas"
+        df["Timestamp"] = "2026-01-01T00:00:00"
+        df["Tag"] = ["x", 1, None] * 100
+        return df.to_csv(index=False).encode()
+
+    def test_reads_only_required_columns_with_fixed_dtypes(self):
+        df = read_equipment_csv(io.BytesIO(self.wide_csv()))
+        self.assertEqual(list(df.columns), list(CSV_DTYPES))
+        self.assertEqual(str(df["Type"].dtype), "category")
+        for column in ("Flowrate", "Pressure", "Temperature"):
+            self.assertEqual(df[column].dtype, np.float64)
+
+    def test_c_engine_fallback_matches_default_engine(self):
+        data = self.wide_csv()
+        with mock.patch("api.utils.csv_engine", return_value="c"):
+            c_result = analyze_csv(io.BytesIO(data))
+        self.assertEqual(analyze_csv(io.BytesIO(data)), c_result)
+
+    def test_missing_column_reported_before_parsing(self):
+        with self.assertRaisesMessage(ValueError, "Missing required column: Type"):
+            analyze_csv(io.BytesIO(b"Equipment Name,Flowrate,Pressure,Temperature\nP1,1,2,3\n"))
+
+
+class StreamingAnalysisTests(SimpleTestCase):
+    def test_running_stats_match_numpy(self):
+        values = np.random.default_rng(1).normal(50, 10, size=10_000)
+        running = RunningStats()
+        for chunk in np.array_split(values, 7):
+            running.update(chunk)
+        self.assertEqual(running.count, 10_000)
+        self.assertAlmostEqual(running.mean, values.mean(), places=9)
+        self.assertAlmostEqual(running.std, values.std(ddof=1), places=9)
+        self.assertEqual((running.min, running.max), (values.min(), values.max()))
+
+    def test_quantile_sketch_is_mergeable_and_bounded(self):
+        values = np.random.default_rng(2).uniform(0, 1000, size=200_000)
+        left, right = QuantileSketch(k=256, seed=0), QuantileSketch(k=256, seed=0)
+        for chunk in np.array_split(values[:100_000], 10):
+            left.update(chunk)
+        for chunk in np.array_split(values[100_000:], 10):
+            right.update(chunk)
+        left.merge(right)
+
+        self.assertEqual(left.count, 200_000)
+        self.assertLess(sum(len(level) for level in left.levels), 256 * len(left.levels))
+        for q in (0.25, 0.5, 0.75):
+            self.assertAlmostEqual(left.quantile(q), np.quantile(values, q), delta=20)
+
+    def test_stream_summary_matches_full_analysis(self):
+        full = analyze_csv(make_csv(1000))
+        stream = analyze_csv_stream(make_csv(1000), chunksize=128)
+
+        self.assertEqual(stream["total_equipment"], full["total_equipment"])
+        self.assertEqual(stream["type_distribution"], full["type_distribution"])
+        self.assertAlmostEqual(stream["avg_health_score"], full["avg_health_score"], places=1)
+        for param in ("flowrate", "pressure", "temperature"):
+            for key in ("mean", "min", "max", "median", "std"):
+                self.assertAlmostEqual(stream["statistics"][param][key], full["statistics"][param][key], places=2)
+
+    def test_stream_validates_columns_on_first_chunk(self):
+        with self.assertRaisesMessage(ValueError, "Missing required column: Pressure"):
+            analyze_csv_stream(io.BytesIO(b"Equipment Name,Type,Flowrate,Temperature\nP1,Pump,1,100\n"))
+
+
+class ExactAnalysisTests(TestCase):
+    def results(self, analysis, batch_rows=5000):
+        """Summary and per-row results of an analysis, as stored; discards an exact-mode spill"""
+        try:
+            summary = {field: analysis[field] for field in ANALYSIS_FIELDS}
+            return summary, list(iter_equipment_rows(analysis, batch_rows))
+        finally:
+            discard_spill(analysis)
+
+    def test_exact_mode_matches_full_analysis(self):
+        data = make_csv(2500).getvalue()
+        exact = analyze_csv_exact(io.BytesIO(data), chunksize=300)
+        self.assertNotIn("equipment_data", exact)
+        spill = exact["equipment_spill"]
+        self.assertEqual(
+            self.results(exact, batch_rows=700),
+            self.results(analyze_csv(io.BytesIO(data))),
+        )
+        self.assertFalse(os.path.exists(spill))
+
+    def test_exact_mode_heap_does_not_hold_per_row_objects(self):
+        def peak_per_row(rows):
+            data = make_csv(rows).getvalue()
+            tracemalloc.start()
+            try:
+                analysis = analyze_csv_exact(io.BytesIO(data), chunksize=1000)
+                for _ in iter_equipment_rows(analysis, batch_rows=1000):
+                    pass
+                return tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+                discard_spill(analysis)
+
+        # Only a few numeric arrays grow with the file (8 bytes per row each);
+        # the full analysis holds ~1 KiB of dicts and strings per row
+        small, large = peak_per_row(10_000), peak_per_row(40_000)
+        self.assertLess((large - small) / 30_000, 64)
+
+    def test_exact_mode_handles_integer_columns_and_missing_values(self):
+        df = pd.read_csv(make_csv(200))
+        df["Temperature"] = df["Temperature"].round().astype(int)
+        df.loc[3, "Type"] = None
+        df.loc[5, "Pressure"] = None
+        data = df.to_csv(index=False).encode()
+
+        exact = self.results(analyze_csv_exact(io.BytesIO(data), chunksize=64), batch_rows=50)
+        full = self.results(analyze_csv(io.BytesIO(data)))
+        self.assertEqual(json.dumps(exact), json.dumps(full))
+
+    def test_exact_upload_stores_the_same_records(self):
+        data = make_csv(300).getvalue()
+        full = create_dataset("plant.csv", "full", "", analyze_csv(io.BytesIO(data)), batch_size=64)
+        analysis = analyze_csv_exact(io.BytesIO(data), chunksize=100)
+        exact = create_dataset("plant.csv", "exact", "", analysis, batch_size=64)
+        self.assertFalse(os.path.exists(analysis["equipment_spill"]))
+        fields = [f.name for f in EquipmentRecord._meta.fields if f.name not in ("id", "dataset")]
+        self.assertEqual(
+            list(exact.equipment.order_by("row").values_list(*fields)),
+            list(full.equipment.order_by("row").values_list(*fields)),
+        )
+
+
+
+class ChartPoolTests(SimpleTestCase):
+    def test_figures_are_reused_between_renders(self):
+        pool = FigurePool(HealthBarChart, size=1)
+        with pool.chart() as chart:
+            first = chart.render(["P-1", "P-2"], [90.0, 60.0]).getvalue()
+        with pool.chart() as again:
+            second = again.render(["P-1", "P-2"], [90.0, 60.0]).getvalue()
+        self.assertIs(again, chart)
+        self.assertTrue(first.startswith(b"\x89PNG"))
+        self.assertEqual(len(chart.ax.patches), 2)  # previous bars were replaced
+        self.assertEqual(first, second)
+
+    def test_warm_up_starts_with_server_processes_only(self):
+        from django.apps import apps
+
+        with mock.patch("api.apps.threading.Thread") as thread, mock.patch("api.jobs.autostart_worker") as worker:
+            apps.get_app_config("api").ready()  # what every management command runs
+            thread.assert_not_called()
+            start_server_tasks()  # what wsgi.py / asgi.py run
+        thread.assert_called_once()
+        worker.assert_called_once()
+
+    def test_failed_render_is_not_returned_to_pool(self):
+        pool = FigurePool(ScatterChart, size=1)
+        with self.assertRaises(ValueError):
+            with pool.chart() as chart:
+                raise ValueError("boom")
+        with pool.chart() as fresh:
+            self.assertIsNot(fresh, chart)
+
+    def test_parallel_renders_match_serial(self):
+        def charts(seed):
+            rng = np.random.default_rng(seed)
+            rows = 3000 if seed % 2 else 200  # alternate between dense and plain scatters
+            scores = rng.uniform(40, 100, rows)
+            return (
+                render_type_distribution({"Pump": seed + 1, "Valve": 3}).getvalue(),
+                render_scatter(rng.normal(6, 1, rows), rng.normal(118, 15, rows), scores, max_points=1000).getvalue(),
+                render_health_bars([f"P-{seed}-{i}" for i in range(10)], scores[:10]).getvalue(),
+            )
+
+        seeds = list(range(4))
+        serial = [charts(seed) for seed in seeds]
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            parallel = list(executor.map(charts, seeds))
+        # Compared one by one: a failing assertEqual on lists of PNG bytes builds a huge diff
+        for got, expected in zip(parallel, serial):
+            self.assertTrue(got == expected)
+
+    def test_parallel_reports(self):
+        def report(seed):
+            analysis = analyze_csv(make_csv(100, seed))
+            dataset = SimpleNamespace(name=f"plant-{seed}.csv", uploaded_at=datetime.datetime.now(), **analysis)
+            return generate_pdf(dataset)
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            reports = list(executor.map(report, range(4)))
+        self.assertTrue(all(pdf.startswith(b"%PDF") and pdf.rstrip().endswith(b"%%EOF") for pdf in reports))
+
+
+
+class ScatterSamplingTests(SimpleTestCase):
+    def test_small_scatter_keeps_every_point(self):
+        plan = plan_scatter([1.0, 2.0, np.nan], [3.0, 4.0, 5.0], [90.0, 50.0, 80.0], max_points=5)
+        self.assertFalse(plan["dense"])
+        self.assertEqual(plan["x"].tolist(), [1.0, 2.0])
+
+    def test_large_scatter_overlays_outliers_and_high_risk(self):
+        rng = np.random.default_rng(0)
+        scores = rng.uniform(40, 100, 1000)
+        plan = plan_scatter(rng.normal(size=1000), rng.normal(size=1000), scores, outlier_rows=[3, 7], max_points=100)
+        self.assertTrue(plan["dense"])
+        self.assertEqual(len(plan["x"]), 1000)
+        expected = (scores < 70) | np.isin(np.arange(1000), [3, 7])
+        self.assertEqual(len(plan["highlight_x"]), expected.sum())
+        self.assertEqual(sorted(plan["highlight_scores"]), sorted(scores[expected]))
+
+    def test_dense_charts_render(self):
+        rng = np.random.default_rng(1)
+        args = (rng.normal(6, 1, 3000), rng.normal(118, 15, 3000), rng.uniform(40, 100, 3000))
+        png = render_scatter(*args, outlier_rows=[0], max_points=500)
+        self.assertTrue(png.getvalue().startswith(b"\x89PNG"))
+        drawing = scatter_drawing(*args, 400, 300, outlier_rows=[0], max_points=500)
+        self.assertGreater(len(drawing.contents), 3)
+
+    def test_desktop_copy_matches(self):
+        desktop = Path(settings.BASE_DIR).parents[1] / "frontend-desktop" / "utils" / "scatter_sampling.py"
+        if not desktop.exists():
+            self.skipTest("desktop app not checked out")
+
+        def code(path):
+            # Everything but the header comment, which says which copy it is
+            return [line for line in Path(path).read_text().splitlines() if not line.startswith("#")]
+
+        self.assertEqual(code(desktop), code(scatter_sampling.__file__))
+
+
+class AdmissionGateTests(SimpleTestCase):
+    def waiter(self, gate, priority, order):
+        def run():
+            with gate.slot(priority):
+                order.append(priority)
+        thread = threading.Thread(target=run)
+        thread.start()
+        return thread
+
+    def wait_for_queue(self, gate, size):
+        for _ in range(200):
+            if gate.waiting == size:
+                return
+            time.sleep(0.01)
+        self.fail(f"queue never reached {size}")
+
+    def test_full_queue_is_refused(self):
+        gate = AdmissionGate(max_concurrent=1, max_queue=1, queue_timeout=5, retry_after=7)
+        gate.acquire()
+        order = []
+        queued = self.waiter(gate, INTERACTIVE, order)
+        self.wait_for_queue(gate, 1)
+        with self.assertRaises(Overloaded) as refused:
+            gate.acquire()
+        self.assertEqual(refused.exception.retry_after, 7)
+
+        gate.release()
+        queued.join()
+        self.assertEqual(order, [INTERACTIVE])
+        self.assertEqual((gate.running, gate.waiting), (0, 0))
+
+    def test_queue_timeout(self):
+        gate = AdmissionGate(max_concurrent=1, max_queue=5, queue_timeout=0.05, retry_after=1)
+        with gate.slot(), self.assertRaises(Overloaded):
+            gate.acquire()
+        self.assertEqual((gate.running, gate.waiting), (0, 0))
+
+    def test_interactive_requests_go_before_background_renders(self):
+        gate = AdmissionGate(max_concurrent=1, max_queue=5, queue_timeout=5, retry_after=1)
+        gate.acquire()
+        order = []
+        threads = [self.waiter(gate, BACKGROUND, order)]
+        self.wait_for_queue(gate, 1)
+        threads.append(self.waiter(gate, INTERACTIVE, order))
+        self.wait_for_queue(gate, 2)
+        gate.release()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(order, [INTERACTIVE, BACKGROUND])
+
+    def test_requests_waiting_elsewhere_count_against_the_queue(self):
+        gate = AdmissionGate(max_concurrent=1, max_queue=1, queue_timeout=5, retry_after=1)
+        gate.acquire()
+        with gate.queue_place():
+            self.assertEqual(gate.waiting, 1)
+            with self.assertRaises(Overloaded):
+                gate.acquire()
+            with self.assertRaises(Overloaded), gate.queue_place():
+                pass
+            with gate.queue_place(BACKGROUND):  # not counted, never refused
+                self.assertEqual(gate.waiting, 1)
+        self.assertEqual(gate.waiting, 0)
+        gate.release()
+
+
+class RendererTests(SimpleTestCase):
+    payload = {
+        "count": np.int64(3),
+        "score": np.float64(81.5),
+        "flag": np.bool_(True),
+        "scores": np.array([1.5, 2.5]),
+        "price": decimal.Decimal("2.50"),
+        "when": datetime.datetime(2026, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc),
+        "precise": datetime.datetime(2026, 1, 2, 3, 4, 5, 123456, tzinfo=datetime.timezone.utc),
+        "day": datetime.date(2026, 1, 2),
+        "offset": datetime.datetime(2026, 1, 2, 3, 4, 5, tzinfo=datetime.timezone(datetime.timedelta(seconds=30))),
+        "types": {"Pump": 2, 7: 1},
+    }
+
+    def test_matches_stdlib_renderer(self):
+        fast = json.loads(FastJSONRenderer().render(self.payload))
+        self.assertEqual(fast, json.loads(JSONRenderer().render(self.payload)))
+        self.assertEqual(fast["when"], "2026-01-02T03:04:05Z")
+        self.assertEqual(fast["precise"], "2026-01-02T03:04:05.123456Z")
+        self.assertEqual(fast["scores"], [1.5, 2.5])
+
+        with mock.patch("api.renderers.orjson", None):
+            self.assertEqual(FastJSONRenderer().render(self.payload), JSONRenderer().render(self.payload))
+
+    def test_indent_uses_stdlib(self):
+        rendered = FastJSONRenderer().render({"a": 1}, "application/json; indent=4")
+        self.assertEqual(rendered, b'{\n    "a": 1\n}')
+
+    def test_parser(self):
+        self.assertEqual(FastJSONParser().parse(io.BytesIO(b'{"mode": "stream"}')), {"mode": "stream"})
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b"{mode"))
+        with mock.patch("api.renderers.orjson", None), self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b"{mode"))
+
+
+class MetricsFormatTests(SimpleTestCase):
+    def test_text_format(self):
+        registry = Registry()
+        hits = registry.register(Counter("hits_total", "Hits.", ("path",)))
+        latency = registry.register(Histogram("latency_seconds", "Latency.", buckets=(0.1, 1)))
+        hits.inc(path='a"b')
+        hits.inc(2, path='a"b')
+        for value in (0.05, 0.1, 0.5, 3):
+            latency.observe(value)
+
+        self.assertEqual(registry.render().splitlines(), [
+            "# HELP hits_total Hits.",
+            "# TYPE hits_total counter",
+            'hits_total{path="a\\"b"} 3',
+            "# HELP latency_seconds Latency.",
+            "# TYPE latency_seconds histogram",
+            'latency_seconds_bucket{le="0.1"} 2',
+            'latency_seconds_bucket{le="1"} 3',
+            'latency_seconds_bucket{le="+Inf"} 4',
+            "latency_seconds_sum 3.65",
+            "latency_seconds_count 4",
+        ])
+        with self.assertRaises(ValueError):
+            hits.inc(route="a")
+
+
+@plain_http
+class UploadViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username="tester", password="pw"))
+
+    def upload(self, rows=100, query=""):
+        upload = SimpleUploadedFile("plant.csv", make_csv(rows).getvalue(), content_type="text/csv")
+        return self.client.post(f"/api/upload/{query}", {"file": upload}, format="multipart")
+
+    def test_full_upload(self):
+        response = self.upload()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data["equipment_data"]), 100)
+        self.assertEqual(response.data["analysis_mode"], "full")
+
+    def test_upload_stores_equipment_records(self):
+        response = self.upload(rows=300)
+        analysis = analyze_csv(make_csv(300))
+
+        dataset = Dataset.objects.get(id=response.data["id"])
+        self.assertEqual(dataset.equipment.count(), 300)
+        self.assertEqual(dataset.equipment.filter(is_outlier=True).count(), analysis["outlier_count"])
+        self.assertEqual(dataset.equipment.get(rank=1).health_score, analysis["efficiency_ranking"][0]["health_score"])
+        for field in ("equipment_data", "efficiency_ranking", "outliers"):
+            self.assertEqual(response.data[field], analysis[field])
+
+    def test_long_names_and_types_are_stored_whole(self):
+        name, kind = "N" * 400, "T" * 300
+        rows = "".join(f"{name}{i},{kind},{120 + i},6,118\n" for i in range(5))
+        csv = f"Equipment Name,Type,Flowrate,Pressure,Temperature\n{rows}".encode()
+        upload = SimpleUploadedFile("plant.csv", csv, content_type="text/csv")
+        response = self.client.post("/api/upload/", {"file": upload}, format="multipart")
+        self.assertEqual(response.status_code, 201)
+        record = EquipmentRecord.objects.get(dataset_id=response.data["id"], row=0)
+        self.assertEqual((record.name, record.type), (name + "0", kind))
+
+    def test_stream_upload(self):
+        response = self.upload(query="?mode=stream")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["analysis_mode"], "stream")
+        self.assertEqual(response.data["total_equipment"], 100)
+        self.assertEqual(response.data["equipment_data"], [])
+        self.assertEqual(Dataset.objects.count(), 1)
+
+    def test_repeated_upload_reuses_existing_dataset(self):
+        first = self.upload()
+        with mock.patch("api.views.analyze_upload") as analyze:
+            second = self.upload()
+        analyze.assert_not_called()
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second["X-Upload-Deduplicated"], "true")
+        self.assertEqual(second.data["id"], first.data["id"])
+        self.assertEqual(Dataset.objects.count(), 1)
+
+    def test_fresh_upload_and_other_modes_are_not_deduplicated(self):
+        first = self.upload()
+        self.assertEqual(self.upload(query="?fresh=true").status_code, 201)
+        self.assertEqual(self.upload(query="?mode=stream").status_code, 201)
+        self.assertEqual(Dataset.objects.count(), 3)
+        self.assertEqual(len(first.data["content_hash"]), 64)
+
+    def test_upload_schedules_export_prerender(self):
+        with mock.patch("api.exports.prerender_exports") as prerender:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.upload()
+        prerender.assert_called_once_with(response.data["id"])
+
+    def test_exact_upload(self):
+        response = self.upload(query="?mode=exact")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["analysis_mode"], "exact")
+        self.assertEqual(len(response.data["equipment_data"]), 100)
+
+
+
+@plain_http
+class AsyncUploadTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username="tester", password="pw"))
+        self.spool = tempfile.TemporaryDirectory()
+        self.addCleanup(self.spool.cleanup)
+        overrides = override_settings(ANALYSIS_JOB_AUTOSTART=False, JOB_UPLOAD_DIR=self.spool.name)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def upload(self, content, query="?async=true"):
+        upload = SimpleUploadedFile("plant.csv", content, content_type="text/csv")
+        return self.client.post(f"/api/upload/{query}", {"file": upload}, format="multipart")
+
+    def test_async_upload_queues_and_completes(self):
+        response = self.upload(make_csv(200).getvalue())
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data["status"], AnalysisJob.QUEUED)
+        self.assertEqual(Dataset.objects.count(), 0)
+
+        job = claim_next_job()
+        self.assertEqual(str(job.id), response.data["id"])
+        self.assertIsNone(claim_next_job())
+        run_job(job)
+
+        status = self.client.get(response.data["status_url"])
+        self.assertEqual(status.data["status"], AnalysisJob.DONE)
+        self.assertEqual(status.data["progress"], 100)
+        dataset = Dataset.objects.get(id=status.data["dataset"])
+        self.assertEqual(dataset.equipment.count(), 200)
+        self.assertEqual(dataset.total_equipment, analyze_csv(make_csv(200))["total_equipment"])
+        self.assertEqual(os.listdir(self.spool.name), [])
+
+    def test_failed_job_reports_error(self):
+        response = self.upload(b"Equipment Name,Type\nP-1,Pump\n")
+        run_job(claim_next_job())
+
+        status = self.client.get(response.data["status_url"])
+        self.assertEqual(status.data["status"], AnalysisJob.FAILED)
+        self.assertIn("Missing required column", status.data["error"])
+        self.assertEqual(Dataset.objects.count(), 0)
+
+    def strand(self, job):
+        """Simulate a worker that died: the heartbeat stopped a lease ago"""
+        AnalysisJob.objects.filter(id=job.id).update(
+            heartbeat_at=job.heartbeat_at - datetime.timedelta(seconds=settings.ANALYSIS_JOB_LEASE_SECONDS + 1)
+        )
+
+    def test_stranded_job_is_requeued(self):
+        response = self.upload(make_csv(50).getvalue())
+        job = claim_next_job()
+        self.assertEqual(recover_stale_jobs(), 0)  # heartbeat is fresh
+
+        self.strand(job)
+        self.assertEqual(recover_stale_jobs(), 1)
+        self.assertEqual(AnalysisJob.objects.get(id=job.id).status, AnalysisJob.QUEUED)
+
+        job = claim_next_job()
+        self.assertEqual(job.attempts, 2)
+        run_job(job)
+        self.assertEqual(self.client.get(response.data["status_url"]).data["status"], AnalysisJob.DONE)
+
+    @override_settings(ANALYSIS_JOB_MAX_ATTEMPTS=1)
+    def test_stranded_job_fails_after_max_attempts(self):
+        response = self.upload(make_csv(50).getvalue())
+        self.strand(claim_next_job())
+        self.assertEqual(recover_stale_jobs(), 1)
+
+        status = self.client.get(response.data["status_url"]).data
+        self.assertEqual(status["status"], AnalysisJob.FAILED)
+        self.assertIn("worker stopped", status["error"])
+        self.assertEqual(os.listdir(self.spool.name), [])
+        self.assertIsNone(claim_next_job())
+
+    def test_unknown_job(self):
+        response = self.client.get("/api/jobs/00000000-0000-0000-0000-000000000000/")
+        self.assertEqual(response.status_code, 404)
+
+
+@plain_http
+class HistoryViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username="tester", password="pw"))
+        for seed in range(6):
+            upload = SimpleUploadedFile("plant.csv", make_csv(50, seed).getvalue(), content_type="text/csv")
+            self.client.post("/api/upload/", {"file": upload}, format="multipart")
+
+    def test_history_returns_summary_only(self):
+        # One query for the datasets; no per-dataset equipment queries
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/history/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 5)
+        self.assertNotIn("equipment_data", response.data[0])
+        self.assertIn("total_equipment", response.data[0])
+
+    def test_dataset_detail_returns_full_payload(self):
+        dataset_id = self.client.get("/api/history/").data[0]["id"]
+        response = self.client.get(f"/api/datasets/{dataset_id}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["equipment_data"]), 50)
+        self.assertEqual(self.client.get("/api/datasets/999/").status_code, 404)
+
+
+@plain_http
+class EquipmentEndpointTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username="tester", password="pw"))
+        upload = SimpleUploadedFile("plant.csv", make_csv(250).getvalue(), content_type="text/csv")
+        self.dataset_id = self.client.post("/api/upload/", {"file": upload}, format="multipart").data["id"]
+        self.url = f"/api/datasets/{self.dataset_id}/equipment/"
+
+    def fetch_all(self, **params):
+        items, cursor = [], None
+        while True:
+            query = dict(params, **({"cursor": cursor} if cursor else {}))
+            response = self.client.get(self.url, query)
+            self.assertEqual(response.status_code, 200)
+            items.extend(response.data["results"])
+            cursor = response.data["next_cursor"]
+            if not cursor:
+                return items
+
+    def test_pages_cover_every_row_in_sort_order(self):
+        items = self.fetch_all(sort="-health_score", page_size=37)
+        self.assertEqual(sorted(item["row"] for item in items), list(range(250)))
+        expected = sorted(items, key=lambda item: (-item["health_score"], item["row"]))
+        self.assertEqual(items, expected)
+
+    def test_null_sort_values_come_last(self):
+        EquipmentRecord.objects.filter(dataset_id=self.dataset_id, row__in=[3, 40, 41]).update(pressure=None)
+        items = self.fetch_all(sort="pressure", page_size=50)
+        self.assertEqual(len(items), 250)
+        self.assertEqual([item["row"] for item in items[-3:]], [3, 40, 41])
+
+    def test_filters(self):
+        items = self.fetch_all(type="Pump", risk="low", min_health=80, page_size=1000)
+        records = EquipmentRecord.objects.filter(
+            dataset_id=self.dataset_id, type="Pump", risk="LOW", health_score__gte=80
+        )
+        self.assertEqual(len(items), records.count())
+        self.assertTrue(all(item["type"] == "Pump" and item["risk"] == "LOW" for item in items))
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.get(self.url, {"sort": "name"}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {"cursor": "not-a-cursor"}).status_code, 400)
+        for value, row in [("x", 1), ([1], 1), ({"a": 1}, 1), (True, 1), (1.5, True), (1.5, "1")]:
+            cursor = encode_cursor(value, row)
+            response = self.client.get(self.url, {"sort": "pressure", "cursor": cursor})
+            self.assertEqual(response.status_code, 400, (value, row))
+        self.assertEqual(self.client.get(self.url, {"min_health": "high"}).status_code, 400)
+        self.assertEqual(self.client.get("/api/datasets/999/equipment/").status_code, 404)
+
+
+@plain_http
+# Uploads commit here, so they would start pre-renders racing the tests
+@override_settings(EXPORT_PRERENDER=False)
+class CompressionTests(TransactionTestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username="tester", password="pw"))
+        upload = SimpleUploadedFile("plant.csv", make_csv(200).getvalue(), content_type="text/csv")
+        self.dataset_id = self.client.post("/api/upload/", {"file": upload}, format="multipart").data["id"]
+        self.url = f"/api/datasets/{self.dataset_id}/"
+
+    def test_gzip(self):
+        plain = self.client.get(self.url)
+        self.assertFalse(plain.has_header("Content-Encoding"))
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertEqual(int(response["Content-Length"]), len(response.content))
+        self.assertLess(len(response.content), len(plain.content) / 3)
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+
+    def test_choose_encoding(self):
+        self.assertEqual(choose_encoding("zstd;q=0, br;q=0, gzip")[0], "gzip")
+        self.assertIsNone(choose_encoding("identity"))
+        self.assertIsNone(choose_encoding(""))
+
+    @skipUnless(find_spec("brotli") and find_spec("zstandard"), "brotli and zstandard are optional")
+    def test_prefers_zstd_then_brotli(self):
+        import brotli
+        import zstandard
+
+        self.assertEqual(choose_encoding("gzip, br, zstd")[0], "zstd")
+        self.assertEqual(choose_encoding("gzip, br;q=0.5")[0], "br")
+        self.assertEqual(choose_encoding("*")[0], "zstd")
+
+        plain = self.client.get(self.url).content
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING="br, zstd")
+        self.assertEqual(response["Content-Encoding"], "zstd")
+        self.assertEqual(zstandard.ZstdDecompressor().decompress(response.content), plain)
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING="br")
+        self.assertEqual(brotli.decompress(response.content), plain)
+
+    def stream_csv(self, accept_encoding):
+        """The CSV export as it is streamed (no cached artifact yet), and its chunks"""
+        cache = tempfile.TemporaryDirectory()
+        self.addCleanup(cache.cleanup)
+        # Small reads, so the stream has several chunks even when the render is already done
+        with override_settings(REPORT_CACHE_DIR=cache.name), mock.patch("api.exports.SPOOL_READ_BYTES", 1024):
+            response = self.client.get(f"/api/export/csv/{self.dataset_id}/", HTTP_ACCEPT_ENCODING=accept_encoding)
+            self.assertTrue(response.streaming)
+            chunks = list(response.streaming_content)
+            response.close()
+        return response, chunks
+
+    def test_streamed_csv_is_compressed_chunk_by_chunk(self):
+        expected = generate_csv(Dataset.objects.get(id=self.dataset_id))
+        response, chunks = self.stream_csv("gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertFalse(response.has_header("Content-Length"))
+        self.assertGreater(len(chunks), 2)
+        # Every chunk is flushed: what has arrived so far decompresses on its own
+        partial = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(b"".join(chunks[:2]))
+        self.assertTrue(expected.startswith(partial) and partial)
+        self.assertEqual(gzip.decompress(b"".join(chunks)), expected)
+        self.assertLess(len(b"".join(chunks)), len(expected) / 2)
+
+    @skipUnless(find_spec("brotli") and find_spec("zstandard"), "brotli and zstandard are optional")
+    def test_streamed_csv_zstd_and_brotli(self):
+        import brotli
+        import zstandard
+
+        expected = generate_csv(Dataset.objects.get(id=self.dataset_id))
+        response, chunks = self.stream_csv("zstd")
+        self.assertEqual(response["Content-Encoding"], "zstd")
+        self.assertEqual(zstandard.ZstdDecompressor().decompressobj().decompress(b"".join(chunks)), expected)
+        response, chunks = self.stream_csv("br")
+        self.assertEqual(brotli.decompress(b"".join(chunks)), expected)
+
+    def test_compressed_csv_revalidates(self):
+        cache = tempfile.TemporaryDirectory()
+        self.addCleanup(cache.cleanup)
+        url = f"/api/export/csv/{self.dataset_id}/"
+        with override_settings(REPORT_CACHE_DIR=cache.name):
+            streamed = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip")
+            b"".join(streamed.streaming_content)
+            streamed.close()
+            self.assertTrue(ArtifactLock(self.dataset_id, "csv").acquire(timeout=5))  # stored
+
+            cached = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip")
+            self.assertEqual(cached["Content-Encoding"], "gzip")
+            etag = cached["ETag"]
+            self.assertTrue(etag.startswith('W/"'))
+            cached.close()
+
+            response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            stale = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH='W/"stale"')
+            self.assertEqual(stale.status_code, 200)
+            stale.close()
+
+    def test_small_and_binary_responses_are_untouched(self):
+        response = self.client.get("/api/health/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+        cache = tempfile.TemporaryDirectory()
+        self.addCleanup(cache.cleanup)
+        with override_settings(REPORT_CACHE_DIR=cache.name):
+            response = self.client.get(f"/api/generate-pdf/{self.dataset_id}/", HTTP_ACCEPT_ENCODING="gzip")
+            self.assertTrue(response.streaming)
+            self.assertFalse(response.has_header("Content-Encoding"))
+            self.assertTrue(response.getvalue().startswith(b"%PDF"))
+
+
+@plain_http
+class MetricsViewTests(TestCase):
+    def test_request_and_stage_metrics(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username="tester", password="pw"))
+        upload = SimpleUploadedFile("plant.csv", make_csv(50).getvalue(), content_type="text/csv")
+        client.post("/api/upload/", {"file": upload}, format="multipart")
+        client.get("/api/history/")
+
+        admin = APIClient()
+        admin.force_authenticate(User.objects.create_user(username="admin", password="pw", is_staff=True))
+        response = admin.get("/api/metrics/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        body = response.content.decode()
+        self.assertIn('http_requests_total{method="GET",route="api/history/",status="200"}', body)
+        self.assertIn('http_request_duration_seconds_count{method="POST",route="api/upload/"}', body)
+        self.assertIn('stage_duration_seconds_count{pipeline="analysis",stage="parse"}', body)
+        self.assertIn('stage_duration_seconds_count{pipeline="analysis",stage="ranking"}', body)
+
+    @override_settings(METRICS_TOKEN="s3cret")
+    def test_token(self):
+        client = APIClient()
+        self.assertEqual(client.get("/api/metrics/").status_code, 401)
+        self.assertEqual(client.get("/api/metrics/", HTTP_AUTHORIZATION="Bearer wrong").status_code, 401)
+        self.assertEqual(client.get("/api/metrics/", HTTP_AUTHORIZATION="Bearer s3cret").status_code, 200)
+
+    def test_without_token_only_admins(self):
+        client = APIClient()
+        response = client.get("/api/metrics/")
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.data, {"error": "Metrics are only available to admin users"})
+        client.force_authenticate(User.objects.create_user(username="tester", password="pw"))
+        self.assertEqual(client.get("/api/metrics/").status_code, 403)
+        with override_settings(DEBUG=True):
+            self.assertEqual(APIClient().get("/api/metrics/").status_code, 200)
+
+
+@plain_http
+class ProfilingTests(TestCase):
+    def setUp(self):
+        profile_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(profile_dir.cleanup)
+        settings_override = override_settings(PROFILE_DIR=profile_dir.name, PROFILE_SAMPLE_INTERVAL=0.001)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.admin = APIClient()
+        self.admin.force_authenticate(User.objects.create_user(username="admin", password="pw", is_staff=True))
+
+    def upload(self, client, **extra):
+        upload = SimpleUploadedFile("plant.csv", make_csv(300).getvalue(), content_type="text/csv")
+        return client.post("/api/upload/?fresh=true", {"file": upload}, format="multipart", **extra)
+
+    def test_cprofile(self):
+        response = self.upload(self.admin, HTTP_X_PROFILE="1")
+        self.assertEqual(response.status_code, 201)
+        url = f"/api/profiles/{response['X-Profile-Id']}/"
+
+        text = b"".join(self.admin.get(url).streaming_content).decode()
+        self.assertIn("POST /api/upload/?fresh=true -> 201", text)
+        self.assertIn("analyze_columns", text)
+        self.assertIn("Top allocations", text)
+        self.assertIn("(whole process, all threads)", text)
+
+        dump = self.admin.get(url, {"type": "pstats"})
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(b"".join(dump.streaming_content))
+            f.flush()
+            functions = {name for _, _, name in pstats.Stats(f.name).stats}
+        self.assertIn("analyze_columns", functions)
+        self.assertEqual(self.admin.get(url, {"type": "collapsed"}).status_code, 404)
+
+        user = APIClient()
+        user.force_authenticate(User.objects.create_user(username="tester", password="pw"))
+        self.assertEqual(user.get(url).status_code, 403)
+
+    def test_sampler(self):
+        response = self.upload(self.admin, QUERY_STRING="profile=sample")
+        url = f"/api/profiles/{response['X-Profile-Id']}/"
+        collapsed = b"".join(self.admin.get(url, {"type": "collapsed"}).streaming_content).decode()
+        self.assertIn("upload_csv (views.py:", collapsed)
+
+    def test_only_staff_can_profile(self):
+        user = APIClient()
+        user.force_authenticate(User.objects.create_user(username="tester", password="pw"))
+        response = self.upload(user, HTTP_X_PROFILE="1")
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(response.has_header("X-Profile-Id"))
+        self.assertFalse(self.upload(self.admin).has_header("X-Profile-Id"))
+
+    @override_settings(PROFILE_MAX_COUNT=1)
+    def test_old_profiles_are_pruned(self):
+        first = self.upload(self.admin, HTTP_X_PROFILE="1")["X-Profile-Id"]
+        time.sleep(0.01)
+        second = self.upload(self.admin, HTTP_X_PROFILE="1")["X-Profile-Id"]
+        self.assertEqual(self.admin.get(f"/api/profiles/{first}/").status_code, 404)
+        self.assertEqual(self.admin.get(f"/api/profiles/{second}/").status_code, 200)
+
+
+@plain_http
+# Uploads commit here, so they would start pre-renders racing the tests
+@override_settings(EXPORT_PRERENDER=False)
+class ExportViewTests(TransactionTestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username="tester", password="pw"))
+        upload = SimpleUploadedFile("plant.csv", make_csv(120).getvalue(), content_type="text/csv")
+        self.dataset_id = self.client.post("/api/upload/", {"file": upload}, format="multipart").data["id"]
+        self.cache = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache.cleanup)
+        overrides = override_settings(REPORT_CACHE_DIR=self.cache.name)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_pdf(self):
+        response = self.client.get(f"/api/generate-pdf/{self.dataset_id}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.getvalue().startswith(b"%PDF"))
+
+    def test_vector_pdf(self):
+        response = self.client.get(f"/api/generate-pdf/{self.dataset_id}/?charts=vector")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.getvalue().startswith(b"%PDF"))
+        self.assertEqual(ReportArtifact.objects.get().kind, "pdf-vector")
+        self.assertEqual(self.client.get(f"/api/generate-pdf/{self.dataset_id}/?charts=svg").status_code, 400)
+
+    def test_pdf_is_cached(self):
+        first = self.client.get(f"/api/generate-pdf/{self.dataset_id}/")
+        render = mock.Mock()
+        with mock.patch.dict(EXPORTS["pdf"], render=render):
+            second = self.client.get(f"/api/generate-pdf/{self.dataset_id}/")
+        render.assert_not_called()
+        self.assertEqual(second.getvalue(), first.getvalue())
+        self.assertEqual(second["ETag"], first["ETag"])
+        self.assertEqual(ReportArtifact.objects.count(), 1)
+
+    def test_pdf_not_modified(self):
+        etag = self.client.get(f"/api/generate-pdf/{self.dataset_id}/")["ETag"]
+        response = self.client.get(f"/api/generate-pdf/{self.dataset_id}/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        stale = self.client.get(f"/api/generate-pdf/{self.dataset_id}/", HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(stale.status_code, 200)
+
+    def test_pdf_rerendered_when_renderer_changes(self):
+        self.client.get(f"/api/generate-pdf/{self.dataset_id}/")
+        with mock.patch.dict(EXPORTS["pdf"], version="next"):
+            self.client.get(f"/api/generate-pdf/{self.dataset_id}/")
+        self.assertEqual(ReportArtifact.objects.filter(dataset_id=self.dataset_id).count(), 2)
+
+    def test_cache_evicts_least_recently_used(self):
+        other = Dataset.objects.create(
+            name="other.csv", total_equipment=0, avg_flowrate=0, avg_pressure=0, avg_temperature=0, type_distribution={},
+        )
+        old = store_artifact(self.dataset_id, "pdf", "v", b"a" * 100)
+        recent = store_artifact(other.id, "pdf", "v", b"b" * 100)
+        self.assertIsNotNone(get_artifact(self.dataset_id, "pdf", "v"))  # touch: now most recent
+
+        with override_settings(REPORT_CACHE_MAX_BYTES=150):
+            store_artifact(other.id, "pdf", "w", b"c" * 50)
+        self.assertTrue(ReportArtifact.objects.filter(id=old.id).exists())
+        self.assertFalse(ReportArtifact.objects.filter(id=recent.id).exists())
+        self.assertFalse(os.path.exists(recent.path))
+
+    def test_evicted_file_is_rendered_again(self):
+        artifact = get_or_render(Dataset.objects.get(id=self.dataset_id), "pdf")
+        os.remove(artifact.path)  # evicted between the lookup and open()
+        request = APIRequestFactory().get(f"/api/generate-pdf/{self.dataset_id}/")
+        response = export_response(request, artifact, "pdf")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.getvalue().startswith(b"%PDF"))
+        self.assertNotEqual(ReportArtifact.objects.get().id, artifact.id)
+
+    def test_artifact_larger_than_the_cache_is_served(self):
+        with override_settings(REPORT_CACHE_MAX_BYTES=10):
+            response = self.client.get(f"/api/generate-pdf/{self.dataset_id}/")
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.getvalue().startswith(b"%PDF"))
+            # Evicted by the next store instead
+            self.assertEqual(self.client.get(f"/api/export/excel/{self.dataset_id}/").status_code, 200)
+        self.assertEqual(ReportArtifact.objects.get().kind, "xlsx")
+
+    def test_failed_re_render_of_vanished_file_is_json(self):
+        artifact = get_or_render(Dataset.objects.get(id=self.dataset_id), "xlsx")
+        os.remove(artifact.path)
+        gate = AdmissionGate(max_concurrent=1, max_queue=0, queue_timeout=1, retry_after=12)
+        with mock.patch("api.views.get_or_render", return_value=artifact), \
+                mock.patch("api.admission.render_gate", gate), gate.slot():
+            response = self.client.get(f"/api/export/excel/{self.dataset_id}/")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "12")
+        self.assertIn("error", response.data)
+
+        with mock.patch("api.views.get_or_render", return_value=artifact), \
+                mock.patch("api.views.export_response", side_effect=FileNotFoundError("gone again")):
+            response = self.client.get(f"/api/export/excel/{self.dataset_id}/")
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.data, {"error": "gone again"})
+
+    def test_store_replaces_artifact_whose_file_vanished(self):
+        lost = store_artifact(self.dataset_id, "pdf", "v", b"old")
+        os.remove(lost.path)
+        # The insert collides with the stale row, which get_artifact then drops
+        with mock.patch("api.artifacts.get_artifact", wraps=get_artifact) as lookup:
+            artifact = store_artifact(self.dataset_id, "pdf", "v", b"new")
+        lookup.assert_called_once()
+        with open(artifact.path, "rb") as f:
+            self.assertEqual(f.read(), b"new")
+        self.assertEqual(ReportArtifact.objects.get().id, artifact.id)
+
+    def test_csv(self):
+        response = self.client.get(f"/api/export/csv/{self.dataset_id}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"EQUIPMENT DETAILS", response.getvalue())
+
+    def test_csv_error_before_streaming_is_json(self):
+        with mock.patch("api.exports.get_artifact", side_effect=RuntimeError("cache unavailable")):
+            response = self.client.get(f"/api/export/csv/{self.dataset_id}/")
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.data, {"error": "cache unavailable"})
+
+    def test_csv_streams_then_serves_cached_file(self):
+        response = self.client.get(f"/api/export/csv/{self.dataset_id}/")
+        self.assertTrue(response.streaming)
+        self.assertNotIn("ETag", response)
+        content = b"".join(response.streaming_content)
+        response.close()
+        dataset = Dataset.objects.get(id=self.dataset_id)
+        self.assertEqual(content, generate_csv(dataset))
+
+        cached = self.client.get(f"/api/export/csv/{self.dataset_id}/")
+        self.assertEqual(cached.getvalue(), content)
+        self.assertEqual(cached["ETag"], ReportArtifact.objects.get(kind="csv").etag)
+
+    def test_csv_render_does_not_wait_for_the_client(self):
+        response = self.client.get(f"/api/export/csv/{self.dataset_id}/")
+        first = next(iter(response.streaming_content))
+        # The lock is released once the artifact is stored, while the client is still reading
+        self.assertTrue(ArtifactLock(self.dataset_id, "csv").acquire(timeout=5))
+        artifact = ReportArtifact.objects.get(kind="csv")
+        rest = b"".join(response.streaming_content)
+        response.close()
+        with open(artifact.path, "rb") as f:
+            self.assertEqual(first + rest, f.read())
+
+    def test_abandoned_csv_stream_is_still_cached(self):
+        response = self.client.get(f"/api/export/csv/{self.dataset_id}/")
+        next(iter(response.streaming_content))
+        response.close()
+        self.assertTrue(ArtifactLock(self.dataset_id, "csv").acquire(timeout=5))
+        self.assertEqual(ReportArtifact.objects.get().kind, "csv")
+        self.assertEqual(len(os.listdir(self.cache.name)), 2)  # locks/ and the artifact, no .tmp
+
+    def test_csv_render_thread_closes_its_connection(self):
+        closed_in = []
+        real_close = connection.close
+
+        def close():
+            closed_in.append(threading.current_thread())
+            real_close()
+
+        with mock.patch("api.exports.connection") as thread_connection:
+            thread_connection.close.side_effect = close
+            response = self.client.get(f"/api/export/csv/{self.dataset_id}/")
+            b"".join(response.streaming_content)
+            self.assertTrue(ArtifactLock(self.dataset_id, "csv").acquire(timeout=5))
+            # The lock is released just before the connection is closed
+            deadline = time.monotonic() + 5
+            while not closed_in and time.monotonic() < deadline:
+                time.sleep(0.01)
+        self.assertEqual(len(closed_in), 1)
+        self.assertIsNot(closed_in[0], threading.current_thread())
+
+    def test_csv_render_error_reaches_the_stream(self):
+        def failing_render(dataset):
+            yield b"partial"
+            raise RuntimeError("render failed")
+
+        with mock.patch.dict(EXPORTS["csv"], render=failing_render):
+            response = self.client.get(f"/api/export/csv/{self.dataset_id}/")
+            chunks = iter(response.streaming_content)
+            self.assertEqual(next(chunks), b"partial")
+            with self.assertRaisesMessage(RuntimeError, "render failed"):
+                next(chunks)
+        self.assertFalse(ReportArtifact.objects.exists())
+        self.assertEqual(os.listdir(self.cache.name), ["locks"])
+
+    def test_lock_files_are_deleted_with_their_dataset(self):
+        get_or_render(Dataset.objects.get(id=self.dataset_id), "pdf")
+        abandoned = ArtifactLock(self.dataset_id, "xlsx")
+        abandoned.acquire()
+        abandoned.release()
+        held = ArtifactLock(self.dataset_id, "pdf")
+        held.acquire()
+        ReportArtifact.objects.all().delete()
+        self.assertTrue(os.path.exists(held.path))  # a render holds it
+        held.release()
+        Dataset.objects.filter(id=self.dataset_id).delete()
+        self.assertEqual(os.listdir(os.path.join(self.cache.name, "locks")), [])
+
+    def test_lock_waiter_follows_a_discarded_lock_file(self):
+        holder = ArtifactLock(self.dataset_id, "csv")
+        holder.acquire()
+        waiter = ArtifactLock(self.dataset_id, "csv")
+        acquired = []
+        thread = threading.Thread(target=lambda: acquired.append(waiter.acquire(timeout=5)))
+        thread.start()
+        time.sleep(0.1)  # the waiter has opened the old file
+        os.remove(holder.path)  # as discard() does once it holds the lock
+        holder.release()
+        thread.join()
+        self.assertEqual(acquired, [True])
+        # The waiter holds the lock on the file now at the path, so nobody else can take it
+        self.assertFalse(ArtifactLock(self.dataset_id, "csv").acquire(timeout=0))
+        waiter.release()
+
+    def test_render_in_another_process_is_shared(self):
+        dataset = Dataset.objects.get(id=self.dataset_id)
+        version = EXPORTS["xlsx"]["version"]
+        other = ArtifactLock(self.dataset_id, "xlsx")
+        self.assertTrue(other.acquire(timeout=0))
+        self.assertFalse(ArtifactLock(self.dataset_id, "xlsx").acquire(timeout=0))
+        # The other process stores its artifact; we only see it once its lock is released
+        finished = store_artifact(self.dataset_id, "xlsx", version, b"PK rendered elsewhere")
+        threading.Timer(0.2, other.release).start()
+
+        render = mock.Mock()
+        with mock.patch.dict(EXPORTS["xlsx"], render=render), \
+                mock.patch("api.exports.get_artifact", side_effect=[None, finished]):
+            start = time.monotonic()
+            artifact = get_or_render(dataset, "xlsx")
+        self.assertGreaterEqual(time.monotonic() - start, 0.2)
+        self.assertEqual(artifact, finished)
+        render.assert_not_called()
+
+    def test_csv_request_does_not_stream_a_second_render(self):
+        other = ArtifactLock(self.dataset_id, "csv")
+        other.acquire()
+        threading.Timer(0.2, other.release).start()
+        response = self.client.get(f"/api/export/csv/{self.dataset_id}/")
+        # Served from the artifact rendered after the lock was released, not streamed
+        self.assertIsInstance(response, FileResponse)
+        self.assertIn("ETag", response)
+        self.assertEqual(response.getvalue(), generate_csv(Dataset.objects.get(id=self.dataset_id)))
+
+    def test_streamed_csv_render_takes_a_slot(self):
+        gate = AdmissionGate(max_concurrent=1, max_queue=0, queue_timeout=1, retry_after=12)
+        with mock.patch("api.admission.render_gate", gate):
+            with gate.slot():
+                response = self.client.get(f"/api/export/csv/{self.dataset_id}/")
+                self.assertEqual(response.status_code, 503)
+                self.assertEqual(response["Retry-After"], "12")
+            # Released with the lock, so the next request renders it
+            self.assertTrue(ArtifactLock(self.dataset_id, "csv").acquire(timeout=0))
+
+            response = self.client.get(f"/api/export/csv/{self.dataset_id}/")
+            self.assertTrue(response.streaming)
+            b"".join(response.streaming_content)
+            response.close()
+            self.assertTrue(ArtifactLock(self.dataset_id, "csv").acquire(timeout=5))
+            self.assertEqual(gate.running, 0)
+
+    def test_busy_render_gate_returns_503(self):
+        get_or_render(Dataset.objects.get(id=self.dataset_id), "pdf")
+        gate = AdmissionGate(max_concurrent=1, max_queue=0, queue_timeout=1, retry_after=12)
+        with mock.patch("api.admission.render_gate", gate), gate.slot():
+            response = self.client.get(f"/api/export/excel/{self.dataset_id}/")
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response["Retry-After"], "12")
+            # Cached artifacts do not need a render slot
+            self.assertEqual(self.client.get(f"/api/generate-pdf/{self.dataset_id}/").status_code, 200)
+
+    def test_csv_chunks_match_buffered_export(self):
+        dataset = Dataset.objects.get(id=self.dataset_id)
+        chunks = list(iter_csv(dataset, batch_rows=25))
+        self.assertGreater(len(chunks), 120 // 25)
+        self.assertEqual(b"".join(chunks), generate_csv(dataset))
+
+    def test_excel(self):
+        response = self.client.get(f"/api/export/excel/{self.dataset_id}/")
+        self.assertEqual(response.status_code, 200)
+        content = response.getvalue()
+        self.assertTrue(content.startswith(b"PK"))
+
+        from openpyxl import load_workbook
+        workbook = load_workbook(io.BytesIO(content), read_only=True)
+        self.assertEqual(workbook.sheetnames[:5], [
+            "Summary", "Statistics", "Equipment Details", "Type Distribution", "Efficiency Ranking",
+        ])
+        equipment = list(workbook["Equipment Details"].values)
+        self.assertEqual(equipment[0][0], "name")
+        self.assertEqual(len(equipment), 1 + Dataset.objects.get(id=self.dataset_id).total_equipment)
+        ranking = list(workbook["Efficiency Ranking"].values)
+        self.assertEqual([row[0] for row in ranking[1:4]], [1, 2, 3])
+
+    def test_excel_chunks(self):
+        dataset = Dataset.objects.get(id=self.dataset_id)
+        chunks = list(iter_excel(dataset, chunk_size=1024))
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(len(chunk) <= 1024 for chunk in chunks))
+
+    def test_parquet(self):
+        import pyarrow.parquet as pq
+
+        response = self.client.get(f"/api/export/parquet/{self.dataset_id}/")
+        self.assertEqual(response.status_code, 200)
+        table = pq.read_table(io.BytesIO(response.getvalue()))
+        dataset = Dataset.objects.get(id=self.dataset_id)
+        self.assertEqual(table.num_rows, dataset.total_equipment)
+        self.assertEqual(str(table.schema.field("type").type), "dictionary<values=string, indices=int32, ordered=0>")
+        self.assertEqual(str(table.schema.field("health_score").type), "double")
+        self.assertEqual(table.column("name").to_pylist(), [eq["name"] for eq in dataset.equipment_data])
+        summary = json.loads(table.schema.metadata[b"summary"])
+        self.assertEqual(summary["total_equipment"], dataset.total_equipment)
+        self.assertEqual(summary["risk_summary"], dataset.risk_summary)
+
+    def test_arrow_batches_share_dictionaries(self):
+        import pyarrow as pa
+
+        dataset = Dataset.objects.get(id=self.dataset_id)
+        reader = pa.ipc.open_file(pa.BufferReader(b"".join(iter_arrow(dataset, batch_rows=25))))
+        self.assertEqual(reader.num_record_batches, -(-dataset.total_equipment // 25))
+        table = reader.read_all()
+        self.assertEqual(table.column("risk").to_pylist(), [eq["risk"] for eq in dataset.equipment_data])
+        self.assertEqual(table.schema.metadata[b"dataset_name"], b"plant.csv")
+
+    def test_arrow_endpoint(self):
+        response = self.client.get(f"/api/export/arrow/{self.dataset_id}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/vnd.apache.arrow.file")
+        self.assertTrue(response.getvalue().startswith(b"ARROW1"))
+
+    def test_missing_dataset(self):
+        self.assertEqual(self.client.get("/api/generate-pdf/999/").status_code, 404)
+
+
+
+class PrerenderTests(TransactionTestCase):
+    def setUp(self):
+        self.cache = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache.cleanup)
+        overrides = override_settings(REPORT_CACHE_DIR=self.cache.name)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.dataset = create_dataset("plant.csv", "full", "", analyze_csv(make_csv(80)))
+
+    def test_prerender_stores_every_export(self):
+        for future in prerender_exports(self.dataset.id):
+            future.result()
+        self.assertEqual(
+            sorted(self.dataset.artifacts.values_list("kind", flat=True)), ["csv", "pdf", "xlsx"]
+        )
+
+    def test_concurrent_requests_share_one_render(self):
+        started, release = threading.Event(), threading.Event()
+
+        def slow_render(dataset):
+            started.set()
+            release.wait(5)
+            return b"rendered"
+
+        render = mock.Mock(side_effect=slow_render)
+        results = []
+        with mock.patch.dict(EXPORTS["csv"], render=render):
+            first = threading.Thread(target=get_or_render, args=(self.dataset, "csv"))
+            first.start()
+            started.wait(5)
+            waiter = threading.Thread(target=lambda: results.append(get_or_render(self.dataset, "csv")))
+            waiter.start()
+            time.sleep(0.2)  # let the second request reach the in-flight render
+            release.set()
+            first.join()
+            waiter.join()
+
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(results[0].size, len(b"rendered"))
+
+    def test_interactive_wait_on_background_render_is_bounded(self):
+        started, release = threading.Event(), threading.Event()
+
+        def slow_render(dataset):
+            started.set()
+            release.wait(5)
+            return b"rendered"
+
+        gate = AdmissionGate(max_concurrent=1, max_queue=1, queue_timeout=0.2, retry_after=3)
+        with mock.patch("api.admission.render_gate", gate), \
+                mock.patch.dict(EXPORTS["csv"], render=mock.Mock(side_effect=slow_render)):
+            prerender = threading.Thread(target=get_or_render, args=(self.dataset, "csv", BACKGROUND))
+            prerender.start()
+            started.wait(5)
+            with self.assertRaises(Overloaded) as refused:
+                get_or_render(self.dataset, "csv")
+            self.assertEqual(refused.exception.retry_after, 3)
+            self.assertEqual(gate.waiting, 0)
+            release.set()
+            prerender.join()
+        self.assertEqual(self.dataset.artifacts.get().kind, "csv")
+
+
+class EquipmentRecordMigrationTests(TransactionTestCase):
+    migrate_from = [("api", "0004_equipmentrecord")]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def migrate_to_latest(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def tearDown(self):
+        self.migrate_to_latest()
+
+    def test_json_blobs_become_records(self):
+        analysis = analyze_csv(make_csv(50))
+        old_apps = self.migrate(self.migrate_from)
+        OldDataset = old_apps.get_model("api", "Dataset")
+        dataset = OldDataset.objects.create(
+            name="old.csv",
+            total_equipment=50,
+            avg_flowrate=0,
+            avg_pressure=0,
+            avg_temperature=0,
+            type_distribution={},
+            equipment_data=analysis["equipment_data"],
+            efficiency_ranking=analysis["efficiency_ranking"],
+            outliers=analysis["outliers"],
+        )
+
+        self.migrate_to_latest()
+        migrated = Dataset.objects.get(id=dataset.id)
+        self.assertEqual(EquipmentRecord.objects.filter(dataset=migrated).count(), 50)
+        self.assertEqual(migrated.equipment_data, analysis["equipment_data"])
+        self.assertEqual(migrated.efficiency_ranking, analysis["efficiency_ranking"])
+        self.assertEqual(migrated.outliers, analysis["outliers"])
@@ -1,20 +1,33 @@
 from django.urls import path
 from .views import (
     upload_csv,
+    job_status,
     history,
+    dataset_detail,
+    dataset_equipment,
     generate_pdf_report,
     login,
     export_csv,
-    export_excel
+    export_excel,
+    export_parquet,
+    export_arrow,
+    download_profile,
 )
-from .health import healthcheck
+from .health import healthcheck, metrics
 
 urlpatterns = [
     path("health/", healthcheck),  # ✅ Healthcheck for Railway
+    path("metrics/", metrics),
     path("login/", login),
     path("upload/", upload_csv),
+    path("jobs/<uuid:job_id>/", job_status),
     path("history/", history),
+    path("datasets/<int:dataset_id>/", dataset_detail),
+    path("datasets/<int:dataset_id>/equipment/", dataset_equipment),
     path("generate-pdf/<int:dataset_id>/", generate_pdf_report),
     path("export/csv/<int:dataset_id>/", export_csv),
     path("export/excel/<int:dataset_id>/", export_excel),
+    path("export/parquet/<int:dataset_id>/", export_parquet),
+    path("export/arrow/<int:dataset_id>/", export_arrow),
+    path("profiles/<uuid:profile_id>/", download_profile),
 ]
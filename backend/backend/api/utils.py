@@ -1,7 +1,14 @@
 # This file will contain all CSV analysis logic
 # It should NOT contain Django or HTTP code
+import hashlib
+import shutil
+
 import numpy as np
 
+from .metrics import StageTimer
+from .spill_utils import NUMERIC_COLUMNS, ColumnSpill
+from .stats_utils import QuantileSketch, RunningStats
+
 REQUIRED_COLUMNS = [
     "Equipment Name",
     "Type",
@@ -10,23 +17,21 @@ REQUIRED_COLUMNS = [
     "Temperature",
 ]
 
-def convert_to_native_types(obj):
-    """
-    Recursively convert numpy types to native Python types for JSON serialization.
-    Handles: int64, float64, ndarray, dict, list, etc.
-    """
-    if isinstance(obj, np.integer):
-        return int(obj)
-    elif isinstance(obj, np.floating):
-        return float(obj)
-    elif isinstance(obj, np.ndarray):
-        return obj.tolist()
-    elif isinstance(obj, dict):
-        return {k: convert_to_native_types(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [convert_to_native_types(item) for item in obj]
-    else:
-        return obj
+# Result key -> CSV column of the three measured parameters
+PARAMETERS = {
+    "flowrate": "Flowrate",
+    "pressure": "Pressure",
+    "temperature": "Temperature",
+}
+
+# Fixed parse dtypes: no inference, and Type is stored once per distinct value
+CSV_DTYPES = {
+    "Equipment Name": str,
+    "Type": "category",
+    "Flowrate": "float64",
+    "Pressure": "float64",
+    "Temperature": "float64",
+}
 
 def calculate_health_score(row, param_stats):
     """
@@ -62,160 +67,553 @@ def calculate_health_score(row, param_stats):
     return max(0, min(100, round(score, 1)))  # Clamp between 0-100
 
 
-def detect_outliers(df, param):
+def calculate_health_scores(df, param_stats):
     """
-    Detect outliers using IQR method (Interquartile Range)
-    Returns indices of outlier rows
+    Vectorized version of calculate_health_score for a whole DataFrame.
+    Applies the same flowrate deviation and pressure/temperature penalty bands
+    as whole-column array operations and returns a numpy array of scores.
     """
-    Q1 = df[param].quantile(0.25)
-    Q3 = df[param].quantile(0.75)
+    flowrate = df['Flowrate'].to_numpy(dtype=np.float64)
+    pressure = df['Pressure'].to_numpy(dtype=np.float64)
+    temperature = df['Temperature'].to_numpy(dtype=np.float64)
+
+    score = np.full(len(flowrate), 100, dtype=np.int64)
+
+    # Flowrate score (prefer middle range, penalize extremes)
+    flowrate_mean = param_stats['flowrate']['mean']
+    flowrate_std = param_stats['flowrate']['std']
+    flowrate_dev = np.abs(flowrate - flowrate_mean) / (flowrate_std + 0.001)
+    score -= np.select([flowrate_dev > 2, flowrate_dev > 1], [20, 10], default=0)
+
+    # Pressure score (optimal pressure ranges)
+    score -= np.select(
+        [(pressure > 8.5) | (pressure < 3.5), (pressure > 8.0) | (pressure < 4.0)],
+        [15, 8],
+        default=0,
+    )
+
+    # Temperature score (optimal temperature ranges)
+    score -= np.select(
+        [(temperature > 145) | (temperature < 90), (temperature > 140) | (temperature < 95)],
+        [15, 8],
+        default=0,
+    )
+
+    return np.clip(score, 0, 100)  # Clamp between 0-100
+
+
+def outlier_bounds(values):
+    """IQR method (Interquartile Range): values outside these bounds are outliers"""
+    Q1 = values.quantile(0.25)
+    Q3 = values.quantile(0.75)
     IQR = Q3 - Q1
-    
-    lower_bound = Q1 - 1.5 * IQR
-    upper_bound = Q3 + 1.5 * IQR
-    
-    return df[(df[param] < lower_bound) | (df[param] > upper_bound)].index.tolist()
+    return Q1 - 1.5 * IQR, Q3 + 1.5 * IQR
 
 
-def analyze_csv(file):
-    import pandas as pd
-    import numpy as np
-    
-    # Read csv
-    df = pd.read_csv(file)
+def detect_outlier_mask(df, param):
+    """
+    Detect outliers using IQR method (Interquartile Range)
+    Returns a boolean array marking outlier rows
+    """
+    lower_bound, upper_bound = outlier_bounds(df[param])
+    values = df[param].to_numpy()
+    return (values < lower_bound) | (values > upper_bound)
 
-    # Validate columns
-    for column in REQUIRED_COLUMNS:
-        if column not in df.columns:
-            raise ValueError(f"Missing required column: {column}")
-    
-    total_equipment = len(df)
-
-    # ============ BASIC STATISTICS ============
-    avg_flowrate = df["Flowrate"].mean()
-    avg_pressure = df["Pressure"].mean()
-    avg_temperature = df["Temperature"].mean()
-
-    # Type distribution
-    type_distribution = df["Type"].value_counts().to_dict()
-
-    # ============ ADVANCED STATISTICS ============
-    stats = {
-        'flowrate': {
-            'mean': avg_flowrate,
-            'min': df["Flowrate"].min(),
-            'max': df["Flowrate"].max(),
-            'median': df["Flowrate"].median(),
-            'std': df["Flowrate"].std(),
-        },
-        'pressure': {
-            'mean': avg_pressure,
-            'min': df["Pressure"].min(),
-            'max': df["Pressure"].max(),
-            'median': df["Pressure"].median(),
-            'std': df["Pressure"].std(),
-        },
-        'temperature': {
-            'mean': avg_temperature,
-            'min': df["Temperature"].min(),
-            'max': df["Temperature"].max(),
-            'median': df["Temperature"].median(),
-            'std': df["Temperature"].std(),
-        },
-    }
 
-    # ============ HEALTH SCORES ============
-    df['HealthScore'] = df.apply(lambda row: calculate_health_score(row, stats), axis=1)
+def risk_labels(scores):
+    """HIGH below 70, MEDIUM below 85, LOW otherwise"""
+    return np.select([scores < 70, scores < 85], ['HIGH', 'MEDIUM'], default='LOW')
 
-    # ============ OUTLIER DETECTION ============
-    outliers = {
-        'flowrate': detect_outliers(df, 'Flowrate'),
-        'pressure': detect_outliers(df, 'Pressure'),
-        'temperature': detect_outliers(df, 'Temperature'),
-    }
-    
-    outlier_equipment = set()
-    for param_outliers in outliers.values():
-        outlier_equipment.update(param_outliers)
-    
-    # Create outlier details
-    outlier_details = []
-    for idx in outlier_equipment:
-        row = df.iloc[idx]
-        outlier_details.append({
-            'equipment_name': row['Equipment Name'],
-            'type': row['Type'],
+
+def status_labels(scores):
+    """Efficiency status bands used by the ranking"""
+    return np.select(
+        [scores >= 90, scores >= 75, scores >= 60],
+        ['Excellent', 'Good', 'Fair'],
+        default='Poor',
+    )
+
+
+def build_equipment_results(df, health_scores, risks, outlier_mask, timer=None):
+    """
+    Build equipment_data, outlier details and efficiency ranking in one pass
+    over precomputed column arrays. Every value is emitted as a native Python
+    type, so the result is JSON-ready without a conversion pass.
+    Also returns the per-row rank, status and outlier rows used to store
+    EquipmentRecord rows. timer (a metrics.StageTimer) gets the
+    "serialization" and "ranking" stages.
+    """
+    names = df["Equipment Name"].tolist()
+    types = df["Type"].tolist()
+    flowrates = [round(v, 2) for v in df["Flowrate"].to_numpy(dtype=np.float64).tolist()]
+    pressures = [round(v, 2) for v in df["Pressure"].to_numpy(dtype=np.float64).tolist()]
+    temperatures = [round(v, 2) for v in df["Temperature"].to_numpy(dtype=np.float64).tolist()]
+    scores = [round(v, 1) for v in health_scores.astype(np.float64).tolist()]
+    risks = risks.tolist()
+
+    equipment_data = [
+        {
+            'name': name,
+            'type': eq_type,
+            'flowrate': flowrate,
+            'pressure': pressure,
+            'temperature': temperature,
+            'health_score': score,
+            'risk': risk,
+        }
+        for name, eq_type, flowrate, pressure, temperature, score, risk
+        in zip(names, types, flowrates, pressures, temperatures, scores, risks)
+    ]
+
+    outlier_rows = np.flatnonzero(outlier_mask).tolist()
+    outlier_details = [
+        {
+            'equipment_name': names[i],
+            'type': types[i],
             'parameters': {
-                'flowrate': round(float(row['Flowrate']), 2),
-                'pressure': round(float(row['Pressure']), 2),
-                'temperature': round(float(row['Temperature']), 2),
+                'flowrate': flowrates[i],
+                'pressure': pressures[i],
+                'temperature': temperatures[i],
             },
-            'health_score': float(row['HealthScore']),
-            'risk': 'HIGH' if row['HealthScore'] < 70 else 'MEDIUM' if row['HealthScore'] < 85 else 'LOW',
-        })
+            'health_score': scores[i],
+            'risk': risks[i],
+        }
+        for i in outlier_rows
+    ]
+    if timer:
+        timer.lap("serialization")
 
-    # ============ EFFICIENCY RANKING ============
-    ranking = df.nlargest(len(df), 'HealthScore')[['Equipment Name', 'Type', 'HealthScore']].to_dict('records')
+    # Highest score first, ties keep upload order (same as nlargest keep='first')
+    order = np.argsort(-health_scores, kind='stable')
+    ranks = np.empty(len(order), dtype=np.int64)
+    ranks[order] = np.arange(1, len(order) + 1)
+    statuses = status_labels(health_scores).tolist()
     ranking = [
         {
-            'rank': i + 1,
-            'equipment_name': item['Equipment Name'],
-            'type': item['Type'],
-            'health_score': round(float(item['HealthScore']), 1),
-            'status': 'Excellent' if item['HealthScore'] >= 90 else 'Good' if item['HealthScore'] >= 75 else 'Fair' if item['HealthScore'] >= 60 else 'Poor'
+            'rank': rank,
+            'equipment_name': names[i],
+            'type': types[i],
+            'health_score': scores[i],
+            'status': statuses[i],
         }
-        for i, item in enumerate(ranking)
+        for rank, i in enumerate(order.tolist(), start=1)
     ]
+    if timer:
+        timer.lap("ranking")
+
+    return {
+        "equipment_data": equipment_data,
+        "outliers": outlier_details,
+        "efficiency_ranking": ranking,
+        "equipment_ranks": ranks.tolist(),
+        "equipment_statuses": statuses,
+        "outlier_rows": outlier_rows,
+    }
+
+
+def _native_stat(value):
+    """Round float statistics to 2 places and unwrap numpy scalars"""
+    if isinstance(value, float):
+        value = round(value, 2)
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def hash_file(file, chunk_size=1024 * 1024):
+    """
+    SHA-256 hex digest of a file object, read in fixed-size chunks.
+    The file is rewound afterwards so it can be parsed.
+    """
+    digest = hashlib.sha256()
+    file.seek(0)
+    for block in iter(lambda: file.read(chunk_size), b""):
+        digest.update(block)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def csv_engine():
+    """pyarrow's multithreaded CSV parser when it is installed, pandas' C parser otherwise"""
+    try:
+        import pyarrow  # noqa: F401
+        return "pyarrow"
+    except ImportError:
+        return "c"
+
+
+def read_equipment_csv(file, chunksize=None):
+    """
+    Read only REQUIRED_COLUMNS with fixed dtypes (CSV_DTYPES).
+    Extra columns in the export are never parsed. With chunksize an iterator
+    of DataFrames is returned (C engine, since pyarrow cannot read in chunks).
+    """
+    import pandas as pd
+
+    # Validate columns from the header before parsing any data
+    header = pd.read_csv(file, nrows=0).columns
+    for column in REQUIRED_COLUMNS:
+        if column not in header:
+            raise ValueError(f"Missing required column: {column}")
+    file.seek(0)
+
+    return pd.read_csv(
+        file,
+        usecols=REQUIRED_COLUMNS,
+        dtype=CSV_DTYPES,
+        engine="c" if chunksize else csv_engine(),
+        chunksize=chunksize,
+    )
+
+
+def count_types(types):
+    """Type counts, most common first (ties alphabetical so every mode agrees)"""
+    counts = [(eq_type, int(count)) for eq_type, count in types.value_counts().items() if count]
+    return dict(sorted(counts, key=lambda item: (-item[1], str(item[0]))))
+
+
+def analyze_csv(file):
+    timer = StageTimer("analysis")
+    df = read_equipment_csv(file)
+    timer.lap("parse")
+    return analyze_columns(df, len(df), timer)
+
+
+def column_statistics(df):
+    """mean, min, max, median and std of each of the PARAMETERS columns"""
+    return {
+        key: {
+            'mean': df[column].mean(),
+            'min': df[column].min(),
+            'max': df[column].max(),
+            'median': df[column].median(),
+            'std': df[column].std(),
+        }
+        for key, column in PARAMETERS.items()
+    }
 
-    # ============ EQUIPMENT DATA WITH HEALTH SCORES ============
-    equipment_data = []
-    for _, row in df.iterrows():
-        equipment_data.append({
-            'name': row['Equipment Name'],
-            'type': row['Type'],
-            'flowrate': round(float(row['Flowrate']), 2),
-            'pressure': round(float(row['Pressure']), 2),
-            'temperature': round(float(row['Temperature']), 2),
-            'health_score': round(float(row['HealthScore']), 1),
-            'risk': 'HIGH' if row['HealthScore'] < 70 else 'MEDIUM' if row['HealthScore'] < 85 else 'LOW',
-        })
-
-    result = {
+
+def summary_fields(total_equipment, type_distribution, stats, avg_health_score, outlier_count, risk_counts):
+    """The summary keys of an analysis result, as native JSON-ready values"""
+    return {
         # Basic metrics
         "total_equipment": total_equipment,
-        "avg_flowrate": round(avg_flowrate, 2),
-        "avg_pressure": round(avg_pressure, 2),
-        "avg_temperature": round(avg_temperature, 2),
+        "avg_flowrate": _native_stat(stats['flowrate']['mean']),
+        "avg_pressure": _native_stat(stats['pressure']['mean']),
+        "avg_temperature": _native_stat(stats['temperature']['mean']),
         "type_distribution": type_distribution,
-        
+
         # Advanced analytics
         "statistics": {
-            'flowrate': {k: round(v, 2) if isinstance(v, float) else v for k, v in stats['flowrate'].items()},
-            'pressure': {k: round(v, 2) if isinstance(v, float) else v for k, v in stats['pressure'].items()},
-            'temperature': {k: round(v, 2) if isinstance(v, float) else v for k, v in stats['temperature'].items()},
+            key: {k: _native_stat(v) for k, v in stats[key].items()}
+            for key in PARAMETERS
         },
-        
-        # Health scores and risk
-        "equipment_data": equipment_data,
-        "avg_health_score": round(df['HealthScore'].mean(), 1),
-        
-        # Outliers
-        "outliers": outlier_details,
-        "outlier_count": len(outlier_equipment),
-        
-        # Efficiency ranking
-        "efficiency_ranking": ranking,
-        
-        # Risk summary
+
+        # Health scores, outliers and risk
+        "avg_health_score": avg_health_score,
+        "outlier_count": outlier_count,
         "risk_summary": {
-            'high_risk': len([e for e in equipment_data if e['risk'] == 'HIGH']),
-            'medium_risk': len([e for e in equipment_data if e['risk'] == 'MEDIUM']),
-            'low_risk': len([e for e in equipment_data if e['risk'] == 'LOW']),
+            'high_risk': risk_counts['HIGH'],
+            'medium_risk': risk_counts['MEDIUM'],
+            'low_risk': risk_counts['LOW'],
+        },
+    }
+
+
+def count_risks(risks):
+    """Rows per risk label (HIGH / MEDIUM / LOW) in an array of labels"""
+    return {label: int(np.count_nonzero(risks == label)) for label in ('HIGH', 'MEDIUM', 'LOW')}
+
+
+def analyze_columns(df, total_equipment, timer=None):
+    """
+    Full analysis over the required columns, in memory.
+    df can be a DataFrame or any mapping of column name -> pandas Series.
+    Stage times go to timer (a metrics.StageTimer), or a new one.
+    """
+    timer = timer or StageTimer("analysis")
+
+    # ============ STATISTICS ============
+    type_distribution = count_types(df["Type"])
+    stats = column_statistics(df)
+    timer.lap("stats")
+
+    # ============ HEALTH SCORES ============
+    health_scores = calculate_health_scores(df, stats)
+    risks = risk_labels(health_scores)
+    timer.lap("scoring")
+
+    # ============ OUTLIER DETECTION ============
+    outlier_mask = (
+        detect_outlier_mask(df, 'Flowrate')
+        | detect_outlier_mask(df, 'Pressure')
+        | detect_outlier_mask(df, 'Temperature')
+    )
+    timer.lap("outliers")
+
+    # ============ EQUIPMENT DATA, OUTLIERS & EFFICIENCY RANKING ============
+    results = build_equipment_results(df, health_scores, risks, outlier_mask, timer)
+
+    return {
+        **summary_fields(
+            total_equipment,
+            type_distribution,
+            stats,
+            float(round(health_scores.mean(), 1)),
+            len(results["outliers"]),
+            count_risks(risks),
+        ),
+
+        # Per-equipment results
+        "equipment_data": results["equipment_data"],
+        "outliers": results["outliers"],
+        "efficiency_ranking": results["efficiency_ranking"],
+
+        # Per-row rank, status and outlier rows for EquipmentRecord
+        "equipment_ranks": results["equipment_ranks"],
+        "equipment_statuses": results["equipment_statuses"],
+        "outlier_rows": results["outlier_rows"],
+    }
+
+
+def estimate_avg_health_score(flowrate_stats, flowrate_sketch, pressure_penalty, temperature_penalty, total):
+    """
+    Estimate the average health score without per-row data.
+    Pressure/temperature penalties are summed exactly while streaming; the
+    flowrate penalty needs the global mean/std, so the share of rows beyond
+    1 and 2 std devs is read from the flowrate quantile sketch.
+    """
+    if total == 0:
+        return 100.0
+
+    spread = flowrate_stats.std + 0.001
+    flowrate_penalty = 0
+    if not np.isnan(spread):
+        beyond_two = (
+            flowrate_sketch.count_above(flowrate_stats.mean + 2 * spread)
+            + flowrate_sketch.count_below(flowrate_stats.mean - 2 * spread)
+        )
+        beyond_one = (
+            flowrate_sketch.count_above(flowrate_stats.mean + spread)
+            + flowrate_sketch.count_below(flowrate_stats.mean - spread)
+        )
+        flowrate_penalty = 20 * beyond_two + 10 * (beyond_one - beyond_two)
+
+    penalty = flowrate_penalty + pressure_penalty + temperature_penalty
+    return round(100 - penalty / total, 1)
+
+
+def analyze_csv_stream(file, chunksize=50_000):
+    """
+    Summary-only analysis that reads the CSV in fixed-size chunks.
+    Memory stays bounded regardless of file size: each chunk is folded into
+    running accumulators and then dropped. Means, std devs, min/max and type
+    counts are exact; medians and quartiles come from a quantile sketch and
+    the average health score is an estimate. Per-row results (equipment_data,
+    outliers, ranking, risk summary) need the whole file and are not produced.
+    """
+    params = {'flowrate': 'Flowrate', 'pressure': 'Pressure', 'temperature': 'Temperature'}
+    running = {key: RunningStats() for key in params}
+    sketches = {key: QuantileSketch() for key in params}
+    type_counts = {}
+    total_equipment = 0
+    pressure_penalty = 0
+    temperature_penalty = 0
+
+    with read_equipment_csv(file, chunksize=chunksize) as reader:
+        for chunk in reader:
+            total_equipment += len(chunk)
+            for key, column in params.items():
+                values = chunk[column].to_numpy(dtype=np.float64)
+                running[key].update(values)
+                sketches[key].update(values)
+
+            for eq_type, count in count_types(chunk["Type"]).items():
+                type_counts[eq_type] = type_counts.get(eq_type, 0) + count
+
+            # Same bands as calculate_health_scores
+            pressure = chunk["Pressure"].to_numpy(dtype=np.float64)
+            temperature = chunk["Temperature"].to_numpy(dtype=np.float64)
+            pressure_penalty += int(np.select(
+                [(pressure > 8.5) | (pressure < 3.5), (pressure > 8.0) | (pressure < 4.0)], [15, 8], default=0
+            ).sum())
+            temperature_penalty += int(np.select(
+                [(temperature > 145) | (temperature < 90), (temperature > 140) | (temperature < 95)], [15, 8], default=0
+            ).sum())
+
+    statistics = {
+        key: {
+            'mean': _native_stat(running[key].mean),
+            'min': _native_stat(running[key].min),
+            'max': _native_stat(running[key].max),
+            'median': _native_stat(sketches[key].quantile(0.5)),
+            'std': _native_stat(running[key].std),
+            'q1': _native_stat(sketches[key].quantile(0.25)),
+            'q3': _native_stat(sketches[key].quantile(0.75)),
         }
+        for key in params
     }
-    
-    # Convert numpy types to native Python types for JSON serialization
-    return convert_to_native_types(result)
+
+    return {
+        "total_equipment": total_equipment,
+        "avg_flowrate": statistics['flowrate']['mean'],
+        "avg_pressure": statistics['pressure']['mean'],
+        "avg_temperature": statistics['temperature']['mean'],
+        "type_distribution": dict(sorted(type_counts.items(), key=lambda item: (-item[1], str(item[0])))),
+        "statistics": statistics,
+        "avg_health_score": estimate_avg_health_score(
+            running['flowrate'], sketches['flowrate'], pressure_penalty, temperature_penalty, total_equipment
+        ),
+    }
+
+
+def analyze_csv_exact(file, chunksize=50_000, spill_dir=None):
+    """
+    Two-pass exact analysis for files too large for analyze_csv.
+    Pass one streams the CSV in chunks into a temporary columnar spill
+    (memory-mapped float64 numerics, dictionary-encoded Type, raw names).
+    Pass two computes the statistics over the memory maps, then scores,
+    flags and ranks the rows chunk by chunk into further spill columns.
+    Only the summary is returned, with the spill's path as
+    "equipment_spill": the per-row results stay on disk until
+    iter_equipment_rows() reads them back in batches to store them, so no
+    per-row Python objects are built. The stored results are identical to
+    analyze_csv's. discard_spill() deletes the spill.
+    """
+    import pandas as pd
+
+    timer = StageTimer("analysis")
+    with ColumnSpill(spill_dir) as spill:
+        # ============ PASS 1: SPILL ============
+        with read_equipment_csv(file, chunksize=chunksize) as reader:
+            for chunk in reader:
+                spill.append(chunk)
+        timer.lap("parse")
+
+        # ============ PASS 2: STATISTICS OVER THE MMAP ============
+        columns = {column: pd.Series(spill.numeric(column), copy=False) for column in NUMERIC_COLUMNS}
+        types = pd.Series(pd.Categorical.from_codes(spill.type_codes(), spill.type_categories))
+        type_distribution = count_types(types)
+        del types
+        stats = column_statistics(columns)
+        bounds = {column: outlier_bounds(columns[column]) for column in NUMERIC_COLUMNS}
+        timer.lap("stats")
+
+        def chunks():
+            for start in range(0, spill.rows, chunksize):
+                yield {column: series.iloc[start:start + chunksize] for column, series in columns.items()}
+
+        # ============ PER-ROW RESULTS, ONE CHUNK AT A TIME ============
+        health_scores = spill.write_column(
+            "health_score.i64", np.int64, (calculate_health_scores(chunk, stats) for chunk in chunks())
+        )
+        risk_counts = {'HIGH': 0, 'MEDIUM': 0, 'LOW': 0}
+        for start in range(0, spill.rows, chunksize):
+            for label, count in count_risks(risk_labels(health_scores[start:start + chunksize])).items():
+                risk_counts[label] += count
+        timer.lap("scoring")
+
+        def outlier_chunk(chunk):
+            mask = np.zeros(len(chunk["Flowrate"]), dtype=bool)
+            for column, (lower, upper) in bounds.items():
+                values = chunk[column].to_numpy()
+                mask |= (values < lower) | (values > upper)
+            return mask
+
+        outliers = spill.write_column("outlier.b1", np.bool_, (outlier_chunk(chunk) for chunk in chunks()))
+        outlier_count = int(np.count_nonzero(outliers))
+        timer.lap("outliers")
+
+        # Highest score first, ties keep upload order (as build_equipment_results)
+        order = np.argsort(-health_scores, kind='stable')
+        ranks = np.empty(len(order), dtype=np.int64)
+        ranks[order] = np.arange(1, len(order) + 1)
+        del order
+        spill.write_column("rank.i64", np.int64, [ranks])
+        del ranks
+        timer.lap("ranking")
+
+        avg_health_score = float(round(health_scores.mean(), 1))
+        return {
+            **summary_fields(spill.rows, type_distribution, stats, avg_health_score, outlier_count, risk_counts),
+            "equipment_spill": spill.keep(),
+        }
+
+
+def iter_equipment_rows(analysis, batch_rows=5000):
+    """
+    (row, equipment_data entry, rank, status, is_outlier) for every row of a
+    full or exact analysis, in upload order. Exact-mode rows are read from
+    its spill batch_rows at a time.
+    """
+    if "equipment_spill" in analysis:
+        yield from _iter_spilled_rows(analysis["equipment_spill"], batch_rows)
+        return
+
+    ranks = analysis["equipment_ranks"]
+    statuses = analysis["equipment_statuses"]
+    outlier_rows = set(analysis["outlier_rows"])
+    for row, eq in enumerate(analysis["equipment_data"]):
+        yield row, eq, ranks[row], statuses[row], row in outlier_rows
+
+
+def _iter_spilled_rows(path, batch_rows):
+    spill = ColumnSpill.reopen(path)
+    numeric = {column: spill.numeric(column) for column in NUMERIC_COLUMNS}
+    health_scores = spill.column("health_score.i64", np.int64)
+    outliers = spill.column("outlier.b1", np.bool_)
+    ranks = spill.column("rank.i64", np.int64)
+
+    names = spill.iter_names(batch_rows)
+    for start in range(0, spill.rows, batch_rows):
+        stop = min(start + batch_rows, spill.rows)
+        # Same rounding and native types as build_equipment_results
+        batch = zip(
+            next(names),
+            spill.types(start, stop).tolist(),
+            *([round(v, 2) for v in numeric[column][start:stop].tolist()] for column in NUMERIC_COLUMNS),
+            [round(v, 1) for v in health_scores[start:stop].astype(np.float64).tolist()],
+            risk_labels(health_scores[start:stop]).tolist(),
+            ranks[start:stop].tolist(),
+            status_labels(health_scores[start:stop]).tolist(),
+            outliers[start:stop].tolist(),
+        )
+        for row, values in enumerate(batch, start=start):
+            name, eq_type, flowrate, pressure, temperature, score, risk, rank, status, is_outlier = values
+            equipment = {
+                'name': name,
+                'type': eq_type,
+                'flowrate': flowrate,
+                'pressure': pressure,
+                'temperature': temperature,
+                'health_score': score,
+                'risk': risk,
+            }
+            yield row, equipment, rank, status, is_outlier
+
+
+def has_equipment_rows(analysis):
+    """Whether an analysis has per-row results (stream mode only has the summary)"""
+    return "equipment_data" in analysis or "equipment_spill" in analysis
+
+
+def discard_spill(analysis):
+    """Delete the spill an exact analysis keeps for its per-row results, if any"""
+    if analysis and "equipment_spill" in analysis:
+        shutil.rmtree(analysis["equipment_spill"], ignore_errors=True)
+
+
+ANALYSIS_MODES = ("full", "stream", "exact")
+
+
+def analyze_upload(file, mode="full", chunksize=50_000, spill_dir=None):
+    """Run the analysis for one of ANALYSIS_MODES"""
+    if mode == "stream":
+        return analyze_csv_stream(file, chunksize=chunksize)
+    if mode == "exact":
+        return analyze_csv_exact(file, chunksize=chunksize, spill_dir=spill_dir)
+    return analyze_csv(file)
 
 
-# CSV → API → utils.py → DB → JSON
+def analyze_path(path, mode="full", chunksize=50_000, spill_dir=None):
+    """analyze_upload for a file on disk (entry point for worker processes)"""
+    with open(path, "rb") as file:
+        return analyze_upload(file, mode, chunksize, spill_dir)
@@ -0,0 +1,171 @@
+# Native ReportLab (vector) versions of the PDF report charts
+# Drawn straight into the PDF: no matplotlib, no PNG rasters
+# It should NOT contain Django or HTTP code
+import math
+
+from reportlab.graphics.charts.barcharts import HorizontalBarChart, VerticalBarChart
+from reportlab.graphics.charts.legends import Legend
+from reportlab.graphics.charts.lineplots import ScatterPlot
+from reportlab.graphics.shapes import Drawing, Group, Rect, String
+from reportlab.graphics.widgets.markers import makeMarker
+from reportlab.lib import colors
+
+from .scatter_sampling import DEFAULT_MAX_POINTS, density_grid, plan_scatter
+
+# Health score bands for the scatter plot (lower bound, label, colour),
+# stepped along the same red-yellow-green scale as the raster chart
+HEALTH_BANDS = [
+    (85, "85-100", colors.HexColor("#1a9850")),
+    (70, "70-85", colors.HexColor("#a6d96a")),
+    (50, "50-70", colors.HexColor("#fdae61")),
+    (float("-inf"), "< 50", colors.HexColor("#d73027")),
+]
+
+BAR_COLOR = colors.HexColor("#1f77b4")
+
+
+def _titled(width, height, title, x_label, y_label):
+    """Empty drawing with a title and axis labels"""
+    drawing = Drawing(width, height)
+    drawing.add(String(width / 2, height - 14, title, fontName="Helvetica-Bold", fontSize=11, textAnchor="middle"))
+    drawing.add(String(width / 2, 2, x_label, fontName="Helvetica", fontSize=9, textAnchor="middle"))
+    # y-axis label, rotated 90 degrees on the left edge
+    y_title = Group(String(0, 0, y_label, fontName="Helvetica", fontSize=9, textAnchor="middle"))
+    y_title.transform = (0, 1, -1, 0, 8, height / 2)
+    drawing.add(y_title)
+    return drawing
+
+
+def type_distribution_drawing(type_distribution, width, height):
+    """Bar chart of equipment count per type"""
+    drawing = _titled(width, height, "Equipment Type Distribution", "Equipment Type", "Count")
+
+    chart = VerticalBarChart()
+    chart.x, chart.y = 45, 30
+    chart.width, chart.height = width - 60, height - 60
+    chart.data = [list(type_distribution.values()) or [0]]
+    chart.categoryAxis.categoryNames = [str(name) for name in type_distribution] or [""]
+    chart.categoryAxis.labels.fontName = "Helvetica"
+    chart.categoryAxis.labels.fontSize = 8
+    chart.valueAxis.valueMin = 0
+    chart.valueAxis.labels.fontName = "Helvetica"
+    chart.valueAxis.labels.fontSize = 8
+    chart.bars[0].fillColor = BAR_COLOR
+    chart.bars[0].strokeColor = None
+    drawing.add(chart)
+    return drawing
+
+
+def scatter_drawing(pressures, temperatures, health_scores, width, height, outlier_rows=(), max_points=DEFAULT_MAX_POINTS):
+    """
+    Pressure vs temperature scatter, points coloured by health band.
+    Large datasets become a shaded 2D histogram with the outliers and
+    high-risk points overlaid (see scatter_sampling.plan_scatter).
+    """
+    drawing = _titled(width, height, "Pressure vs Temperature Correlation", "Pressure", "Temperature")
+
+    plan = plan_scatter(pressures, temperatures, health_scores, outlier_rows, max_points)
+    if not len(plan["x"]):
+        return drawing
+    if plan["dense"]:
+        shown = zip(plan["highlight_x"].tolist(), plan["highlight_y"].tolist(), plan["highlight_scores"].tolist())
+    else:
+        shown = zip(plan["x"].tolist(), plan["y"].tolist(), plan["scores"].tolist())
+
+    series = [[] for _ in HEALTH_BANDS]
+    for pressure, temperature, score in shown:
+        band = next(i for i, (lower, _, _) in enumerate(HEALTH_BANDS) if score >= lower)
+        series[band].append((pressure, temperature))
+    bands = [(band, points) for band, points in zip(HEALTH_BANDS, series) if points]
+
+    chart = ScatterPlot()
+    chart.x, chart.y = 45, 30
+    chart.width, chart.height = width - 140, height - 60
+    # ScatterPlot needs a series; an invisible point keeps the axes when nothing is overlaid
+    chart.data = [points for _, points in bands] or [[(float(plan["x"][0]), float(plan["y"][0]))]]
+    chart.joinedLines = 0
+    chart.lineLabelFormat = None
+    chart.xLabel = chart.yLabel = ""
+    chart.outerBorderOn = 0
+    chart.background = None
+    chart.xValueAxis.labels.fontName = "Helvetica"
+    chart.xValueAxis.labels.fontSize = 8
+    chart.yValueAxis.labels.fontName = "Helvetica"
+    chart.yValueAxis.labels.fontSize = 8
+    # Fit the axes to all the data (with a 5% margin) instead of starting at zero
+    for axis, values in ((chart.xValueAxis, plan["x"]), (chart.yValueAxis, plan["y"])):
+        low, high = float(values.min()), float(values.max())
+        margin = (high - low) * 0.05 or 1
+        axis.valueMin, axis.valueMax = low - margin, high + margin
+        axis.rangeRound = "none"
+    for i, ((_, _, color), _) in enumerate(bands):
+        chart.lines[i].symbol = makeMarker("FilledCircle", size=2.5 if plan["dense"] else 4)
+        chart.lines[i].symbol.fillColor = color
+        chart.lines[i].symbol.strokeColor = None
+        chart.lines[i].strokeColor = color
+    if not bands:
+        chart.lines[0].symbol = None
+        chart.lines[0].strokeColor = None
+
+    if plan["dense"]:
+        drawing.add(_density_cells(plan, chart))
+        drawing.add(String(
+            chart.x, height - 28,
+            f"{len(plan['x'])} points shown as density; outliers and high-risk equipment overlaid",
+            fontName="Helvetica", fontSize=7, fillColor=colors.dimgray,
+        ))
+    drawing.add(chart)
+
+    legend = Legend()
+    legend.x, legend.y = width - 80, height - 40
+    legend.fontName = "Helvetica"
+    legend.fontSize = 8
+    legend.alignment = "right"
+    legend.colorNamePairs = [(color, label) for (_, label, color), _ in bands]
+    drawing.add(legend)
+    drawing.add(String(width - 80, height - 28, "Health Score", fontName="Helvetica", fontSize=8))
+    return drawing
+
+
+def _density_cells(plan, chart):
+    """Grey 2D-histogram cells in the coordinate space of chart's axes"""
+    counts, x_edges, y_edges = density_grid(plan["x"], plan["y"])
+    x_axis, y_axis = chart.xValueAxis, chart.yValueAxis
+
+    def to_x(value):
+        return chart.x + (value - x_axis.valueMin) / (x_axis.valueMax - x_axis.valueMin) * chart.width
+
+    def to_y(value):
+        return chart.y + (value - y_axis.valueMin) / (y_axis.valueMax - y_axis.valueMin) * chart.height
+
+    cells = Group()
+    # Log shading, like the raster hexbin, so sparse regions stay visible
+    peak = math.log1p(counts.max())
+    for i, j in zip(*counts.nonzero()):
+        shade = 0.9 - 0.75 * math.log1p(counts[i, j]) / peak
+        x0, x1 = to_x(x_edges[i]), to_x(x_edges[i + 1])
+        y0, y1 = to_y(y_edges[j]), to_y(y_edges[j + 1])
+        cells.add(Rect(x0, y0, x1 - x0, y1 - y0, fillColor=colors.Color(shade, shade, shade), strokeColor=None))
+    return cells
+
+
+def health_bars_drawing(names, scores, width, height):
+    """Horizontal bars of health score, coloured by band"""
+    drawing = _titled(width, height, "Equipment Health Scores (Top 10)", "Health Score", "")
+
+    chart = HorizontalBarChart()
+    chart.x, chart.y = 80, 30
+    chart.width, chart.height = width - 100, height - 60
+    chart.data = [list(scores) or [0]]
+    chart.categoryAxis.categoryNames = [str(name) for name in names] or [""]
+    chart.categoryAxis.labels.fontName = "Helvetica"
+    chart.categoryAxis.labels.fontSize = 8
+    chart.valueAxis.valueMin = 0
+    chart.valueAxis.valueMax = 100
+    chart.valueAxis.labels.fontName = "Helvetica"
+    chart.valueAxis.labels.fontSize = 8
+    chart.bars.strokeColor = None
+    for i, score in enumerate(scores):
+        chart.bars[(0, i)].fillColor = colors.green if score >= 85 else colors.orange if score >= 70 else colors.red
+    drawing.add(chart)
+    return drawing
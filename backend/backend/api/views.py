@@ -2,24 +2,44 @@ import logging
 from rest_framework.decorators import api_view, permission_classes # tells Django -> this function  is API endpoint
 from rest_framework.response import Response # returns JSON response
 from rest_framework import status, permissions# http status codes(200,201,400)
-from django.http import HttpResponse
-from .pdf_utils import generate_pdf
-
-from .models import Dataset
-from .serializers import DatasetSerializer
-from .utils import analyze_csv
+from django.conf import settings
+from django.http import FileResponse
+
+from .admission import Overloaded
+from .exports import export_response, get_or_render, schedule_prerender, stream_export
+from .jobs import enqueue_upload
+from .models import AnalysisJob, Dataset, EquipmentRecord, create_dataset
+from .pagination import keyset_page
+from .pdf_utils import CHART_RENDERERS
+from .profiling import FORMATS as PROFILE_FORMATS, profile_path, profiled
+from .serializers import (
+    AnalysisJobSerializer,
+    DatasetSerializer,
+    DatasetSummarySerializer,
+    EquipmentRecordSerializer,
+)
+from .utils import ANALYSIS_MODES, analyze_upload, hash_file
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User  # ✅ ADDED for admin creation
 from rest_framework.authtoken.models import Token
 from rest_framework.permissions import IsAuthenticated
 
-from .export_utils import generate_csv, generate_excel
 
 logger = logging.getLogger('api')
 
 
+def overloaded_response(error):
+    """503 for a render refused by admission control (admission.Overloaded)"""
+    return Response(
+        {"error": str(error)},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={"Retry-After": str(error.retry_after)},
+    )
+
+
 @api_view(["POST"]) #this endpoint accept POST only
 @permission_classes([IsAuthenticated])
+@profiled  # X-Profile: 1 from an admin -> stored cProfile + tracemalloc profile
 def upload_csv(request):
     file = request.FILES.get("file")
     logger.info(f"CSV upload attempt: {file.name if file else 'No file'}")
@@ -31,8 +51,36 @@ def upload_csv(request):
             status=status.HTTP_400_BAD_REQUEST
         )
 
+    # ?mode=stream -> chunked, summary-only analysis with bounded memory
+    # ?mode=exact  -> two-pass analysis over an on-disk spill, same output as full
+    mode = request.query_params.get("mode", "full")
+    if mode not in ANALYSIS_MODES:
+        return Response(
+            {"error": f"Unknown analysis mode: {mode}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    # Same file + same mode -> return the existing analysis (?fresh=true to re-analyze)
+    content_hash = hash_file(file)
+    if request.query_params.get("fresh", "").lower() not in ("1", "true"):
+        existing = (
+            Dataset.objects.filter(content_hash=content_hash, analysis_mode=mode)
+            .order_by("-uploaded_at")
+            .first()
+        )
+        if existing:
+            logger.info(f"Duplicate upload: {file.name} matches dataset ID={existing.id}")
+            response = Response(DatasetSerializer(existing).data, status=status.HTTP_200_OK)
+            response["X-Upload-Deduplicated"] = "true"
+            return response
+
+    # ?async=true -> queue the analysis and return 202 with a job to poll
+    if request.query_params.get("async", "").lower() in ("1", "true"):
+        job = enqueue_upload(file, mode, content_hash)
+        return Response(AnalysisJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
     try:
-        analysis = analyze_csv(file)
+        analysis = analyze_upload(file, mode, settings.CSV_CHUNK_ROWS, settings.CSV_SPILL_DIR)
         logger.info(f"CSV analysis successful: {file.name}, Equipment count: {analysis['total_equipment']}")
     except Exception as e:
         logger.error(f"CSV analysis failed for {file.name}", exc_info=True)
@@ -41,22 +89,10 @@ def upload_csv(request):
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    dataset = Dataset.objects.create( #convert analytics to permanent storage
-        name=file.name, # one row=one csv
-        total_equipment=analysis["total_equipment"],
-        avg_flowrate=analysis["avg_flowrate"],
-        avg_pressure=analysis["avg_pressure"],
-        avg_temperature=analysis["avg_temperature"],
-        type_distribution=analysis["type_distribution"],
-        # New analytics
-        statistics=analysis["statistics"],
-        equipment_data=analysis["equipment_data"],
-        avg_health_score=analysis["avg_health_score"],
-        outliers=analysis["outliers"],
-        outlier_count=analysis["outlier_count"],
-        efficiency_ranking=analysis["efficiency_ranking"],
-        risk_summary=analysis["risk_summary"],
+    dataset = create_dataset(
+        file.name, mode, content_hash, analysis, batch_size=settings.EQUIPMENT_BATCH_SIZE
     )
+    schedule_prerender(dataset.id)
 
     logger.info(f"Dataset created: ID={dataset.id}, Name={file.name}")
 
@@ -67,22 +103,116 @@ def upload_csv(request):
     serializer = DatasetSerializer(dataset) # convert dataset to JSON
     return Response(serializer.data, status=status.HTTP_201_CREATED) # send back to frontend 
  
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def job_status(request, job_id):
+    try:
+        job = AnalysisJob.objects.get(id=job_id)
+    except AnalysisJob.DoesNotExist:
+        return Response(
+            {"error": "Job not found"},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    return Response(AnalysisJobSerializer(job).data)
+
  #History API
 @api_view(["GET"]) # fetches last 5 uploads
 @permission_classes([IsAuthenticated])
 
 def history(request):
     logger.info("History API called")
-    datasets = Dataset.objects.order_by("-uploaded_at")[:5]
-    serializer = DatasetSerializer(datasets, many=True) #many=True-> list of objects
+    # Only the summary columns are loaded; the heavy payload is at datasets/<id>/
+    datasets = Dataset.objects.only(*DatasetSummarySerializer.Meta.fields).order_by("-uploaded_at")[:5]
+    serializer = DatasetSummarySerializer(datasets, many=True) #many=True-> list of objects
     logger.info(f"Returned {len(datasets)} datasets from history")
     return Response(serializer.data)
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+def dataset_detail(request, dataset_id):
+    logger.info(f"Dataset detail request for dataset ID: {dataset_id}")
+    try:
+        dataset = Dataset.objects.get(id=dataset_id)
+    except Dataset.DoesNotExist:
+        logger.error(f"Dataset not found: ID={dataset_id}")
+        return Response(
+            {"error": "Dataset not found"},
+            status=status.HTTP_404_NOT_FOUND
+        )
 
+    serializer = DatasetSerializer(dataset) # full analytics payload
+    return Response(serializer.data)
+
+# Numeric columns the equipment endpoint can sort by
+EQUIPMENT_SORT_FIELDS = ["row", "flowrate", "pressure", "temperature", "health_score", "rank"]
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def dataset_equipment(request, dataset_id):
+    """
+    One page of a dataset's equipment.
+    Filters: type, risk, min_health, max_health
+    Sorting: sort=<column> (prefix with - for descending), default row
+    Paging:  page_size, cursor (next_cursor from the previous page)
+    """
+    if not Dataset.objects.filter(id=dataset_id).exists():
+        logger.error(f"Dataset not found: ID={dataset_id}")
+        return Response(
+            {"error": "Dataset not found"},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    params = request.query_params
+    sort = params.get("sort", "row")
+    descending = sort.startswith("-")
+    sort_field = sort.lstrip("-")
+    if sort_field not in EQUIPMENT_SORT_FIELDS:
+        return Response(
+            {"error": f"Cannot sort by: {sort_field}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    queryset = EquipmentRecord.objects.filter(dataset_id=dataset_id)
+    if params.get("type"):
+        queryset = queryset.filter(type=params["type"])
+    if params.get("risk"):
+        queryset = queryset.filter(risk=params["risk"].upper())
+
+    try:
+        if params.get("min_health"):
+            queryset = queryset.filter(health_score__gte=float(params["min_health"]))
+        if params.get("max_health"):
+            queryset = queryset.filter(health_score__lte=float(params["max_health"]))
+        page_size = min(int(params.get("page_size", settings.EQUIPMENT_PAGE_SIZE)), settings.EQUIPMENT_MAX_PAGE_SIZE)
+        if page_size < 1:
+            raise ValueError("page_size must be positive")
+        items, next_cursor = keyset_page(queryset, sort_field, descending, params.get("cursor"), page_size)
+    except ValueError as e:
+        return Response(
+            {"error": str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    return Response({
+        "results": EquipmentRecordSerializer(items, many=True).data,
+        "next_cursor": next_cursor,
+    })
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+@profiled
 def generate_pdf_report(request, dataset_id):
     logger.info(f"PDF generation request for dataset ID: {dataset_id}")
+
+    # ?charts=vector -> native ReportLab charts instead of matplotlib images
+    charts = request.query_params.get("charts", "raster")
+    if charts not in CHART_RENDERERS:
+        return Response(
+            {"error": f"Unknown chart renderer: {charts}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    kind = "pdf-vector" if charts == "vector" else "pdf"
+
     try:
         dataset = Dataset.objects.get(id=dataset_id)
         logger.info(f"Dataset found: {dataset.name}")
@@ -93,9 +223,14 @@ def generate_pdf_report(request, dataset_id):
             status=status.HTTP_404_NOT_FOUND
         )
 
+    # Usually already pre-rendered after upload; otherwise rendered once and cached
     try:
-        pdf_bytes = generate_pdf(dataset)
-        logger.info(f"PDF generated successfully for dataset ID: {dataset_id}")
+        artifact = get_or_render(dataset, kind)
+        logger.info(f"PDF ready for dataset ID: {dataset_id}")
+        return export_response(request, artifact, kind)
+    except Overloaded as e:
+        logger.warning(f"PDF render refused, render queue is full (dataset ID: {dataset_id})")
+        return overloaded_response(e)
     except Exception as e:
         logger.error(f"PDF generation failed for dataset ID: {dataset_id}", exc_info=True)
         return Response(
@@ -103,9 +238,6 @@ def generate_pdf_report(request, dataset_id):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
-    response = HttpResponse(pdf_bytes, content_type="application/pdf")
-    response["Content-Disposition"] = 'attachment; filename="equipment_report.pdf"'
-    return response
 # Fetch dataset from DB
 
 # Call pure utility function
@@ -189,22 +321,24 @@ def export_csv(request, dataset_id):
             status=status.HTTP_404_NOT_FOUND
         )
 
+    # Cached file if pre-rendered, otherwise rows are streamed as they are read
+    logger.info(f"CSV export started for dataset ID: {dataset_id}")
     try:
-        csv_bytes = generate_csv(dataset)
-        logger.info(f"CSV exported successfully for dataset ID: {dataset_id}")
+        return stream_export(request, dataset, "csv")
+    except Overloaded as e:
+        logger.warning(f"CSV render refused, render queue is full (dataset ID: {dataset_id})")
+        return overloaded_response(e)
     except Exception as e:
+        # Only failures before streaming starts end up here
         logger.error(f"CSV export failed for dataset ID: {dataset_id}", exc_info=True)
         return Response(
             {"error": str(e)},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
-    response = HttpResponse(csv_bytes, content_type="text/csv")
-    response["Content-Disposition"] = 'attachment; filename="equipment_summary.csv"'
-    return response
-
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@profiled
 def export_excel(request, dataset_id):
     logger.info(f"Excel export request for dataset ID: {dataset_id}")
     try:
@@ -217,8 +351,12 @@ def export_excel(request, dataset_id):
         )
 
     try:
-        excel_bytes = generate_excel(dataset)
+        artifact = get_or_render(dataset, "xlsx")
         logger.info(f"Excel exported successfully for dataset ID: {dataset_id}")
+        return export_response(request, artifact, "xlsx")
+    except Overloaded as e:
+        logger.warning(f"Excel render refused, render queue is full (dataset ID: {dataset_id})")
+        return overloaded_response(e)
     except Exception as e:
         logger.error(f"Excel export failed for dataset ID: {dataset_id}", exc_info=True)
         return Response(
@@ -226,9 +364,80 @@ def export_excel(request, dataset_id):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
-    response = HttpResponse(
-        excel_bytes,
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
-    response["Content-Disposition"] = 'attachment; filename="equipment_summary.xlsx"'
-    return response
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def export_parquet(request, dataset_id):
+    logger.info(f"Parquet export request for dataset ID: {dataset_id}")
+    try:
+        dataset = Dataset.objects.get(id=dataset_id)
+    except Dataset.DoesNotExist:
+        logger.error(f"Parquet export failed: Dataset not found (ID={dataset_id})")
+        return Response(
+            {"error": "Dataset not found"},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    try:
+        artifact = get_or_render(dataset, "parquet")
+        logger.info(f"Parquet exported successfully for dataset ID: {dataset_id}")
+        return export_response(request, artifact, "parquet")
+    except Overloaded as e:
+        logger.warning(f"Parquet render refused, render queue is full (dataset ID: {dataset_id})")
+        return overloaded_response(e)
+    except Exception as e:
+        logger.error(f"Parquet export failed for dataset ID: {dataset_id}", exc_info=True)
+        return Response(
+            {"error": str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def export_arrow(request, dataset_id):
+    logger.info(f"Arrow export request for dataset ID: {dataset_id}")
+    try:
+        dataset = Dataset.objects.get(id=dataset_id)
+    except Dataset.DoesNotExist:
+        logger.error(f"Arrow export failed: Dataset not found (ID={dataset_id})")
+        return Response(
+            {"error": "Dataset not found"},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    try:
+        artifact = get_or_render(dataset, "arrow")
+        logger.info(f"Arrow exported successfully for dataset ID: {dataset_id}")
+        return export_response(request, artifact, "arrow")
+    except Overloaded as e:
+        logger.warning(f"Arrow render refused, render queue is full (dataset ID: {dataset_id})")
+        return overloaded_response(e)
+    except Exception as e:
+        logger.error(f"Arrow export failed for dataset ID: {dataset_id}", exc_info=True)
+        return Response(
+            {"error": str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@api_view(["GET"])
+@permission_classes([permissions.IsAdminUser])
+def download_profile(request, profile_id):
+    """A stored request profile (see profiling.py); ?type=text|pstats|collapsed"""
+    fmt = request.query_params.get("type", "text")
+    if fmt not in PROFILE_FORMATS:
+        return Response(
+            {"error": f"Unknown profile format: {fmt}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        f = open(profile_path(profile_id, fmt), "rb")
+    except FileNotFoundError:
+        return Response(
+            {"error": "Profile not found"},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    if fmt == "pstats":
+        return FileResponse(f, as_attachment=True, filename=f"{profile_id}.prof")
+    return FileResponse(f, content_type="text/plain; charset=utf-8")
@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 application = get_asgi_application()
+
+# Analysis worker and matplotlib warm-up; server processes only (see start_server_tasks)
+from api.apps import start_server_tasks  # noqa: E402
+
+start_server_tasks()
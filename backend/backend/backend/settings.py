@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
 import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -54,7 +55,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",  # MUST be first for preflight requests
+    'api.middleware.MetricsMiddleware',  # request metrics for /api/metrics/; sees the compressed size
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'api.middleware.CompressionMiddleware',  # zstd/br/gzip; above anything that edits response bodies
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -157,11 +160,21 @@ CSRF_TRUSTED_ORIGINS = [
     'https://*.railway.app',
 ]
 
-CORS_EXPOSE_HEADERS = ['Content-Type', 'X-CSRFToken', 'Authorization']
-CORS_ALLOW_HEADERS = ['Content-Type', 'Authorization', 'X-CSRFToken', 'Accept']
+CORS_EXPOSE_HEADERS = ['Content-Type', 'X-CSRFToken', 'Authorization', 'X-Upload-Deduplicated', 'ETag', 'Retry-After', 'X-Profile-Id']
+CORS_ALLOW_HEADERS = ['Content-Type', 'Authorization', 'X-CSRFToken', 'Accept', 'If-None-Match', 'X-Profile']
 
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # orjson-backed JSON (stdlib fallback without orjson), see api/renderers.py
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.TokenAuthentication',
     ],
@@ -170,6 +183,77 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Rows per chunk for streaming CSV ingestion (upload/?mode=stream)
+CSV_CHUNK_ROWS = int(os.environ.get('CSV_CHUNK_ROWS', 50000))
+
+# Directory for the temporary columnar spill of upload/?mode=exact, kept until its
+# EquipmentRecord rows are stored (None = system temp dir)
+CSV_SPILL_DIR = os.environ.get('CSV_SPILL_DIR')
+
+# Rows per bulk_create batch when storing EquipmentRecord rows
+EQUIPMENT_BATCH_SIZE = int(os.environ.get('EQUIPMENT_BATCH_SIZE', 5000))
+
+# Page sizes for datasets/<id>/equipment/
+EQUIPMENT_PAGE_SIZE = int(os.environ.get('EQUIPMENT_PAGE_SIZE', 100))
+EQUIPMENT_MAX_PAGE_SIZE = int(os.environ.get('EQUIPMENT_MAX_PAGE_SIZE', 1000))
+
+# Background analysis for upload/?async=true
+# Uploads are spooled to JOB_UPLOAD_DIR and analyzed by ANALYSIS_WORKERS processes.
+# With ANALYSIS_JOB_AUTOSTART the web process runs the worker itself;
+# turn it off when running `manage.py run_analysis_worker` separately.
+JOB_UPLOAD_DIR = os.environ.get('JOB_UPLOAD_DIR', os.path.join(tempfile.gettempdir(), 'analysis-jobs'))
+ANALYSIS_WORKERS = int(os.environ.get('ANALYSIS_WORKERS', 2))
+ANALYSIS_JOB_POLL_SECONDS = float(os.environ.get('ANALYSIS_JOB_POLL_SECONDS', 5))
+ANALYSIS_JOB_AUTOSTART = os.environ.get('ANALYSIS_JOB_AUTOSTART', 'True') == 'True'
+# Running jobs renew a heartbeat; one silent for ANALYSIS_JOB_LEASE_SECONDS (its worker died)
+# is queued again, or failed after ANALYSIS_JOB_MAX_ATTEMPTS claims.
+ANALYSIS_JOB_HEARTBEAT_SECONDS = float(os.environ.get('ANALYSIS_JOB_HEARTBEAT_SECONDS', 30))
+ANALYSIS_JOB_LEASE_SECONDS = float(os.environ.get('ANALYSIS_JOB_LEASE_SECONDS', 300))
+ANALYSIS_JOB_MAX_ATTEMPTS = int(os.environ.get('ANALYSIS_JOB_MAX_ATTEMPTS', 3))
+
+# Rendered export cache (ReportArtifact); least recently used files are evicted past the size limit
+REPORT_CACHE_DIR = os.environ.get('REPORT_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'report-cache'))
+REPORT_CACHE_MAX_BYTES = int(os.environ.get('REPORT_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+# Longest wait for another worker process's render of the same export before rendering it anyway
+EXPORT_RENDER_LOCK_TIMEOUT = float(os.environ.get('EXPORT_RENDER_LOCK_TIMEOUT', 120))
+
+# Admission control for export renders (api/admission.py): at most RENDER_MAX_CONCURRENT
+# renders at once and RENDER_QUEUE_SIZE queued requests, counting those waiting for a
+# slot and those waiting for the same export to finish rendering elsewhere (each
+# waiting up to RENDER_QUEUE_TIMEOUT seconds, except for another process's render:
+# EXPORT_RENDER_LOCK_TIMEOUT); beyond that, 503 with Retry-After: RENDER_RETRY_AFTER.
+# Keep RENDER_MAX_CONCURRENT + RENDER_QUEUE_SIZE below the gunicorn thread count
+# so the remaining threads stay free for light endpoints.
+RENDER_MAX_CONCURRENT = int(os.environ.get('RENDER_MAX_CONCURRENT', 1))
+RENDER_QUEUE_SIZE = int(os.environ.get('RENDER_QUEUE_SIZE', 2))
+RENDER_QUEUE_TIMEOUT = float(os.environ.get('RENDER_QUEUE_TIMEOUT', 30))
+RENDER_RETRY_AFTER = int(os.environ.get('RENDER_RETRY_AFTER', 10))
+
+# Render PDF/CSV/Excel exports in the background right after each upload
+EXPORT_PRERENDER = os.environ.get('EXPORT_PRERENDER', 'True') == 'True'
+EXPORT_PRERENDER_WORKERS = int(os.environ.get('EXPORT_PRERENDER_WORKERS', 1))
+
+# PDF scatter plots with more points than this are drawn as a density
+# (outliers and high-risk equipment are still plotted individually)
+SCATTER_MAX_POINTS = int(os.environ.get('SCATTER_MAX_POINTS', 5000))
+
+# Load matplotlib and its font cache in a background thread when a server process starts,
+# so the first PDF after a deploy does not pay for it (`manage.py warm_matplotlib` for build steps)
+MATPLOTLIB_WARMUP = os.environ.get('MATPLOTLIB_WARMUP', 'True') == 'True'
+
+# Non-streaming responses at least this large are compressed (api.middleware)
+COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', 1024))
+
+# When set, /api/metrics/ requires "Authorization: Bearer <METRICS_TOKEN>";
+# otherwise it is served to admin users only (to anyone when DEBUG is on)
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Request profiles for admins (api/profiling.py): the PROFILE_MAX_COUNT newest are kept in PROFILE_DIR
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'request-profiles'))
+PROFILE_MAX_COUNT = int(os.environ.get('PROFILE_MAX_COUNT', 20))
+PROFILE_SAMPLE_INTERVAL = float(os.environ.get('PROFILE_SAMPLE_INTERVAL', 0.005))
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Chemical Equipment Visualizer API',
     'DESCRIPTION': (
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 application = get_wsgi_application()
+
+# Analysis worker and matplotlib warm-up; server processes only (see start_server_tasks)
+from api.apps import start_server_tasks  # noqa: E402
+
+start_server_tasks()
@@ -43,10 +43,36 @@ class APIClient:
                 headers=self._headers()
             )
 
-        if response.status_code == 201:
+        # 200 -> identical file already analyzed, existing dataset returned
+        if response.status_code in (200, 201):
             return response.json()
         return None
 
+    def upload_csv_async(self, file_path):
+        """
+        Queue a CSV for background analysis.
+        Returns the job (it has a status_url; poll it with fetch_job), or the
+        existing dataset if the same file was already analyzed.
+        """
+        with open(file_path, "rb") as f:
+            response = requests.post(
+                f"{BASE_URL}/upload/",
+                params={"async": "true"},
+                files={"file": f},
+                headers=self._headers()
+            )
+        response.raise_for_status()
+        return response.json()
+
+    def fetch_job(self, job_id):
+        """Get status and progress of a background analysis job"""
+        response = requests.get(
+            f"{BASE_URL}/jobs/{job_id}/",
+            headers=self._headers()
+        )
+        response.raise_for_status()
+        return response.json()
+
     def download_pdf(self, dataset_id):
         """Download PDF report for dataset"""
         response = requests.get(
@@ -64,6 +90,32 @@ class APIClient:
         )
         response.raise_for_status()
         return response.json()
+
+    def fetch_dataset(self, dataset_id):
+        """Get full analytics (equipment data, ranking, outliers) for one dataset"""
+        response = requests.get(
+            f"{BASE_URL}/datasets/{dataset_id}/",
+            headers=self._headers()
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def fetch_equipment(self, dataset_id, cursor=None, **filters):
+        """
+        Get one page of a dataset's equipment.
+        filters: type, risk, min_health, max_health, sort, page_size
+        Pass the returned next_cursor back in to get the following page.
+        """
+        params = dict(filters)
+        if cursor:
+            params["cursor"] = cursor
+        response = requests.get(
+            f"{BASE_URL}/datasets/{dataset_id}/equipment/",
+            params=params,
+            headers=self._headers()
+        )
+        response.raise_for_status()
+        return response.json()
         
     def export_csv(self, dataset_id):
         """Export dataset as CSV"""
@@ -0,0 +1,52 @@
+# Density downsampling for the pressure vs temperature scatter
+# Copy of backend/backend/api/scatter_sampling.py - keep the two in sync (a backend test checks it)
+# Pure numpy - no Django, matplotlib or ReportLab code
+import numpy as np
+
+# Above this many points the scatter becomes a density plot
+DEFAULT_MAX_POINTS = 5000
+
+# Same bound as the HIGH risk label assigned by the backend
+HIGH_RISK_BELOW = 70
+
+
+def highlight_mask(health_scores, outlier_rows=()):
+    """Points that are always drawn individually: outliers and high-risk equipment"""
+    scores = np.asarray(health_scores, dtype=np.float64)
+    mask = scores < HIGH_RISK_BELOW
+    mask[np.asarray(list(outlier_rows), dtype=np.intp)] = True
+    return mask
+
+
+def plan_scatter(pressures, temperatures, health_scores, outlier_rows=(), max_points=DEFAULT_MAX_POINTS):
+    """
+    Decide how to draw the scatter.
+
+    Up to max_points plottable points: {"dense": False, "x", "y", "scores"}
+    with every point. Above it: {"dense": True, ...} where x/y are all points
+    (for a hexbin / 2D histogram, whose cost does not grow with the marker
+    count) and highlight_x/highlight_y/highlight_scores are the outliers and
+    high-risk points to overlay exactly.
+    """
+    x = np.asarray(pressures, dtype=np.float64)
+    y = np.asarray(temperatures, dtype=np.float64)
+    scores = np.asarray(health_scores, dtype=np.float64)
+    plottable = np.isfinite(x) & np.isfinite(y)
+
+    plan = {
+        "dense": int(plottable.sum()) > max_points,
+        "x": x[plottable],
+        "y": y[plottable],
+        "scores": scores[plottable],
+    }
+    if plan["dense"]:
+        keep = highlight_mask(scores, outlier_rows) & plottable
+        plan["highlight_x"] = x[keep]
+        plan["highlight_y"] = y[keep]
+        plan["highlight_scores"] = scores[keep]
+    return plan
+
+
+def density_grid(x, y, bins=(40, 30)):
+    """2D histogram of the points: (counts[x_bin, y_bin], x_edges, y_edges)"""
+    return np.histogram2d(x, y, bins=bins)
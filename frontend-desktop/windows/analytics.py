@@ -5,7 +5,7 @@ Displays comprehensive analytics dashboard with health scores, statistics, outli
 
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QTableWidget, QTableWidgetItem,
-    QScrollArea, QFrame
+    QScrollArea, QFrame, QComboBox, QPushButton, QMessageBox
 )
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QFont, QColor
@@ -13,6 +13,25 @@ import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 import io
+import os
+
+from utils.scatter_sampling import DEFAULT_MAX_POINTS, plan_scatter
+
+# Scatters with more points than this are drawn as a density (same setting name as the backend's)
+SCATTER_MAX_POINTS = int(os.environ.get('SCATTER_MAX_POINTS', DEFAULT_MAX_POINTS))
+
+# Rows fetched per "Load more" in the equipment table
+EQUIPMENT_PAGE_SIZE = 50
+
+# (label, sort parameter) choices for the equipment table
+EQUIPMENT_SORTS = [
+    ("File order", "row"),
+    ("Health score (high to low)", "-health_score"),
+    ("Health score (low to high)", "health_score"),
+    ("Flowrate", "-flowrate"),
+    ("Pressure", "-pressure"),
+    ("Temperature", "-temperature"),
+]
 
 
 class AnalyticsWindow(QWidget):
@@ -20,15 +39,18 @@ class AnalyticsWindow(QWidget):
     Advanced Analytics Dashboard showing comprehensive equipment analysis.
     Displays health scores, statistics, visualizations, and risk assessment.
     """
-    def __init__(self, dataset):
+    def __init__(self, dataset, api_client):
         """
         Initialize analytics window.
         
         Args:
             dataset: Dictionary containing all analytics data
+            api_client: API client used to page through the dataset's equipment
         """
         super().__init__()
         self.dataset = dataset
+        self.api = api_client
+        self.next_cursor = None  # cursor of the next equipment page, None when done
         self.init_ui()
 
     def init_ui(self):
@@ -62,6 +84,9 @@ class AnalyticsWindow(QWidget):
         if self.dataset.get('outliers'):
             layout.addWidget(self.create_outliers_table())
         
+        # Equipment (paged from the server)
+        layout.addWidget(self.create_equipment_table())
+        
         # Add scroll area
         scroll = QScrollArea()
         scroll.setWidgetResizable(True)
@@ -198,8 +223,22 @@ class AnalyticsWindow(QWidget):
         pressures = [eq['pressure'] for eq in equipment_data]
         temperatures = [eq['temperature'] for eq in equipment_data]
         health_scores = [eq['health_score'] for eq in equipment_data]
-        
-        scatter = ax.scatter(pressures, temperatures, c=health_scores, cmap='RdYlGn', s=50, alpha=0.6)
+
+        # Large datasets: hexbin density with outliers and high-risk points drawn on top
+        plan = plan_scatter(
+            pressures, temperatures, health_scores, self.dataset.get('outlier_rows', []),
+            max_points=SCATTER_MAX_POINTS,
+        )
+        if plan['dense']:
+            ax.hexbin(plan['x'], plan['y'], gridsize=60, cmap='Greys', bins='log', mincnt=1)
+            scatter = ax.scatter(
+                plan['highlight_x'], plan['highlight_y'], c=plan['highlight_scores'], cmap='RdYlGn', s=12, alpha=0.6,
+                vmin=plan['scores'].min(), vmax=plan['scores'].max()
+            )
+            ax.text(0.01, 0.99, f"{len(plan['x'])} points shown as density", transform=ax.transAxes,
+                    va='top', fontsize=7, color='dimgray')
+        else:
+            scatter = ax.scatter(plan['x'], plan['y'], c=plan['scores'], cmap='RdYlGn', s=50, alpha=0.6)
         ax.set_xlabel("Pressure")
         ax.set_ylabel("Temperature")
         ax.set_title("Pressure vs Temperature")
@@ -318,3 +357,93 @@ class AnalyticsWindow(QWidget):
         widget = QWidget()
         widget.setLayout(layout)
         return widget
+
+    def create_equipment_table(self):
+        """
+        Create the equipment table.
+        Rows come a page at a time from datasets/<id>/equipment/, so large
+        datasets are never loaded whole; "Load more" fetches the next page.
+        """
+        label = QLabel("🗂️ Equipment")
+        font = QFont()
+        font.setBold(True)
+        label.setFont(font)
+
+        self.risk_filter = QComboBox()
+        for text, risk in [("All risks", ""), ("High risk", "HIGH"), ("Medium risk", "MEDIUM"), ("Low risk", "LOW")]:
+            self.risk_filter.addItem(text, risk)
+        self.risk_filter.currentIndexChanged.connect(self.reload_equipment)
+
+        self.sort_choice = QComboBox()
+        for text, sort in EQUIPMENT_SORTS:
+            self.sort_choice.addItem(text, sort)
+        self.sort_choice.currentIndexChanged.connect(self.reload_equipment)
+
+        filters = QHBoxLayout()
+        filters.addWidget(self.risk_filter)
+        filters.addWidget(self.sort_choice)
+        filters.addStretch()
+
+        self.equipment_table = QTableWidget()
+        self.equipment_table.setColumnCount(7)
+        self.equipment_table.setHorizontalHeaderLabels(
+            ["Equipment", "Type", "Flowrate", "Pressure", "Temperature", "Health Score", "Risk"]
+        )
+        self.equipment_table.setMinimumHeight(300)
+
+        self.load_more_btn = QPushButton("Load more")
+        self.load_more_btn.clicked.connect(self.load_equipment_page)
+
+        layout = QVBoxLayout()
+        layout.addWidget(label)
+        layout.addLayout(filters)
+        layout.addWidget(self.equipment_table)
+        layout.addWidget(self.load_more_btn)
+
+        widget = QWidget()
+        widget.setLayout(layout)
+
+        self.reload_equipment()
+        return widget
+
+    def reload_equipment(self):
+        """Start again from the first page (filter or sort changed)"""
+        self.equipment_table.setRowCount(0)
+        self.next_cursor = None
+        self.load_equipment_page()
+
+    def load_equipment_page(self):
+        """Append the next page of equipment to the table"""
+        filters = {"sort": self.sort_choice.currentData(), "page_size": EQUIPMENT_PAGE_SIZE}
+        if self.risk_filter.currentData():
+            filters["risk"] = self.risk_filter.currentData()
+
+        try:
+            page = self.api.fetch_equipment(self.dataset["id"], cursor=self.next_cursor, **filters)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to load equipment: {str(e)}")
+            return
+
+        for eq in page["results"]:
+            row = self.equipment_table.rowCount()
+            self.equipment_table.insertRow(row)
+
+            self.equipment_table.setItem(row, 0, QTableWidgetItem(eq['name']))
+            self.equipment_table.setItem(row, 1, QTableWidgetItem(eq['type']))
+            self.equipment_table.setItem(row, 2, QTableWidgetItem(str(eq['flowrate'])))
+            self.equipment_table.setItem(row, 3, QTableWidgetItem(str(eq['pressure'])))
+            self.equipment_table.setItem(row, 4, QTableWidgetItem(str(eq['temperature'])))
+            self.equipment_table.setItem(row, 5, QTableWidgetItem(str(eq['health_score'])))
+
+            risk_item = QTableWidgetItem(eq['risk'])
+            if eq['risk'] == 'HIGH':
+                risk_item.setForeground(QColor("#F44336"))
+            elif eq['risk'] == 'MEDIUM':
+                risk_item.setForeground(QColor("#FF9800"))
+            else:
+                risk_item.setForeground(QColor("#4CAF50"))
+            self.equipment_table.setItem(row, 6, risk_item)
+
+        self.next_cursor = page["next_cursor"]
+        self.load_more_btn.setEnabled(self.next_cursor is not None)
+        self.equipment_table.resizeColumnsToContents()
@@ -9,10 +9,14 @@ from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QLabel, QPushButton,
     QFileDialog, QMessageBox, QListWidget
 )
+from PyQt5.QtCore import QTimer
 
 from utils.charts import show_type_distribution_chart
 from windows.analytics import AnalyticsWindow
 
+# How often a queued/running analysis job is polled (milliseconds)
+JOB_POLL_MS = 1000
+
 
 class DashboardWindow(QWidget):
     """
@@ -30,6 +34,10 @@ class DashboardWindow(QWidget):
         self.api = api_client  # Store API client for making requests
         self.dataset = None  # Will store uploaded CSV data and metadata
         self.selected_dataset_id = None  # Track selected dataset from history
+        self.job = None  # Analysis job of the upload in progress
+        # Polls the job without blocking the window
+        self.job_timer = QTimer(self)
+        self.job_timer.timeout.connect(self.poll_job)
         self.init_ui()  # Build the user interface
 
     def init_ui(self):
@@ -71,13 +79,14 @@ class DashboardWindow(QWidget):
         self.pdf_btn.setEnabled(False)  # Initially disabled
         self.layout.addWidget(self.pdf_btn)
 
-        # History section
+        # History section (double-click an entry to open it)
         self.history_label = QLabel("History (Last 5 Uploads)")
         self.layout.addWidget(self.history_label)
 
         # List widget to show upload history
         self.history_list = QListWidget()
         self.history_list.itemClicked.connect(self.on_history_selected)
+        self.history_list.itemDoubleClicked.connect(self.open_history_dataset)
         self.layout.addWidget(self.history_list)
 
         # Export CSV button
@@ -96,8 +105,8 @@ class DashboardWindow(QWidget):
     def upload_csv(self):
         """
         Handle CSV file upload.
-        Opens a file dialog, sends the selected CSV to the backend API,
-        and updates the UI with the response data.
+        Opens a file dialog and queues the selected CSV for background
+        analysis; poll_job follows the job and shows the dataset when done.
         """
         # Open file dialog - user selects a CSV file
         file_path, _ = QFileDialog.getOpenFileName(
@@ -109,25 +118,62 @@ class DashboardWindow(QWidget):
             return
 
         # Send CSV file to backend API for processing
-        response = self.api.upload_csv(file_path)
-
-        # If upload was successful, update UI and enable buttons
-        if response:
-            self.dataset = response  # Store the response data
-            # Update info label with upload details
-            self.info_label.setText(
-                f"Uploaded: {response['name']}\n"
-                f"Total Equipment: {response['total_equipment']}"
-            )
-            # Enable chart and PDF buttons now that data is available
-            self.chart_btn.setEnabled(True)
-            self.analytics_btn.setEnabled(True)
-            self.pdf_btn.setEnabled(True)
+        try:
+            response = self.api.upload_csv_async(file_path)
+        except Exception as e:
+            # Show error message if upload failed
+            QMessageBox.critical(self, "Error", f"Upload failed: {str(e)}")
+            return
+
+        # Same file already analyzed -> the existing dataset comes back directly
+        if "status_url" not in response:
+            self.show_dataset(response, "Uploaded")
+            self.load_history()
+            return
+
+        self.job = response
+        self.upload_btn.setEnabled(False)  # one upload at a time
+        self.info_label.setText(f"Analyzing: {response['name']} ({response['progress']}%)")
+        self.job_timer.start(JOB_POLL_MS)
+
+    def poll_job(self):
+        """Check the analysis job; when it finishes, load its dataset"""
+        try:
+            job = self.api.fetch_job(self.job["id"])
+            if job["status"] in ("queued", "running"):
+                self.info_label.setText(f"Analyzing: {job['name']} ({job['progress']}%)")
+                return
+            self.finish_job()
+            if job["status"] == "failed":
+                QMessageBox.critical(self, "Error", f"Analysis failed: {job['error']}")
+                self.info_label.setText("Upload a CSV file to begin")
+                return
+            # If upload was successful, update UI and enable buttons
+            self.show_dataset(self.api.fetch_dataset(job["dataset"]), "Uploaded")
             # Load history after successful upload
             self.load_history()
-        else:
-            # Show error message if upload failed
-            QMessageBox.critical(self, "Error", "Upload failed")
+        except Exception as e:
+            self.finish_job()
+            QMessageBox.critical(self, "Error", f"Upload failed: {str(e)}")
+
+    def finish_job(self):
+        """Stop polling and allow the next upload"""
+        self.job_timer.stop()
+        self.job = None
+        self.upload_btn.setEnabled(True)
+
+    def show_dataset(self, dataset, action):
+        """Make dataset the current one (chart, analytics and PDF use it)"""
+        self.dataset = dataset  # Store the response data
+        # Update info label with dataset details
+        self.info_label.setText(
+            f"{action}: {dataset['name']}\n"
+            f"Total Equipment: {dataset['total_equipment']}"
+        )
+        # Enable chart and PDF buttons now that data is available
+        self.chart_btn.setEnabled(True)
+        self.analytics_btn.setEnabled(True)
+        self.pdf_btn.setEnabled(True)
 
     def load_history(self):
         """Fetch and display upload history"""
@@ -151,6 +197,13 @@ class DashboardWindow(QWidget):
             # Extract stored dataset ID
             self.selected_dataset_id = item.data(256)
 
+    def open_history_dataset(self, item):
+        """Load the full analytics of a history entry (history only has summary fields)"""
+        try:
+            self.show_dataset(self.api.fetch_dataset(item.data(256)), "Opened")
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to load dataset: {str(e)}")
+
     def get_selected_dataset_id(self):
         """Get ID of selected dataset from history"""
         item = self.history_list.currentItem()
@@ -207,7 +260,7 @@ class DashboardWindow(QWidget):
             QMessageBox.warning(self, "Error", "Please upload data first")
             return
         
-        self.analytics_window = AnalyticsWindow(self.dataset)
+        self.analytics_window = AnalyticsWindow(self.dataset, self.api)
         self.analytics_window.show()
 
     def download_pdf(self):
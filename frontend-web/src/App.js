@@ -32,6 +32,8 @@ import {
 } from "./components/common";
 // Import config for API endpoints
 import { API_ENDPOINTS } from "./utils/config";
+// fetchDataset → loads a dataset picked from history
+import { fetchDataset } from "./services/api";
 // Styling import (keeping for backward compatibility during transition)
 import "./App.css";
 
@@ -77,6 +79,17 @@ function App() {
     setDataset(data);
   };
 
+  // handleHistorySelect → callback from History component
+  // History only has summary fields, so the full analytics are fetched by id
+  const handleHistorySelect = async (id) => {
+    try {
+      const response = await fetchDataset(id, token);
+      handleUploadSuccess(response.data);
+    } catch (err) {
+      alert("Failed to load dataset: " + (err.response?.data?.error || err.message));
+    }
+  };
+
   // downloadFile → reusable authenticated download function
   // url → full API endpoint URL for file download
   // filename → name to save file as locally
@@ -263,7 +276,7 @@ function App() {
 
             {/* Advanced Analytics Dashboard */}
             <StaggerItem>
-              <Analytics summary={summary} equipment_data={summary.equipment_data} />
+              <Analytics summary={summary} equipment_data={summary.equipment_data} token={token} />
             </StaggerItem>
 
             {/* Exports section → grouped download options for PDF, CSV, Excel */}
@@ -344,7 +357,7 @@ function App() {
 
         {/* History section → always visible, shows upload history */}
         <FadeIn delay={0.5} id="history">
-          <History token={token} />
+          <History token={token} onSelect={handleHistorySelect} />
         </FadeIn>
       </Dashboard>
     </PageTransition>
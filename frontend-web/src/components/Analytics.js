@@ -1,4 +1,4 @@
-import React from "react";
+import React, { useEffect, useState } from "react";
 import styled from 'styled-components';
 import { motion } from 'framer-motion';
 import { ScatterChart, Scatter, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer } from "recharts";
@@ -11,8 +11,10 @@ import {
   MetricIcon, 
   SummaryGrid, 
   ChartCard, 
-  Section 
+  Section,
+  Button
 } from "./common";
+import { fetchEquipment } from "../services/api";
 
 // Register Chart.js components
 ChartJS.register(
@@ -323,7 +325,122 @@ const OutlierScore = styled.div`
   }
 `;
 
-function Analytics({ summary, equipment_data }) {
+// Equipment table filters
+const EquipmentFilters = styled.div`
+  display: flex;
+  flex-wrap: wrap;
+  gap: ${({ theme }) => theme.spacing.md};
+  margin-bottom: ${({ theme }) => theme.spacing.lg};
+
+  select {
+    padding: ${({ theme }) => theme.spacing.sm};
+    border: 1px solid ${({ theme }) => theme.colors.gray[200]};
+    border-radius: ${({ theme }) => theme.borderRadius.md};
+    font-size: ${({ theme }) => theme.typography.fontSizes.sm};
+    color: ${({ theme }) => theme.colors.primary.darkest};
+  }
+`;
+
+const LoadMore = styled.div`
+  display: flex;
+  justify-content: center;
+  margin-top: ${({ theme }) => theme.spacing.lg};
+`;
+
+// Equipment table → pages through datasets/<id>/equipment/ instead of the full equipment_data array
+// Each "Load more" passes next_cursor back, so every page costs the same however large the dataset is
+function EquipmentTable({ datasetId, token }) {
+  const [rows, setRows] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [risk, setRisk] = useState("");
+  const [sort, setSort] = useState("row");
+  const [isLoading, setIsLoading] = useState(false);
+  const [error, setError] = useState("");
+
+  const loadPage = (cursor) => {
+    setIsLoading(true);
+    const params = { sort, page_size: 50 };
+    if (risk) params.risk = risk;
+    if (cursor) params.cursor = cursor;
+    return fetchEquipment(datasetId, params, token)
+      .then((res) => {
+        setRows((previous) => (cursor ? [...previous, ...res.data.results] : res.data.results));
+        setNextCursor(res.data.next_cursor);
+        setError("");
+      })
+      .catch((err) => setError(err.response?.data?.error || "Failed to load equipment"))
+      .finally(() => setIsLoading(false));
+  };
+
+  // First page again whenever the dataset, filter or sort changes
+  useEffect(() => {
+    setRows([]);
+    loadPage(null);
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [datasetId, token, risk, sort]);
+
+  return (
+    <ChartCard
+      initial={{ opacity: 0, y: 20 }}
+      animate={{ opacity: 1, y: 0 }}
+      transition={{ duration: 0.4, delay: 1.4 }}
+    >
+      <h3>🗂️ Equipment</h3>
+      <EquipmentFilters>
+        <select value={risk} onChange={(e) => setRisk(e.target.value)}>
+          <option value="">All risks</option>
+          <option value="HIGH">High risk</option>
+          <option value="MEDIUM">Medium risk</option>
+          <option value="LOW">Low risk</option>
+        </select>
+        <select value={sort} onChange={(e) => setSort(e.target.value)}>
+          <option value="row">File order</option>
+          <option value="-health_score">Health score (high → low)</option>
+          <option value="health_score">Health score (low → high)</option>
+          <option value="-flowrate">Flowrate</option>
+          <option value="-pressure">Pressure</option>
+          <option value="-temperature">Temperature</option>
+        </select>
+      </EquipmentFilters>
+      {error && <p style={{ color: '#FF4444' }}>{error}</p>}
+      <StatsTable>
+        <thead>
+          <tr>
+            <th>Equipment</th>
+            <th>Type</th>
+            <th>Flowrate</th>
+            <th>Pressure</th>
+            <th>Temperature</th>
+            <th>Health Score</th>
+            <th>Risk</th>
+          </tr>
+        </thead>
+        <tbody>
+          {rows.map((item) => (
+            <tr key={item.row}>
+              <td><strong>{item.name}</strong></td>
+              <td>{item.type}</td>
+              <td>{item.flowrate}</td>
+              <td>{item.pressure}</td>
+              <td>{item.temperature}</td>
+              <td>{item.health_score}</td>
+              <td><RiskItem risk={item.risk.toLowerCase()}>{item.risk}</RiskItem></td>
+            </tr>
+          ))}
+        </tbody>
+      </StatsTable>
+      {nextCursor && (
+        <LoadMore>
+          <Button variant="secondary" onClick={() => loadPage(nextCursor)} disabled={isLoading}>
+            {isLoading ? '⏳ Loading...' : 'Load more'}
+          </Button>
+        </LoadMore>
+      )}
+    </ChartCard>
+  );
+}
+
+function Analytics({ summary, equipment_data, token }) {
   if (!summary || !equipment_data) return null;
 
   const { statistics, equipment_data: equipmentList, efficiency_ranking, avg_health_score, risk_summary, outliers } = summary;
@@ -794,6 +911,9 @@ function Analytics({ summary, equipment_data }) {
           </OutlierList>
         </OutliersSection>
       )}
+
+      {/* ============ EQUIPMENT (cursor-paginated) ============ */}
+      {summary.id && token && <EquipmentTable datasetId={summary.id} token={token} />}
     </AnalyticsContainer>
   );
 }
@@ -65,6 +65,7 @@ const HistoryTable = styled(motion.table)`
 
 const HistoryRow = styled(motion.tr)`
   transition: all ${({ theme }) => theme.transitions.normal};
+  cursor: pointer;
 
   &:hover {
     background: ${({ theme }) => theme.colors.gray[50]};
@@ -110,7 +111,8 @@ const LoadingSpinner = styled(motion.div)`
 
 // History component → displays list of previous uploads
 // token → authentication token passed from parent (App.js)
-function History({ token }) {
+// onSelect → callback with the dataset id when a row is clicked (App.js loads it)
+function History({ token, onSelect }) {
   // history → stores array of previous uploads from database
   // [] → starts as empty array
   // Updates when API returns data
@@ -210,6 +212,8 @@ function History({ token }) {
             {history.map((item, index) => (
               <HistoryRow
                 key={item.id}
+                onClick={() => onSelect && onSelect(item.id)}
+                title="Open this dataset"
                 initial={{ opacity: 0, x: -20 }}
                 animate={{ opacity: 1, x: 0 }}
                 exit={{ opacity: 0, x: -20 }}
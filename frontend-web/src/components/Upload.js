@@ -1,7 +1,7 @@
 import { useState } from "react"; // useState → React memory for storing state
 import styled from 'styled-components';
 import { motion, AnimatePresence } from 'framer-motion';
-import { uploadCSV } from "../services/api"; // uploadCSV function from API service
+import { uploadCSVAsync, fetchJob, fetchDataset } from "../services/api"; // upload + job polling from API service
 import { Button } from './common';
 
 // Styled components for modern upload interface
@@ -156,6 +156,9 @@ const SuccessMessage = styled(motion.div)`
   }
 `;
 
+// How often a queued/running analysis job is polled
+const JOB_POLL_MS = 1000;
+
 // Upload component → receives token as prop from parent (App.js)
 // onUploadSuccess → callback function to send data back to parent
 function Upload({ onUploadSuccess, token }) {
@@ -173,6 +176,9 @@ function Upload({ onUploadSuccess, token }) {
   // success state for upload completion
   const [isSuccess, setIsSuccess] = useState(false);
 
+  // progress → percent reported by the analysis job (null until a job is running)
+  const [progress, setProgress] = useState(null);
+
   // drag and drop state
   const [isDragOver, setIsDragOver] = useState(false);
 
@@ -226,6 +232,20 @@ function Upload({ onUploadSuccess, token }) {
     setIsSuccess(false);
   };
 
+  // waitForJob → polls the analysis job until it finishes, then loads its dataset
+  // job → the 202 response from uploadCSVAsync (id, status, progress)
+  const waitForJob = async (job) => {
+    while (job.status === "queued" || job.status === "running") {
+      setProgress(job.progress);
+      await new Promise((resolve) => setTimeout(resolve, JOB_POLL_MS));
+      job = (await fetchJob(job.id, token)).data;
+    }
+    if (job.status === "failed") {
+      throw new Error(job.error || "Analysis failed");
+    }
+    return (await fetchDataset(job.dataset, token)).data;
+  };
+
   // handleUpload → async function (takes time to complete)
   // Validates file, calls API, and sends response back to parent
   const handleUpload = async () => {
@@ -242,13 +262,15 @@ function Upload({ onUploadSuccess, token }) {
 
     // Try to upload the file
     try { 
-      // Call uploadCSV function with file AND token
+      // Queue the file for background analysis with file AND token
       // token → proves user is authenticated
-      const response = await uploadCSV(file, token);
+      // 202 → a job to poll; 200 → same file already analyzed, dataset returned directly
+      const response = await uploadCSVAsync(file, token);
+      const data = response.status === 202 ? await waitForJob(response.data) : response.data;
       
       // If successful, send data to parent component (App.js)
-      // response.data → the summary/dataset object from backend
-      onUploadSuccess(response.data);
+      // data → the summary/dataset object from backend
+      onUploadSuccess(data);
       
       // Clear any previous errors and show success
       setError("");
@@ -264,10 +286,12 @@ function Upload({ onUploadSuccess, token }) {
     catch (err) {
       // Show error message from backend or generic message
       // err.response?.data?.error → Django error message if available
-      setError(err.response?.data?.error || "Upload failed");
+      // err.message → analysis job failure
+      setError(err.response?.data?.error || err.message || "Upload failed");
       setIsSuccess(false);
     } finally {
       setIsLoading(false);
+      setProgress(null);
     }
   };
 
@@ -339,7 +363,9 @@ function Upload({ onUploadSuccess, token }) {
           whileTap={{ scale: 0.95 }}
           style={{ marginTop: '1rem' }}
         >
-          {isLoading ? '⏳ Uploading...' : '🚀 Upload & Analyze'}
+          {isLoading
+            ? (progress === null ? '⏳ Uploading...' : `⏳ Analyzing... ${progress}%`)
+            : '🚀 Upload & Analyze'}
         </Button>
       )}
 
@@ -41,6 +41,27 @@ export const uploadCSV = (file, token) => {
   });
 };
 
+// Queue CSV for background analysis → requires authentication
+// Returns 202 with a job (id, status, progress); poll it with fetchJob, then load job.dataset with fetchDataset
+// If the same file was already analyzed the existing dataset comes back instead (200)
+export const uploadCSVAsync = (file, token) => {
+  const formData = new FormData();
+  formData.append("file", file);
+
+  return axios.post(API_ENDPOINTS.upload, formData, {
+    params: { async: "true" },
+    headers: getAuthHeaders(token),
+  });
+};
+
+// Fetch background analysis job → requires authentication
+// status → queued | running | done | failed; dataset → id once done
+export const fetchJob = (id, token) => {
+  return axios.get(API_ENDPOINTS.job(id), {
+    headers: getAuthHeaders(token),
+  });
+};
+
 // Fetch upload history → requires authentication
 // token → authentication token from localStorage
 // Returns list of previous uploads
@@ -50,3 +71,21 @@ export const fetchHistory = (token) => {
     headers: getAuthHeaders(token),
   });
 };
+
+// Fetch one dataset's full analytics → requires authentication
+// History only returns summary fields; equipment data, ranking and outliers come from here
+export const fetchDataset = (id, token) => {
+  return axios.get(API_ENDPOINTS.datasetDetail(id), {
+    headers: getAuthHeaders(token),
+  });
+};
+
+// Fetch one page of a dataset's equipment → requires authentication
+// params → { type, risk, min_health, max_health, sort, page_size, cursor }
+// Response has results + next_cursor (pass it back as cursor for the next page)
+export const fetchEquipment = (id, params, token) => {
+  return axios.get(API_ENDPOINTS.datasetEquipment(id), {
+    params,
+    headers: getAuthHeaders(token),
+  });
+};
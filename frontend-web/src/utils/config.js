@@ -8,7 +8,10 @@ export const API_BASE_URL = process.env.REACT_APP_API_BASE_URL || 'https://chemi
 export const API_ENDPOINTS = {
   login: `${API_BASE_URL}/login/`,
   upload: `${API_BASE_URL}/upload/`,
+  job: (id) => `${API_BASE_URL}/jobs/${id}/`,
   history: `${API_BASE_URL}/history/`,
+  datasetDetail: (id) => `${API_BASE_URL}/datasets/${id}/`,
+  datasetEquipment: (id) => `${API_BASE_URL}/datasets/${id}/equipment/`,
   generatePdf: (id) => `${API_BASE_URL}/generate-pdf/${id}/`,
   exportCsv: (id) => `${API_BASE_URL}/export/csv/${id}/`,
   exportExcel: (id) => `${API_BASE_URL}/export/excel/${id}/`,